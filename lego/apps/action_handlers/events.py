@@ -1,11 +1,13 @@
+import threading
 from functools import wraps
 
 from django.conf import settings
+from django.db import connection, transaction
 
 from lego.utils.content_types import instance_to_string
 
 from . import registry
-from .tasks import execute_action_handler
+from .tasks import execute_action_handlers
 
 
 def disable_on_test(signal_handler):
@@ -22,13 +24,61 @@ def disable_on_test(signal_handler):
     return wrapper
 
 
+class ActionBatch:
+    """
+    Collects the actions triggered inside a transaction and sends them to celery as one task
+    when the transaction commits. Nothing is sent if the transaction is rolled back.
+    """
+
+    def __init__(self):
+        self.actions = []
+        self.savepoint_ids = set(connection.savepoint_ids)
+        transaction.on_commit(self.flush)
+        self.run_on_commit = connection.run_on_commit
+
+    def is_pending(self):
+        """
+        The batch accepts new actions as long as the flush is registered for the current
+        savepoint. Django replaces connection.run_on_commit when the hooks run or are dropped on
+        rollback, so the identity of the list tells if our callback is still there.
+        """
+        return (
+            self.run_on_commit is connection.run_on_commit
+            and self.savepoint_ids == set(connection.savepoint_ids)
+        )
+
+    def add(self, instance, action, kwargs):
+        self.actions.append((instance_to_string(instance), action, kwargs))
+
+    def flush(self):
+        if getattr(_local, 'batch', None) is self:
+            _local.batch = None
+        if self.actions:
+            execute_action_handlers.delay(actions=self.actions)
+
+
+_local = threading.local()
+
+
+def get_batch():
+    """
+    Returns the batch collecting actions for the current transaction, must be called inside an
+    atomic block.
+    """
+    batch = getattr(_local, 'batch', None)
+    if batch is None or not batch.is_pending():
+        batch = ActionBatch()
+        _local.batch = batch
+    return batch
+
+
 @disable_on_test
 def call_handler(instance, action, **kwargs):
     """
     The call_handler executes the delete action sync because the instance is removed from the DB
     before a worker is able to process the event.
 
-    All other actions is executed by celery.
+    All other actions is collected per transaction and executed by celery in one task.
     """
 
     if registry.handler_exists(instance):
@@ -36,9 +86,12 @@ def call_handler(instance, action, **kwargs):
             handler = registry.get_handler_by_instance(instance)
             return handler.run(instance, action, **kwargs)
 
-        return execute_action_handler.delay(
-            instance=instance_to_string(instance), action=action, kwargs=kwargs
-        )
+        if not connection.in_atomic_block:
+            return execute_action_handlers.delay(
+                actions=[(instance_to_string(instance), action, kwargs)]
+            )
+
+        get_batch().add(instance, action, kwargs)
 
 
 def handle_event(instance, action, **kwargs):
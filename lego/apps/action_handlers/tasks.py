@@ -1,14 +1,23 @@
+import time
+from collections import defaultdict
+
 from django.core.exceptions import ObjectDoesNotExist
+from structlog import get_logger
 
 from lego import celery_app
-from lego.utils.content_types import string_to_instance
+from lego.utils.content_types import string_to_instance, strings_to_instances
 from lego.utils.tasks import AbakusTask
 
 from . import registry
 
+log = get_logger()
+
 
 @celery_app.task(bind=True, base=AbakusTask)
 def execute_action_handler(self, instance, action, kwargs, logger_context=None):
+    """
+    Single action task, kept for messages queued before the batched dispatcher was deployed.
+    """
     self.setup_logger(logger_context)
 
     try:
@@ -19,3 +28,45 @@ def execute_action_handler(self, instance, action, kwargs, logger_context=None):
 
     handler = registry.get_handler_by_instance(instance)
     return handler.run(instance, action, **kwargs)
+
+
+@celery_app.task(bind=True, base=AbakusTask)
+def execute_action_handlers(self, actions, logger_context=None):
+    """
+    Run the handlers for a batch of (instance string, action, kwargs) tuples. The batch is sent
+    when the transaction commits, so the instances are loaded with one query for each model.
+    Instances deleted after the commit are skipped, a failing handler doesn't stop the rest.
+    """
+    self.setup_logger(logger_context)
+
+    instances = strings_to_instances(instance_string for instance_string, _, _ in actions)
+
+    timings = defaultdict(list)
+    for (instance_string, action, kwargs), instance in zip(actions, instances):
+        if instance is None:
+            log.warn('action_handler_instance_missing', instance=instance_string, action=action)
+            continue
+
+        handler = registry.get_handler_by_instance(instance)
+        if handler is None:
+            continue
+
+        start = time.perf_counter()
+        try:
+            handler.run(instance, action, **kwargs)
+        except Exception:
+            from raven.contrib.django.raven_compat.models import client
+            client.captureException()
+            log.exception('action_handler_failure', instance=instance_string, action=action)
+        finally:
+            timings[(type(handler).__name__, action)].append(time.perf_counter() - start)
+
+    for (handler_name, action), durations in timings.items():
+        duration_ms = round(sum(durations) * 1000, 2)
+        max_duration_ms = round(max(durations) * 1000, 2)
+        log.info(
+            'action_handler_timing', handler=handler_name, action=action, calls=len(durations),
+            duration_ms=duration_ms, max_duration_ms=max_duration_ms
+        )
+
+    return len(actions)
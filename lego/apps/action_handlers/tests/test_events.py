@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from lego.apps.action_handlers import registry
+from lego.apps.action_handlers.events import handle_create, handle_event
+from lego.apps.action_handlers.handler import Handler
+from lego.apps.action_handlers.tasks import execute_action_handlers
+from lego.apps.users.models import User
+from lego.utils.content_types import instance_to_string
+from lego.utils.test_utils import BaseTestCase
+
+
+class UserHandler(Handler):
+
+    model = User
+
+    def __init__(self):
+        self.calls = []
+
+    def handle_create(self, instance, **kwargs):
+        self.calls.append((instance.pk, 'create'))
+
+    def handle_update(self, instance, **kwargs):
+        raise RuntimeError('update failed')
+
+    def handle_bump(self, instance, **kwargs):
+        self.calls.append((instance.pk, 'bump', kwargs))
+
+
+def run_on_commit_callbacks():
+    callbacks = connection.run_on_commit
+    connection.run_on_commit = []
+    for _, func in callbacks:
+        func()
+
+
+@override_settings(TESTING=False)
+class ActionDispatchTestCase(BaseTestCase):
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    def setUp(self):
+        self.handler = UserHandler()
+        patcher = mock.patch.dict(registry.handler_registry, {User: self.handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = list(User.objects.all()[:3])
+
+    @mock.patch('lego.apps.action_handlers.events.execute_action_handlers.delay')
+    def test_actions_are_sent_as_one_task_on_commit(self, mock_delay):
+        """Test that the actions in a transaction are dispatched as one task after commit"""
+        for user in self.users:
+            handle_create(user)
+        handle_event(self.users[0], 'bump', pool=1)
+        mock_delay.assert_not_called()
+
+        run_on_commit_callbacks()
+        mock_delay.assert_called_once_with(
+            actions=[(instance_to_string(user), 'create', {}) for user in self.users] +
+            [(instance_to_string(self.users[0]), 'bump', {
+                'pool': 1
+            })]
+        )
+
+    @mock.patch('lego.apps.action_handlers.events.execute_action_handlers.delay')
+    def test_actions_in_rolled_back_savepoint_are_dropped(self, mock_delay):
+        """Test that actions collected in a rolled back savepoint are never sent"""
+        try:
+            with transaction.atomic():
+                handle_create(self.users[0])
+                raise ValueError()
+        except ValueError:
+            pass
+        handle_create(self.users[1])
+
+        run_on_commit_callbacks()
+        mock_delay.assert_called_once_with(
+            actions=[(instance_to_string(self.users[1]), 'create', {})]
+        )
+
+    @mock.patch('lego.apps.action_handlers.events.execute_action_handlers.delay')
+    def test_new_batch_after_flush(self, mock_delay):
+        """Test that actions added after the batch is flushed are sent in a new task"""
+        handle_create(self.users[0])
+        run_on_commit_callbacks()
+        handle_create(self.users[1])
+        run_on_commit_callbacks()
+
+        self.assertEqual(
+            mock_delay.call_args_list, [
+                mock.call(actions=[(instance_to_string(user), 'create', {})])
+                for user in self.users[:2]
+            ]
+        )
+
+    @mock.patch('raven.contrib.django.raven_compat.models.client')
+    def test_task_runs_handlers_in_order_and_skips_failures(self, mock_client):
+        """Test that missing instances and failing handlers doesn't stop the batch"""
+        actions = [
+            (instance_to_string(self.users[0]), 'update', {}),
+            ('users.user-0', 'create', {}),
+            (instance_to_string(self.users[1]), 'create', {}),
+            (instance_to_string(self.users[0]), 'bump', {
+                'pool': 1
+            }),
+        ]
+        result = execute_action_handlers(actions=actions)
+
+        self.assertEqual(result, 4)
+        self.assertEqual(
+            self.handler.calls,
+            [(self.users[1].pk, 'create'), (self.users[0].pk, 'bump', {
+                'pool': 1
+            })]
+        )
+        mock_client.captureException.assert_called_once()
+
+
+@override_settings(TESTING=False)
+class ActionDispatchTransactionTestCase(TransactionTestCase):
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    def setUp(self):
+        self.handler = UserHandler()
+        patcher = mock.patch.dict(registry.handler_registry, {User: self.handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = list(User.objects.all()[:2])
+
+    @mock.patch('lego.apps.action_handlers.events.execute_action_handlers.delay')
+    def test_batch_is_not_reused_after_rollback(self, mock_delay):
+        """Test that a rolled back transaction doesn't swallow the actions of the next one"""
+        try:
+            with transaction.atomic():
+                handle_create(self.users[0])
+                raise ValueError()
+        except ValueError:
+            pass
+
+        with transaction.atomic():
+            handle_create(self.users[1])
+
+        mock_delay.assert_called_once_with(
+            actions=[(instance_to_string(self.users[1]), 'create', {})]
+        )
@@ -1,5 +1,6 @@
 from django.conf import settings
 
+from lego.apps.articles.permissions import ArticlePermissionHandler
 from lego.apps.content.models import Content
 from lego.apps.files.models import FileField
 from lego.apps.permissions.models import ObjectPermissionsModel
@@ -11,6 +12,7 @@ class Article(Content, BasisModel, ObjectPermissionsModel):
 
     class Meta:
         abstract = False
+        permission_handler = ArticlePermissionHandler()
 
     def get_absolute_url(self):
         return f'{settings.FRONTEND_URL}/articles/{self.id}/'
@@ -0,0 +1,7 @@
+from lego.apps.permissions.constants import FILTER_QUERYSET_EXISTS
+from lego.apps.permissions.permissions import PermissionHandler
+
+
+class ArticlePermissionHandler(PermissionHandler):
+
+    filter_queryset_strategy = FILTER_QUERYSET_EXISTS
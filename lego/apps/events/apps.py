@@ -1,13 +1,25 @@
 from django.apps import AppConfig
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class EventsConfig(AppConfig):
     name = 'lego.apps.events'
 
     def ready(self):
+        from lego.apps.events.models import Event, Pool
+        from lego.apps.events.signals import (
+            event_save_callback, event_waiting_list_callback, pool_permission_groups_callback,
+            pool_waiting_list_callback, user_waiting_list_callback
+        )
+        from lego.apps.users.models import Membership, Penalty
+
         if not settings.TESTING:
-            from lego.apps.events.models import Event
-            from lego.apps.events.signals import event_save_callback
             post_save.connect(event_save_callback, sender=Event)
+
+        post_save.connect(event_waiting_list_callback, sender=Event)
+        for signal in [post_save, post_delete]:
+            signal.connect(pool_waiting_list_callback, sender=Pool)
+            signal.connect(user_waiting_list_callback, sender=Penalty)
+            signal.connect(user_waiting_list_callback, sender=Membership)
+        m2m_changed.connect(pool_permission_groups_callback, sender=Pool.permission_groups.through)
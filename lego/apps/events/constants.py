@@ -58,3 +58,9 @@ DAYS_BETWEEN_NOTIFY = 1
 
 # Event registration closes a certain amount of hours before the start time
 REGISTRATION_CLOSE_TIME = 2
+
+# Seconds a scheduled registration batch blocks new batches from being scheduled for the event
+REGISTRATION_BATCH_DEBOUNCE = 30
+
+# Seconds the waiting list index of an event is cached
+WAITING_LIST_INDEX_TIMEOUT = 60 * 60
@@ -0,0 +1,14 @@
+from django.db.models import Count, Q
+
+from lego.utils.managers import BasisModelManager
+
+
+class PoolManager(BasisModelManager):
+    def with_registration_count(self):
+        """
+        Annotates `registrations__count`, used by `Pool.registration_count`, `Pool.is_full` and
+        the capacity properties on `Event` instead of one COUNT query per pool.
+        """
+        return self.get_queryset().annotate(
+            registrations__count=Count('registrations', filter=Q(registrations__deleted=False))
+        )
@@ -3,7 +3,7 @@ from datetime import timedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import Count, Sum
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 
 from lego.apps.action_handlers.events import handle_event
@@ -14,7 +14,10 @@ from lego.apps.events.exceptions import (
     EventHasClosed, EventNotReady, NoSuchPool, NoSuchRegistration, RegistrationExists,
     RegistrationsExistInPool, UnansweredSurveyException
 )
+from lego.apps.events.managers import PoolManager
 from lego.apps.events.permissions import EventPermissionHandler, RegistrationPermissionHandler
+from lego.apps.events.planner import RegistrationPlanner
+from lego.apps.events.waiting_list import WaitingListIndex
 from lego.apps.files.models import FileField
 from lego.apps.permissions.models import ObjectPermissionsModel
 from lego.apps.users.models import AbakusGroup, Penalty, User
@@ -135,7 +138,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return False
 
         for group in pool.permission_groups.all():
-            if group in user.all_groups:
+            if group.id in user.all_group_ids:
                 return True
         return False
 
@@ -147,14 +150,19 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                 return None
         reg_time = min(pool.activation_date for pool in pools)
         if self.heed_penalties:
-            if not penalties:
+            if penalties is None:
                 penalties = user.number_of_penalties()
-            if penalties == 2:
-                return reg_time + timedelta(hours=12)
-            elif penalties == 1:
-                return reg_time + timedelta(hours=3)
+            return reg_time + self.registration_delay(penalties)
         return reg_time
 
+    @staticmethod
+    def registration_delay(penalties):
+        if penalties == 2:
+            return timedelta(hours=12)
+        elif penalties == 1:
+            return timedelta(hours=3)
+        return timedelta()
+
     def get_possible_pools(self, user, future=False, all_pools=None, is_admitted=None):
         if not all_pools:
             all_pools = self.pools.all()
@@ -162,7 +170,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             is_admitted = self.is_admitted(user)
         if is_admitted:
             return []
-        queryset = all_pools.filter(permission_groups__in=user.all_groups)
+        queryset = all_pools.filter(permission_groups__in=user.all_group_ids)
         if future:
             return queryset
         return queryset.filter(activation_date__lte=timezone.now())
@@ -191,6 +199,9 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         exclusive pool. If several pools have the same exclusivity,
         selects the biggest pool of these.
 
+        Pools, registration counts and group memberships are loaded up front by a
+        `RegistrationPlanner`, the number of queries does not depend on the number of pools.
+
         :param registration: The registration that gets evaluated
         :return: The registration (in the chosen pool)
         """
@@ -201,16 +212,14 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         if len(unanswered_surveys) > 0:
             raise UnansweredSurveyException()
 
-        if self.heed_penalties:
-            penalties = user.number_of_penalties()
         current_time = timezone.now()
         if self.start_time - timedelta(hours=constants.REGISTRATION_CLOSE_TIME) < current_time:
             raise EventHasClosed()
 
-        all_pools = self.pools.all()
-        possible_pools = self.get_possible_pools(
-            user, all_pools=all_pools, is_admitted=registration.is_admitted
-        )
+        planner = RegistrationPlanner(self)
+        possible_pools = planner.get_possible_pools(user, is_admitted=registration.is_admitted)
+        if self.heed_penalties:
+            penalties = planner.number_of_penalties(user)
         if not self.is_ready:
             raise EventNotReady()
         if not possible_pools:
@@ -222,7 +231,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return registration.add_to_waiting_list()
 
         # If the event is merged or has only one pool we can skip a lot of logic
-        if all_pools.count() == 1:
+        if len(planner.pools) == 1:
             return registration.add_to_pool(possible_pools[0])
 
         if self.is_merged:
@@ -234,7 +243,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return registration.add_to_waiting_list()
 
         # Calculates which pools that are full or open for registration based on capacity
-        full_pools, open_pools = self.calculate_full_pools(possible_pools)
+        full_pools, open_pools = planner.calculate_full_pools(possible_pools)
 
         if not open_pools:
             return registration.add_to_waiting_list()
@@ -243,7 +252,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return registration.add_to_pool(open_pools[0])
 
         # Returns a list of the pool(s) with the least amount of potential members
-        exclusive_pools = self.find_most_exclusive_pools(open_pools)
+        exclusive_pools = planner.find_most_exclusive_pools(open_pools)
 
         if len(exclusive_pools) == 1:
             chosen_pool = exclusive_pools[0]
@@ -252,6 +261,58 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
 
         return registration.add_to_pool(chosen_pool)
 
+    def register_batch(self, registrations):
+        """
+        Evaluates a batch of pending registrations and assigns them to pools in one go, in the
+        order given. The pools are selected the same way as in `register`, and the registrations
+        and pool counters are updated with one query per pool.
+
+        `registration_date` is kept as it is, so the waiting list keeps the order the
+        registrations were received in.
+
+        NOTE: Remember to lock the event using select_for_update!
+
+        :param registrations: Pending registrations, ordered by `registration_date`
+        :return: A list of `(registration, error)` tuples, `error` is None on success
+        """
+        if self.start_time - timedelta(hours=constants.REGISTRATION_CLOSE_TIME) < timezone.now():
+            raise EventHasClosed()
+        if not self.is_ready:
+            raise EventNotReady()
+
+        planner = RegistrationPlanner(self)
+        # Mirrors `register`, counters are only maintained by `add_to_pool`.
+        update_counters = len(planner.pools) == 1 or not self.is_merged
+
+        assigned = {}
+        failed = []
+        results = []
+        for registration, pool, error in planner.assign(registrations):
+            if error:
+                registration.status = constants.FAILURE_REGISTER
+                failed.append(registration.id)
+            else:
+                registration.pool = pool
+                registration.status = constants.SUCCESS_REGISTER
+                registration.unregistration_date = None
+                assigned.setdefault(pool, []).append(registration.id)
+            results.append((registration, error))
+
+        now = timezone.now()
+        for pool, registration_ids in assigned.items():
+            Registration.objects.filter(id__in=registration_ids).update(
+                pool=pool, status=constants.SUCCESS_REGISTER, unregistration_date=None,
+                updated_at=now
+            )
+            if pool and update_counters:
+                Pool.objects.filter(id=pool.id).update(counter=F('counter') + len(registration_ids))
+        if failed:
+            Registration.objects.filter(id__in=failed).update(
+                status=constants.FAILURE_REGISTER, updated_at=now
+            )
+
+        return results
+
     def unregister(self, registration, admin_unregistration_reason=''):
         """
         Pulls the registration, and clears relevant fields. Sets unregistration date.
@@ -297,9 +358,8 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             if self.is_merged:
                 self.bump()
             elif not open_pool.is_full:
-                for registration in self.waiting_registrations:
-                    if open_pool in self.get_possible_pools(registration.user):
-                        return self.bump(to_pool=open_pool)
+                if WaitingListIndex.get(self).has_waiting(open_pool):
+                    return self.bump(to_pool=open_pool)
                 self.try_to_rebalance(open_pool=open_pool)
 
     def bump(self, to_pool=None):
@@ -317,8 +377,9 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                     new_pool = to_pool
                     new_pool.increment()
                 else:
-                    for pool in self.pools.all():
-                        if self.can_register(first_waiting.user, pool):
+                    planner = RegistrationPlanner(self)
+                    for pool in planner.pools:
+                        if planner.can_register(first_waiting.user, pool):
                             new_pool = pool
                             new_pool.increment()
                             break
@@ -334,15 +395,13 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         :param opening_pool: The pool about to be activated.
         :return:
         """
-        for reg in self.waiting_registrations:
+        for reg in self.waiting_list_candidates(opening_pool):
             if opening_pool.is_full:
                 break
-            if self.heed_penalties and reg.user.number_of_penalties() >= 3:
-                continue
-            if self.can_register(reg.user, opening_pool, future=True):
-                reg.pool = opening_pool
-                reg.save()
-                handle_event(reg, 'bump')
+            reg.pool = opening_pool
+            reg.save()
+            opening_pool.increment()
+            handle_event(reg, 'bump')
         self.check_for_bump_or_rebalance(opening_pool)
 
     def bump_on_pool_creation_or_expansion(self):
@@ -357,17 +416,24 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         """
         open_pools = [pool for pool in self.pools.all() if not pool.is_full]
         for pool in open_pools:
-            for reg in self.waiting_registrations:
+            for reg in self.waiting_list_candidates(pool):
                 if self.is_full or pool.is_full:
                     break
-                if self.heed_penalties and reg.user.number_of_penalties() >= 3:
-                    continue
-                if self.can_register(reg.user, pool, future=True):
-                    reg.pool = pool
-                    reg.save()
-                    handle_event(reg, 'bump')
+                reg.pool = pool
+                reg.save()
+                pool.increment()
+                handle_event(reg, 'bump')
             self.check_for_bump_or_rebalance(pool)
 
+    def waiting_list_candidates(self, pool):
+        """
+        Waiting registrations that may join `pool` now or in the future, in waiting list order.
+        Users with three or more penalties are skipped when the event heeds penalties.
+        """
+        candidate_ids = WaitingListIndex.get(self).candidates(self, pool)
+        registrations = self.registrations.select_related('user').in_bulk(candidate_ids)
+        return [registrations[registration_id] for registration_id in candidate_ids]
+
     def try_to_rebalance(self, open_pool):
         """
         Pull the top waiting registrations for all pools, and try to
@@ -378,9 +444,10 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         """
         balanced_pools = []
         bumped = False
+        pools = {pool.id: pool for pool in self.pools.all()}
 
-        for waiting_registration in self.waiting_registrations:
-            for full_pool in self.get_possible_pools(waiting_registration.user):
+        for pool_ids in WaitingListIndex.get(self).possible_pool_ids():
+            for full_pool in [pools[pool_id] for pool_id in pool_ids]:
 
                 if full_pool not in balanced_pools:
                     balanced_pools.append(full_pool)
@@ -403,13 +470,17 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         bumped = False
         for old_registration in self.registrations.filter(pool=from_pool):
             moveable = False
-            user_groups = old_registration.user.all_groups
+            user_groups = old_registration.user.all_group_ids
             for group in to_pool_permissions:
-                if group in user_groups:
+                if group.id in user_groups:
                     moveable = True
             if moveable:
                 old_registration.pool = to_pool
                 old_registration.save()
+                to_pool.increment()
+                # The counter may have drifted, it is repaired by the counter check.
+                if from_pool.counter > 0:
+                    from_pool.decrement()
                 self.bump(to_pool=from_pool)
                 bumped = True
         return bumped
@@ -437,38 +508,18 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         :param to_pool: The pool we are bumping to. If post-merge, there is no pool.
         :return: The registration that is first in line for said pool.
         """
+        if not to_pool and not self.heed_penalties:
+            return self.waiting_registrations.first()
 
-        if to_pool:
-            for registration in self.waiting_registrations:
-                if self.heed_penalties:
-                    penalties = registration.user.number_of_penalties()
-                    earliest_reg = self.get_earliest_registration_time(
-                        registration.user,
-                        [to_pool], penalties
-                    )
-                    if penalties < 3 and earliest_reg < timezone.now():
-                        if self.can_register(registration.user, to_pool):
-                            return registration
-                elif self.can_register(registration.user, to_pool):
-                    return registration
+        registration_id = WaitingListIndex.get(self).first_waiting(self, to_pool)
+        if registration_id is None:
             return None
-
-        if self.heed_penalties:
-            for registration in self.waiting_registrations:
-                penalties = registration.user.number_of_penalties()
-                earliest_reg = self.get_earliest_registration_time(
-                    registration.user, None, penalties
-                )
-                if penalties < 3 and earliest_reg < timezone.now():
-                    return registration
-            return None
-
-        return self.waiting_registrations.first()
+        return self.registrations.get(id=registration_id)
 
     @staticmethod
     def has_pool_permission(user, pool):
         for group in pool.permission_groups.all():
-            if group in user.all_groups:
+            if group.id in user.all_group_ids:
                 return True
         return False
 
@@ -532,8 +583,26 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return False
         return timezone.now() >= self.merge_time
 
+    @property
+    def annotated_pools(self):
+        """
+        The pools of the event when they are prefetched with
+        `Pool.objects.with_registration_count()`, None otherwise.
+        """
+        pools = getattr(self, '_prefetched_objects_cache', {}).get('pools')
+        if pools is None or not all(hasattr(pool, 'registrations__count') for pool in pools):
+            return None
+        return list(pools)
+
     def get_is_full(self, queryset=None):
         if queryset is None:
+            pools = self.annotated_pools
+            if pools is not None:
+                active_pools = [pool for pool in pools if pool.is_activated]
+                active_capacity = sum(pool.capacity for pool in active_pools)
+                if active_capacity == 0:
+                    return False
+                return active_capacity <= sum(pool.registration_count for pool in active_pools)
             queryset = self.pools.filter(activation_date__lte=timezone.now())
         query = queryset.annotate(Count('registrations')).aggregate(
             active_capacity=Sum('capacity'), registrations_count=Sum('registrations__count')
@@ -551,6 +620,9 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
     @property
     def active_capacity(self):
         """ Calculation capacity of pools that are active. """
+        pools = self.annotated_pools
+        if pools is not None:
+            return sum(pool.capacity for pool in pools if pool.is_activated)
         aggregate = self.pools.all().filter(activation_date__lte=timezone.now())\
             .aggregate(Sum('capacity'))
         return aggregate['capacity__sum'] or 0
@@ -562,8 +634,11 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
 
     @property
     def registration_count(self):
-        """ Prefetch friendly counting of registrations for an event. """
-        return sum([pool.registrations.all().count() for pool in self.pools.all()])
+        """
+        Prefetch friendly counting of registrations for an event. Prefetch the pools with
+        `Pool.objects.with_registration_count()` to avoid loading the registrations.
+        """
+        return sum([pool.registration_count for pool in self.pools.all()])
 
     @property
     def number_of_registrations(self):
@@ -612,16 +687,14 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             self.can_view_groups.remove(abakom_group)
         self.save()
 
-    def restricted_lookup(self):
+    @classmethod
+    def lookup_recipient_ids(cls, events):
         """
-        Restricted Mail
+        Restricted mail and announcements. Returns a subquery with the ids of the users
+        registered to the events.
         """
-        registrations = self.registrations.filter(status=constants.SUCCESS_REGISTER)
-        return [registration.user for registration in registrations], []
-
-    def announcement_lookup(self):
-        registrations = self.registrations.filter(status=constants.SUCCESS_REGISTER)
-        return [registration.user for registration in registrations]
+        return Registration.objects.filter(event__in=events, status=constants.SUCCESS_REGISTER)\
+            .values('user_id')
 
 
 class Pool(BasisModel):
@@ -637,6 +710,8 @@ class Pool(BasisModel):
 
     counter = models.PositiveSmallIntegerField(default=0)
 
+    objects = PoolManager()
+
     class Meta:
         ordering = ['id']
 
@@ -650,10 +725,10 @@ class Pool(BasisModel):
     def is_full(self):
         if self.capacity == 0:
             return False
-        return self.registrations.count() >= self.capacity
+        return self.registration_count >= self.capacity
 
     def spots_left(self):
-        return self.capacity - self.registrations.count()
+        return self.capacity - self.registration_count
 
     @property
     def is_activated(self):
@@ -661,6 +736,11 @@ class Pool(BasisModel):
 
     @property
     def registration_count(self):
+        """
+        Uses the annotation from `Pool.objects.with_registration_count()` when it is present.
+        """
+        if hasattr(self, 'registrations__count'):
+            return self.registrations__count
         return self.registrations.count()
 
     def increment(self):
@@ -761,12 +841,9 @@ class Registration(BasisModel):
                 penalty.delete()
 
     def add_to_pool(self, pool):
-        allowed = False
-        with transaction.atomic():
-            locked_pool = Pool.objects.select_for_update().get(pk=pool.id)
-            if locked_pool.capacity == 0 or locked_pool.counter < locked_pool.capacity:
-                locked_pool.increment()
-                allowed = True
+        # The row lock is held by the conditional update, no select_for_update is needed.
+        has_room = Q(capacity=0) | Q(counter__lt=F('capacity'))
+        allowed = Pool.objects.filter(has_room, pk=pool.id).update(counter=F('counter') + 1)
 
         if allowed:
             return self.add_direct_to_pool(pool)
@@ -1,6 +1,6 @@
 from structlog import get_logger
 
-from lego.apps.permissions.constants import CREATE, DELETE, EDIT, VIEW
+from lego.apps.permissions.constants import CREATE, DELETE, EDIT, FILTER_QUERYSET_EXISTS, VIEW
 from lego.apps.permissions.permissions import PermissionHandler
 
 log = get_logger()
@@ -9,6 +9,7 @@ log = get_logger()
 class EventPermissionHandler(PermissionHandler):
 
     perms_without_object = [CREATE, 'administrate']
+    filter_queryset_strategy = FILTER_QUERYSET_EXISTS
 
 
 class RegistrationPermissionHandler(PermissionHandler):
@@ -0,0 +1,259 @@
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from lego.apps.events.constants import PRESENT
+from lego.apps.events.exceptions import UnansweredSurveyException
+from lego.apps.users.models import Membership, Penalty
+
+
+class RegistrationPlanner:
+    """
+    Loads the pools of an event, the pool registration counts and the pool permission groups in
+    a bounded number of queries, so pool selection can be done in memory.
+
+    Users are resolved lazily, either one at a time or in bulk with `load_users`. Group
+    eligibility is calculated from the MPTT fields of the groups the user is a direct member of,
+    this avoids calling `get_ancestors()` for every membership.
+
+    The planner is a snapshot, create a new one when the pools or registrations may have changed.
+    """
+
+    def __init__(self, event):
+        self.event = event
+        self.pools = list(
+            event.pools.annotate(
+                registrations__count=Count('registrations', filter=Q(registrations__deleted=False))
+            ).prefetch_related('permission_groups')
+        )
+        self._pools_by_id = {pool.id: pool for pool in self.pools}
+        self._pool_groups = {
+            pool.id: [group for group in pool.permission_groups.all()]
+            for pool in self.pools
+        }
+        self._group_ids = {}
+        self._penalties = {}
+        self._group_sizes = None
+
+    def load_users(self, users, load_penalties=True):
+        """
+        Resolve group eligibility and penalties for a list of users using two queries.
+        """
+        users = [user for user in users if user.id not in self._group_ids]
+        if not users:
+            return
+
+        member_groups = {user.id: [] for user in users}
+        memberships = Membership.objects.filter(user_id__in=member_groups.keys(), is_active=True)
+        for membership in memberships.select_related('abakus_group'):
+            member_groups[membership.user_id].append(membership.abakus_group)
+
+        for user in users:
+            self._group_ids[user.id] = self._eligible_group_ids(member_groups[user.id])
+
+        if load_penalties and self.event.heed_penalties:
+            penalties = dict(
+                Penalty.objects.valid().filter(user_id__in=member_groups.keys()).values('user_id')
+                .annotate(weight=Sum('weight')).values_list('user_id', 'weight')
+            )
+            for user in users:
+                self._penalties[user.id] = penalties.get(user.id) or 0
+
+    def group_ids(self, user):
+        """
+        Ids of the pool permission groups the user is a member of, directly or through a child
+        group.
+        """
+        if user.id not in self._group_ids:
+            self._group_ids[user.id] = set(user.all_group_ids)
+        return self._group_ids[user.id]
+
+    def number_of_penalties(self, user):
+        if user.id not in self._penalties:
+            self._penalties[user.id] = user.number_of_penalties()
+        return self._penalties[user.id]
+
+    def get_pool(self, pool):
+        return self._pools_by_id.get(pool.id, pool)
+
+    def can_register(self, user, pool, future=False, is_admitted=False):
+        if not pool.is_activated and not future:
+            return False
+        if is_admitted:
+            return False
+        group_ids = self.group_ids(user)
+        return any(group.id in group_ids for group in self._pool_groups.get(pool.id, []))
+
+    def get_possible_pools(self, user, future=False, is_admitted=False):
+        if is_admitted:
+            return []
+        return [
+            pool for pool in self.pools
+            if self.can_register(user, pool, future=future, is_admitted=is_admitted)
+        ]
+
+    def is_full(self, pool):
+        pool = self.get_pool(pool)
+        if pool.capacity == 0:
+            return False
+        return pool.registrations__count >= pool.capacity
+
+    def calculate_full_pools(self, pools):
+        full_pools = []
+        open_pools = []
+        for pool in pools:
+            if self.is_full(pool):
+                full_pools.append(pool)
+            else:
+                open_pools.append(pool)
+        return full_pools, open_pools
+
+    def find_most_exclusive_pools(self, pools):
+        group_sizes = self.get_group_sizes()
+        lowest = float('inf')
+        equal = []
+        for pool in pools:
+            users = sum(group_sizes[group.id] for group in self._pool_groups[pool.id])
+            if users == lowest:
+                equal.append(pool)
+            elif users < lowest:
+                equal = [pool]
+                lowest = users
+        return equal
+
+    def get_group_sizes(self):
+        """
+        Number of users in each pool permission group, including members of child groups.
+        Calculated with one aggregate query, the equivalent of `AbakusGroup.number_of_users`.
+        """
+        if self._group_sizes is None:
+            groups = {
+                group.id: group
+                for pool_groups in self._pool_groups.values() for group in pool_groups
+            }
+            aggregates = {
+                f'group_{group.id}': Count(
+                    'user', distinct=True, filter=Q(
+                        abakus_group__tree_id=group.tree_id,
+                        abakus_group__lft__gte=group.lft,
+                        abakus_group__rght__lte=group.rght,
+                    )
+                )
+                for group in groups.values()
+            }
+            sizes = Membership.objects.filter(is_active=True).aggregate(**aggregates) \
+                if aggregates else {}
+            self._group_sizes = {group_id: sizes[f'group_{group_id}'] for group_id in groups}
+        return self._group_sizes
+
+    def has_spot(self, pool):
+        """
+        Counter based capacity check, the same check `Registration.add_to_pool` uses.
+        """
+        pool = self.get_pool(pool)
+        return pool.capacity == 0 or pool.counter < pool.capacity
+
+    def is_event_full(self):
+        active_pools = [pool for pool in self.pools if pool.is_activated]
+        active_capacity = sum(pool.capacity for pool in active_pools)
+        if active_capacity == 0:
+            return False
+        return active_capacity <= sum(pool.registrations__count for pool in active_pools)
+
+    def users_with_unanswered_surveys(self, users):
+        """
+        Bulk version of `User.unanswered_surveys`, returns the ids of the users that have to
+        answer a survey before they can register.
+        """
+        from lego.apps.events.models import Registration
+        from lego.apps.surveys.models import Submission
+
+        user_ids = {user.id for user in users}
+        pending = set(
+            Registration.objects.filter(
+                user_id__in=user_ids, presence=PRESENT, event__survey__deleted=False,
+                event__survey__active_from__lte=timezone.now(),
+                event__survey__template_type__isnull=True
+            ).values_list('user_id', 'event__survey')
+        )
+        if not pending:
+            return set()
+
+        survey_ids = {survey_id for _, survey_id in pending}
+        answered = set(
+            Submission.objects.filter(user_id__in=user_ids, survey_id__in=survey_ids)
+            .values_list('user_id', 'survey_id')
+        )
+        return {user_id for user_id, _ in pending - answered}
+
+    def assign(self, registrations):
+        """
+        Selects pools for a batch of pending registrations, in order, the same way
+        `Event.register` would if it was called for each of them. Pool counts are updated in
+        memory between registrations, so the caller has to hold a lock on the event.
+
+        :return: A list of `(registration, pool, error)` tuples. `pool` is None for the waiting
+                 list, `error` is set when the registration isn't allowed.
+        """
+        users = [registration.user for registration in registrations]
+        self.load_users(users)
+        unanswered = self.users_with_unanswered_surveys(users)
+        now = timezone.now()
+
+        assignments = []
+        for registration in registrations:
+            try:
+                pool = self._select_pool(registration, unanswered, now)
+            except (UnansweredSurveyException, ValueError) as e:
+                assignments.append((registration, None, e))
+                continue
+            if pool:
+                pool.registrations__count += 1
+                pool.counter += 1
+            assignments.append((registration, pool, None))
+        return assignments
+
+    def _select_pool(self, registration, unanswered, now):
+        user = registration.user
+        if user.id in unanswered:
+            raise UnansweredSurveyException()
+
+        penalties = 0
+        if self.event.heed_penalties:
+            penalties = self.number_of_penalties(user)
+        possible_pools = self.get_possible_pools(user, is_admitted=registration.is_admitted)
+        if not possible_pools:
+            raise ValueError('No available pools')
+        if self.event.get_earliest_registration_time(user, possible_pools, penalties) > now:
+            raise ValueError('Not open yet')
+
+        if penalties >= 3:
+            return None
+
+        if len(self.pools) == 1:
+            chosen_pool = possible_pools[0]
+        elif self.event.is_merged:
+            return None if self.is_event_full() else possible_pools[0]
+        else:
+            full_pools, open_pools = self.calculate_full_pools(possible_pools)
+            if not open_pools:
+                return None
+            exclusive_pools = open_pools
+            if len(open_pools) > 1:
+                exclusive_pools = self.find_most_exclusive_pools(open_pools)
+            if len(exclusive_pools) == 1:
+                chosen_pool = exclusive_pools[0]
+            else:
+                chosen_pool = self.event.select_highest_capacity(exclusive_pools)
+
+        return chosen_pool if self.has_spot(chosen_pool) else None
+
+    def _eligible_group_ids(self, member_groups):
+        eligible = set()
+        for pool_groups in self._pool_groups.values():
+            for group in pool_groups:
+                for member_group in member_groups:
+                    if group.tree_id == member_group.tree_id and \
+                            group.lft <= member_group.lft and group.rght >= member_group.rght:
+                        eligible.add(group.id)
+                        break
+        return eligible
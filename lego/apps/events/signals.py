@@ -1,6 +1,35 @@
+from lego.apps.events.waiting_list import WaitingListIndex
 from lego.apps.events.websockets import notify_event_updated
 
 
 def event_save_callback(sender, instance, created, **kwargs):
     if not created and not instance.deleted:
         notify_event_updated(instance)
+
+
+def event_waiting_list_callback(sender, instance, **kwargs):
+    WaitingListIndex.invalidate(instance.id)
+
+
+def pool_waiting_list_callback(sender, instance, **kwargs):
+    WaitingListIndex.invalidate(instance.event_id)
+
+
+def pool_permission_groups_callback(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+
+    if not reverse:
+        WaitingListIndex.invalidate(instance.event_id)
+    else:
+        from lego.apps.events.models import Pool
+        event_ids = Pool.objects.filter(permission_groups=instance)\
+            .values_list('event_id', flat=True)
+        WaitingListIndex.invalidate(*set(event_ids))
+
+
+def user_waiting_list_callback(sender, instance, **kwargs):
+    """
+    Penalties and memberships decide who can be bumped from the waiting list.
+    """
+    WaitingListIndex.invalidate_for_user(instance.user_id)
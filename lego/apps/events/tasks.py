@@ -1,7 +1,10 @@
 from datetime import timedelta
 
 import stripe
+from django.conf import settings
+from django.core.cache import cache
 from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
 from structlog import get_logger
 
@@ -9,9 +12,10 @@ from lego import celery_app
 from lego.apps.action_handlers.events import handle_event
 from lego.apps.events import constants
 from lego.apps.events.exceptions import (
-    EventHasClosed, PoolCounterNotEqualToRegistrationCount, WebhookDidNotFindRegistration
+    EventHasClosed, EventNotReady, PoolCounterNotEqualToRegistrationCount,
+    WebhookDidNotFindRegistration
 )
-from lego.apps.events.models import Event, Registration
+from lego.apps.events.models import Event, Pool, Registration
 from lego.apps.events.notifications import EventPaymentOverdueCreatorNotification
 from lego.apps.events.serializers.registrations import StripeObjectSerializer
 from lego.apps.events.websockets import (
@@ -37,6 +41,30 @@ class AsyncRegister(AbakusTask):
             )
 
 
+class AsyncRegisterBatch(AbakusTask):
+    serializer = 'json'
+    default_retry_delay = 5
+    registrations = None
+
+    def on_failure(self, *args):
+        """
+        The batch is rolled back when the retries runs out. Mark the registrations in the batch as
+        failed and schedule a new batch for the rest of the pending registrations.
+        """
+        if self.request.retries == self.max_retries and self.registrations:
+            Registration.objects.filter(
+                id__in=[registration.id for registration in self.registrations],
+                status=constants.PENDING_REGISTER
+            ).update(status=constants.FAILURE_REGISTER)
+            for registration in self.registrations:
+                registration.status = constants.FAILURE_REGISTER
+                notify_user_registration(
+                    constants.SOCKET_REGISTRATION_FAILURE, registration,
+                    error_message='Registrering feilet'
+                )
+            schedule_registration_batch(self.registrations[0].event_id)
+
+
 class Payment(AbakusTask):
     serializer = 'json'
     default_retry_delay = 5
@@ -83,6 +111,66 @@ def async_register(self, registration_id, logger_context=None):
         raise self.retry(exc=e, max_retries=3)
 
 
+def registration_batch_key(event_id):
+    return f'events:registration_batch:{event_id}'
+
+
+def schedule_registration_batch(event_id):
+    """
+    Schedule a batch worker for the event, unless one is already waiting to start. The worker
+    clears the key before it collects registrations, so no pending registration is left behind.
+    """
+    if cache.add(registration_batch_key(event_id), True, constants.REGISTRATION_BATCH_DEBOUNCE):
+        async_register_batch.delay(event_id)
+
+
+@celery_app.task(base=AsyncRegisterBatch, bind=True)
+def async_register_batch(self, event_id, logger_context=None):
+    """
+    Drains the pending registrations for an event, used instead of `async_register` when
+    `REGISTRATION_BATCHING` is enabled. The event is locked once for the whole batch, and
+    registrations are handled in `registration_date` order.
+    """
+    self.setup_logger(logger_context)
+    cache.delete(registration_batch_key(event_id))
+
+    batch_size = settings.REGISTRATION_BATCH_SIZE
+    self.registrations = None
+    try:
+        with transaction.atomic():
+            event = Event.objects.select_for_update().get(pk=event_id)
+            self.registrations = registrations = list(
+                event.registrations.filter(status=constants.PENDING_REGISTER)
+                .select_related('user').order_by('registration_date', 'id')[:batch_size]
+            )
+            if not registrations:
+                return
+            results = event.register_batch(registrations)
+            transaction.on_commit(lambda: notify_registration_batch(results))
+    except EventHasClosed as e:
+        log.warn('registration_batch_tried_after_started', exception=e, event_id=event_id)
+        return
+    except (EventNotReady, IntegrityError) as e:
+        log.error('registration_batch_error', exception=e, event_id=event_id)
+        raise self.retry(exc=e, max_retries=3)
+
+    log.info('registration_batch_success', event_id=event_id, registrations=len(results))
+    if len(registrations) == batch_size:
+        schedule_registration_batch(event_id)
+
+
+def notify_registration_batch(results):
+    for registration, error in results:
+        if error:
+            log.warn('registration_error', exception=error, registration_id=registration.id)
+            notify_user_registration(
+                constants.SOCKET_REGISTRATION_FAILURE, registration,
+                error_message='Registrering feilet'
+            )
+        else:
+            notify_event_registration(constants.SOCKET_REGISTRATION_SUCCESS, registration)
+
+
 @celery_app.task(serializer='json', bind=True, base=AbakusTask, default_retry_delay=30)
 def async_unregister(self, registration_id, logger_context=None):
     self.setup_logger(logger_context)
@@ -285,25 +373,35 @@ def notify_event_creator_when_payment_overdue(self, logger_context=None):
 
 
 @celery_app.task(serializer='json', bind=True, base=AbakusTask)
-def check_that_pool_counters_match_registration_number(self, logger_context=None):
+def check_that_pool_counters_match_registration_number(self, logger_context=None, repair=False):
     """
     Task that checks whether pools counters are in sync with number of registrations. We do not
     enforce this check for events that are merged, hence the merge_time filter, because
     incrementing the counter decreases the registration performance
+
+    The registration counts of all pools are compared in one query, pools that differ are
+    checked again while the event is locked. With `repair`, the counter is set to the
+    registration count instead of raising an exception.
     """
     self.setup_logger(logger_context)
 
-    events_ids = Event.objects.filter(
-        start_time__gte=timezone.now(), merge_time__gte=timezone.now()
-    ).values_list('id', flat=True)
+    pools = Pool.objects.with_registration_count().filter(
+        event__start_time__gte=timezone.now(), event__merge_time__gte=timezone.now()
+    ).exclude(counter=F('registrations__count')).values_list('id', 'event_id')
 
-    for event_id in events_ids:
+    for pool_id, event_id in pools:
         with transaction.atomic():
             locked_event = Event.objects.select_for_update().get(pk=event_id)
-            for pool in locked_event.pools.all():
-                registration_count = pool.registrations.count()
-                if pool.counter != registration_count:
-                    log.critical('pool_counter_not_equal_registration_count', pool=pool)
-                    raise PoolCounterNotEqualToRegistrationCount(
-                        pool, registration_count, locked_event
-                    )
+            pool = Pool.objects.with_registration_count().get(pk=pool_id)
+            registration_count = pool.registration_count
+            if pool.counter == registration_count:
+                continue
+
+            log.critical('pool_counter_not_equal_registration_count', pool=pool)
+            if not repair:
+                raise PoolCounterNotEqualToRegistrationCount(pool, registration_count, locked_event)
+            Pool.objects.filter(pk=pool_id).update(counter=registration_count)
+            log.info(
+                'pool_counter_repaired', pool_id=pool_id, counter=pool.counter,
+                registration_count=registration_count
+            )
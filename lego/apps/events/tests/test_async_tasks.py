@@ -4,10 +4,10 @@ from unittest import mock
 from django.utils import timezone
 
 from lego.apps.events import constants
-from lego.apps.events.exceptions import PoolCounterNotEqualToRegistrationCount
+from lego.apps.events.exceptions import EventNotReady, PoolCounterNotEqualToRegistrationCount
 from lego.apps.events.models import Event, Registration
 from lego.apps.events.tasks import (
-    async_register, bump_waiting_users_to_new_pool,
+    async_register, async_register_batch, bump_waiting_users_to_new_pool,
     check_events_for_registrations_with_expired_penalties,
     check_that_pool_counters_match_registration_number, notify_event_creator_when_payment_overdue,
     notify_user_when_payment_soon_overdue
@@ -189,6 +189,21 @@ class PoolActivationTestCase(BaseAPITestCase):
         with self.assertRaises(PoolCounterNotEqualToRegistrationCount):
             check_that_pool_counters_match_registration_number()
 
+    def test_pool_counters_are_repaired(self):
+        """Test that the counter check sets the counter to the registration count"""
+
+        users = get_dummy_users(3)
+
+        for user in users:
+            AbakusGroup.objects.get(name='Webkom').add_user(user)
+            Registration.objects.get_or_create(event=self.event, user=user, pool=self.pool_one)
+
+        check_that_pool_counters_match_registration_number(repair=True)
+
+        self.pool_one.refresh_from_db()
+        self.assertEqual(self.pool_one.registrations.count(), self.pool_one.counter)
+        check_that_pool_counters_match_registration_number()
+
     def test_ensure_pool_counters_match_registration_number(self):
         """Test that method does not raise error when counter is ok"""
 
@@ -346,6 +361,96 @@ class PenaltyExpiredTestCase(BaseTestCase):
         self.assertEqual(self.event.number_of_registrations, 2)
 
 
+class RegistrationBatchTestCase(BaseTestCase):
+    fixtures = [
+        'test_abakus_groups.yaml', 'test_users.yaml', 'test_events.yaml', 'test_companies.yaml'
+    ]
+
+    def setUp(self):
+        Event.objects.all().update(
+            start_time=timezone.now() + timedelta(hours=3),
+            merge_time=timezone.now() + timedelta(hours=12)
+        )
+        self.event = Event.objects.get(title='POOLS_NO_REGISTRATIONS')
+        self.abakus_pool = self.event.pools.get(name='Abakusmember')
+        self.webkom_pool = self.event.pools.get(name='Webkom')
+
+    def create_pending_registrations(self, users):
+        """Registrations are created in reverse, so the id order differs from the date order"""
+        received = timezone.now() - timedelta(minutes=1)
+        registrations = [
+            Registration.objects.create(
+                event=self.event, user=user, status=constants.PENDING_REGISTER,
+                registration_date=received + timedelta(seconds=i)
+            ) for i, user in reversed(list(enumerate(users)))
+        ]
+        return list(reversed(registrations))
+
+    def test_batch_is_handled_in_registration_date_order(self):
+        """Test that the first registrations received get the spots"""
+        users = get_dummy_users(5)
+        for user in users:
+            AbakusGroup.objects.get(name='Abakus').add_user(user)
+        registrations = self.create_pending_registrations(users)
+
+        async_register_batch(self.event.id)
+
+        for registration in registrations[:3]:
+            registration.refresh_from_db()
+            self.assertEqual(registration.pool, self.abakus_pool)
+            self.assertEqual(registration.status, constants.SUCCESS_REGISTER)
+        self.assertEqual(
+            list(self.event.waiting_registrations),
+            [Registration.objects.get(id=registration.id) for registration in registrations[3:]]
+        )
+        self.abakus_pool.refresh_from_db()
+        self.assertEqual(self.abakus_pool.counter, 3)
+
+    def test_batch_selects_pools_like_register(self):
+        """Test that the batch selects the most exclusive pool, like sequential registering"""
+        users = get_dummy_users(6)
+        for user in users[:3]:
+            AbakusGroup.objects.get(name='Webkom').add_user(user)
+        for user in users[3:]:
+            AbakusGroup.objects.get(name='Abakus').add_user(user)
+        self.create_pending_registrations(users)
+
+        async_register_batch(self.event.id)
+
+        self.assertEqual(self.webkom_pool.registrations.count(), 2)
+        self.assertEqual(self.abakus_pool.registrations.count(), 3)
+        self.assertEqual(self.event.waiting_registrations.get().user, users[5])
+
+    def test_batch_marks_illegal_registrations_as_failed(self):
+        """Test that a registration without any available pools fails"""
+        user = get_dummy_users(1)[0]
+        registration = self.create_pending_registrations([user])[0]
+
+        async_register_batch(self.event.id)
+
+        registration.refresh_from_db()
+        self.assertIsNone(registration.pool)
+        self.assertEqual(registration.status, constants.FAILURE_REGISTER)
+
+    @mock.patch('lego.apps.events.tasks.notify_user_registration')
+    @mock.patch('lego.apps.events.models.Event.register_batch', side_effect=EventNotReady)
+    def test_batch_fails_after_retries(self, mock_register_batch, mock_notify):
+        """Test that the batch is marked as failed and the users notified when retries runs out"""
+        users = get_dummy_users(2)
+        registrations = self.create_pending_registrations(users)
+
+        async_register_batch.delay(self.event.id)
+        self.assertEqual(mock_register_batch.call_count, 4)
+
+        for registration in registrations:
+            registration.refresh_from_db()
+            self.assertEqual(registration.status, constants.FAILURE_REGISTER)
+        self.assertEqual(mock_notify.call_count, 2)
+        mock_notify.assert_called_with(
+            constants.SOCKET_REGISTRATION_FAILURE, mock.ANY, error_message='Registrering feilet'
+        )
+
+
 class PaymentDueTestCase(BaseTestCase):
     fixtures = [
         'test_abakus_groups.yaml', 'test_users.yaml', 'test_events.yaml', 'test_companies.yaml'
@@ -1,5 +1,6 @@
 from datetime import timedelta
 
+from django.db.models import Prefetch
 from django.utils import timezone
 
 from lego.apps.events.models import Event, Pool, Registration
@@ -275,6 +276,25 @@ class EventMethodTest(BaseTestCase):
 
         self.assertEqual(event.is_full, True)
 
+    def test_capacity_with_annotated_pools(self):
+        """Test that annotated pools give the same capacity without further queries"""
+        event = Event.objects.get(title="POOLS_WITH_REGISTRATIONS")
+        expected = (
+            event.registration_count, event.active_capacity, event.is_full,
+            [pool.spots_left() for pool in event.pools.all()]
+        )
+
+        event = Event.objects.prefetch_related(
+            Prefetch('pools', queryset=Pool.objects.with_registration_count())
+        ).get(pk=event.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                expected, (
+                    event.registration_count, event.active_capacity, event.is_full,
+                    [pool.spots_left() for pool in event.pools.all()]
+                )
+            )
+
     def test_is_full_when_unlimited(self):
 
         event = Event.objects.get(title="NO_POOLS_ABAKUS")
@@ -1,5 +1,7 @@
 from datetime import timedelta
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from lego.apps.events.exceptions import EventNotReady
@@ -882,3 +884,48 @@ class RegistrationTestCase(BaseTestCase):
         registration = Registration.objects.get_or_create(event=event, user=user)[0]
         with self.assertRaises(EventNotReady):
             event.register(registration)
+
+    def test_register_query_count_is_independent_of_pools(self):
+        """Test that registering uses the same number of queries regardless of the pool count"""
+        users = get_dummy_users(2)
+        event = Event.objects.get(title='POOLS_NO_REGISTRATIONS')
+        for user in users:
+            AbakusGroup.objects.get(name='Webkom').add_user(user)
+
+        registration = Registration.objects.get_or_create(event=event, user=users[0])[0]
+        with CaptureQueriesContext(connection) as two_pools:
+            event.register(registration)
+
+        for group_name in ['Abakom', 'Users']:
+            pool = Pool.objects.create(
+                name=group_name, capacity=5, event=event,
+                activation_date=(timezone.now() - timedelta(hours=1))
+            )
+            pool.permission_groups.set([AbakusGroup.objects.get(name=group_name)])
+
+        registration = Registration.objects.get_or_create(event=event, user=users[1])[0]
+        with CaptureQueriesContext(connection) as four_pools:
+            event.register(registration)
+
+        self.assertIsNotNone(registration.pool)
+        self.assertEqual(len(two_pools), len(four_pools))
+
+    def test_pop_from_waiting_list_query_count_is_independent_of_waiting_list(self):
+        """Test that popping from the waiting list does not query once per waiting user"""
+        event = Event.objects.get(title='POOLS_WITH_REGISTRATIONS')
+        pool = event.pools.get(name='Webkom')
+        users = get_dummy_users(6)
+        for user in users:
+            AbakusGroup.objects.get(name='Abakus').add_user(user)
+
+        for user in users[:2]:
+            event.add_to_waiting_list(user)
+        with CaptureQueriesContext(connection) as short_list:
+            self.assertIsNone(event.pop_from_waiting_list(pool))
+
+        for user in users[2:]:
+            event.add_to_waiting_list(user)
+        with CaptureQueriesContext(connection) as long_list:
+            self.assertIsNone(event.pop_from_waiting_list(pool))
+
+        self.assertEqual(len(short_list), len(long_list))
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from lego.apps.events.models import Event, Pool
+from lego.apps.events.waiting_list import WaitingListIndex
+from lego.apps.users.models import AbakusGroup, Penalty
+from lego.utils.test_utils import BaseTestCase
+
+from .utils import get_dummy_users, make_penalty_expire
+
+
+class WaitingListIndexTestCase(BaseTestCase):
+    fixtures = [
+        'test_abakus_groups.yaml', 'test_users.yaml', 'test_companies.yaml', 'test_events.yaml'
+    ]
+
+    def setUp(self):
+        Event.objects.all().update(
+            start_time=timezone.now() + timedelta(hours=3),
+            merge_time=timezone.now() + timedelta(hours=12), heed_penalties=True
+        )
+        self.event = Event.objects.get(title='POOLS_WITH_REGISTRATIONS')
+        self.abakus_pool = self.event.pools.get(name='Abakusmember')
+        self.webkom_pool = self.event.pools.get(name='Webkom')
+        self.users = get_dummy_users(3)
+        for user in self.users:
+            AbakusGroup.objects.get(name='Abakus').add_user(user)
+            self.event.add_to_waiting_list(user)
+
+    def test_index_maps_pools_to_eligible_registrations(self):
+        """Test that only users in the pool groups are candidates for a pool"""
+        index = WaitingListIndex.get(self.event)
+
+        self.assertEqual(len(index.candidates(self.event, self.abakus_pool)), 3)
+        self.assertEqual(index.candidates(self.event, self.webkom_pool), [])
+        self.assertFalse(index.has_waiting(self.webkom_pool))
+
+    def test_index_is_rebuilt_on_membership_change(self):
+        """Test that a new membership makes the user a candidate for the pool"""
+        WaitingListIndex.get(self.event)
+        AbakusGroup.objects.get(name='Webkom').add_user(self.users[1])
+
+        index = WaitingListIndex.get(self.event)
+        candidates = index.candidates(self.event, self.webkom_pool)
+        self.assertEqual(candidates, [self.event.registrations.get(user=self.users[1]).id])
+
+    def test_index_is_rebuilt_on_pool_permission_change(self):
+        """Test that changing the pool permission groups updates the index"""
+        WaitingListIndex.get(self.event)
+        self.webkom_pool.permission_groups.add(AbakusGroup.objects.get(name='Abakus'))
+
+        index = WaitingListIndex.get(self.event)
+        self.assertEqual(len(index.candidates(self.event, self.webkom_pool)), 3)
+
+    def test_first_waiting_skips_users_with_penalties(self):
+        """Test that users with too many penalties are skipped, until the penalties expire"""
+        penalty = Penalty.objects.create(
+            user=self.users[0], reason='test', weight=3, source_event=self.event
+        )
+        registration_ids = WaitingListIndex.get(self.event).registration_ids
+
+        self.assertEqual(
+            WaitingListIndex.get(self.event).first_waiting(self.event, self.abakus_pool),
+            registration_ids[1]
+        )
+
+        make_penalty_expire(penalty)
+        self.assertEqual(
+            WaitingListIndex.get(self.event).first_waiting(self.event, self.abakus_pool),
+            registration_ids[0]
+        )
+
+    def test_first_waiting_requires_activated_pool(self):
+        """Test that no one is bumped to a pool that isn't activated"""
+        pool = Pool.objects.create(
+            name='Future', capacity=5, event=self.event,
+            activation_date=timezone.now() + timedelta(hours=1)
+        )
+        pool.permission_groups.set([AbakusGroup.objects.get(name='Abakus')])
+
+        index = WaitingListIndex.get(self.event)
+        self.assertIsNone(index.first_waiting(self.event, pool))
+        self.assertEqual(len(index.candidates(self.event, pool)), 3)
@@ -1,4 +1,5 @@
 from celery import chain
+from django.conf import settings
 from django.db import transaction
 from django.db.models import Count, Prefetch, Q
 from django.utils import timezone
@@ -28,7 +29,7 @@ from lego.apps.events.serializers.registrations import (
 )
 from lego.apps.events.tasks import (
     async_payment, async_register, async_unregister, check_for_bump_on_pool_creation_or_expansion,
-    registration_payment_save
+    registration_payment_save, schedule_registration_batch
 )
 from lego.apps.permissions.api.views import AllowedPermissionsMixin
 from lego.apps.permissions.utils import get_permission_handler
@@ -45,7 +46,7 @@ class EventViewSet(AllowedPermissionsMixin, viewsets.ModelViewSet):
         user = self.request.user
         if self.action in ['list', 'upcoming']:
             queryset = Event.objects.select_related('company').prefetch_related(
-                'pools', 'pools__registrations', 'tags'
+                Prefetch('pools', queryset=Pool.objects.with_registration_count()), 'tags'
             )
         elif self.action == 'retrieve':
             queryset = Event.objects.select_related('company', 'responsible_group')\
@@ -62,10 +63,9 @@ class EventViewSet(AllowedPermissionsMixin, viewsets.ModelViewSet):
         return queryset
 
     def get_registrations(self, user):
-        current_user_groups = user.all_groups
         query = Q()
-        for group in current_user_groups:
-            query |= Q(user__abakus_groups=group)
+        for group_id in user.all_group_ids:
+            query |= Q(user__abakus_groups=group_id)
         registrations = Registration.objects.select_related('user').annotate(
             shared_memberships=Count('user__abakus_groups', filter=query)
         )
@@ -214,8 +214,14 @@ class RegistrationViewSet(
                 raise ValidationError({'error': 'Feedback is required'})
             registration.status = constants.PENDING_REGISTER
             registration.feedback = feedback
-            registration.save(update_fields=['status', 'feedback'])
-            transaction.on_commit(lambda: async_register.delay(registration.id))
+            if settings.REGISTRATION_BATCHING:
+                # The batch worker handles pending registrations in registration_date order.
+                registration.registration_date = timezone.now()
+                registration.save(update_fields=['status', 'feedback', 'registration_date'])
+                transaction.on_commit(lambda: schedule_registration_batch(registration.event_id))
+            else:
+                registration.save(update_fields=['status', 'feedback'])
+                transaction.on_commit(lambda: async_register.delay(registration.id))
         registration_serializer = RegistrationReadSerializer(
             registration, context={'user': registration.user}
         )
@@ -0,0 +1,159 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from lego.apps.events import constants
+from lego.apps.events.planner import RegistrationPlanner
+from lego.apps.users.models import Penalty
+
+
+class WaitingListIndex:
+    """
+    Precomputed view of the waiting list of an event. Stores the waiting registrations in order,
+    the pools each of them is allowed to join and the active penalties of the waiting users.
+
+    Penalty delays and pool activation are evaluated on lookup, so the index stays correct as
+    time passes. The index is stored in the cache and rebuilt when the waiting list changes, or
+    when it is invalidated by changes to penalties, memberships or pools.
+    """
+
+    def __init__(self, registration_ids, user_ids, pool_ids, activation_dates, penalties):
+        self.registration_ids = registration_ids
+        self.user_ids = user_ids
+        self.pool_ids = pool_ids
+        self.activation_dates = activation_dates
+        self.penalties = penalties
+
+    @staticmethod
+    def cache_key(event_id):
+        return f'events:waiting_list:{event_id}'
+
+    @classmethod
+    def get(cls, event):
+        """
+        Returns the index for the event. Costs one query to verify that the waiting list is
+        unchanged, the index is rebuilt if it isn't.
+        """
+        waiting_ids = list(
+            event.waiting_registrations.order_by('registration_date', 'id')
+            .values_list('id', flat=True)
+        )
+        key = cls.cache_key(event.id)
+        index = cache.get(key)
+        if index is None or index.registration_ids != waiting_ids:
+            index = cls.build(event)
+            cache.set(key, index, constants.WAITING_LIST_INDEX_TIMEOUT)
+        return index
+
+    @classmethod
+    def build(cls, event):
+        registrations = list(
+            event.waiting_registrations.order_by('registration_date', 'id').select_related('user')
+        )
+        users = [registration.user for registration in registrations]
+        planner = RegistrationPlanner(event)
+        planner.load_users(users, load_penalties=False)
+
+        penalties = {}
+        if event.heed_penalties:
+            valid_penalties = Penalty.objects.valid().filter(user_id__in={u.id for u in users})\
+                .values_list('user_id', 'created_at', 'weight')
+            for user_id, created_at, weight in valid_penalties:
+                penalties.setdefault(user_id, []).append((created_at, weight))
+
+        pool_ids = [
+            frozenset(pool.id for pool in planner.get_possible_pools(user, future=True))
+            for user in users
+        ]
+        activation_dates = {pool.id: pool.activation_date for pool in planner.pools}
+
+        return cls(
+            registration_ids=[registration.id for registration in registrations],
+            user_ids=[user.id for user in users],
+            pool_ids=pool_ids,
+            activation_dates=activation_dates,
+            penalties=penalties,
+        )
+
+    @classmethod
+    def invalidate(cls, *event_ids):
+        cache.delete_many([cls.cache_key(event_id) for event_id in event_ids])
+
+    @classmethod
+    def invalidate_for_user(cls, user_id):
+        from lego.apps.events.models import Registration
+        event_ids = Registration.objects.filter(
+            user_id=user_id, pool=None, unregistration_date=None
+        ).values_list('event_id', flat=True)
+        cls.invalidate(*event_ids)
+
+    def number_of_penalties(self, user_id, expired_before):
+        return sum(
+            weight for created_at, weight in self.penalties.get(user_id, [])
+            if created_at > expired_before
+        )
+
+    @staticmethod
+    def penalties_expired_before(now=None):
+        """
+        Penalties created before this time are expired, see `Penalty.objects.valid()`.
+        """
+        now = now or timezone.now()
+        return now - Penalty.penalty_offset(now, False)
+
+    def is_activated(self, pool_id, now=None):
+        return self.activation_dates[pool_id] <= (now or timezone.now())
+
+    def has_waiting(self, pool):
+        """
+        Whether anyone on the waiting list can join an activated pool, penalties are ignored.
+        """
+        if pool.id not in self.activation_dates or not self.is_activated(pool.id):
+            return False
+        return any(pool.id in pool_ids for pool_ids in self.pool_ids)
+
+    def possible_pool_ids(self):
+        """
+        The activated pools each waiting registration can join, in waiting list order.
+        """
+        now = timezone.now()
+        return [
+            sorted(pool_id for pool_id in pool_ids if self.is_activated(pool_id, now))
+            for pool_ids in self.pool_ids
+        ]
+
+    def candidates(self, event, pool):
+        """
+        Ids of the waiting registrations that may join `pool` at some point, skipping users
+        with three or more penalties when the event heeds penalties.
+        """
+        expired_before = self.penalties_expired_before()
+        return [
+            registration_id for registration_id, user_id, pool_ids in
+            zip(self.registration_ids, self.user_ids, self.pool_ids) if pool.id in pool_ids and
+            not (event.heed_penalties and self.number_of_penalties(user_id, expired_before) >= 3)
+        ]
+
+    def first_waiting(self, event, to_pool=None):
+        """
+        Id of the first registration that can be bumped to `to_pool`, or to any pool if
+        `to_pool` is None. See `Event.pop_from_waiting_list`.
+        """
+        now = timezone.now()
+        expired_before = self.penalties_expired_before(now)
+        for registration_id, user_id, pool_ids in \
+                zip(self.registration_ids, self.user_ids, self.pool_ids):
+            if to_pool:
+                if to_pool.id not in pool_ids or not self.is_activated(to_pool.id, now):
+                    continue
+                pool_ids = [to_pool.id]
+
+            if event.heed_penalties:
+                penalties = self.number_of_penalties(user_id, expired_before)
+                if penalties >= 3 or not pool_ids:
+                    continue
+                earliest_reg = min(self.activation_dates[pool_id] for pool_id in pool_ids) + \
+                    event.registration_delay(penalties)
+                if earliest_reg >= now:
+                    continue
+            return registration_id
+        return None
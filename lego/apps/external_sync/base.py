@@ -1,32 +1,173 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from structlog import get_logger
 
+from .snapshot import Snapshot, fingerprint
+
 log = get_logger()
 
 
+class ThreadClients:
+    """
+    Creates one client for each thread, the directory clients isn't thread safe. The client for
+    the current thread is created right away, configuration errors are raised by the system
+    constructor.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.local = threading.local()
+        self.local.client = factory()
+
+    def get(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.factory()
+        return client
+
+
 class ExternalSystem:
     """
     External systems needs to implement a set of methods to support syncing of internal resources.
+
+    The sync is incremental. The remote entities are listed with one call, and the fingerprint of
+    the fields a system cares about is compared with the fingerprint from the last run. Only new
+    and changed entities are pushed.
+
+    Pushes runs in a bounded thread pool with EXTERNAL_SYNC_WORKERS threads. The push functions
+    runs in the worker threads and must not query the database, data they need is loaded when
+    the fingerprints are computed and kept with `memoize`.
     """
 
     name = None
 
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the remote listings and memoized data, called at the start of each sync run.
+        """
+        self._remote = {}
+        self._memo = {}
+        self.stats = Counter()
+
+    def remote(self, kind, lookup):
+        if kind not in self._remote:
+            self._remote[kind] = lookup()
+        return self._remote[kind]
+
+    def memoize(self, key, func):
+        if key not in self._memo:
+            self._memo[key] = func()
+        return self._memo[key]
+
+    def run_pushes(self, push, items, get_key=str):
+        """
+        Call push for each item in the thread pool. Failures are logged and counted, the
+        successful items are returned.
+        """
+
+        def run(item):
+            try:
+                push(item)
+                return True
+            except Exception:
+                log.exception('sync_push_failure', system=self.name, key=get_key(item))
+                return False
+
+        workers = min(settings.EXTERNAL_SYNC_WORKERS, len(items))
+        if workers <= 1:
+            results = [run(item) for item in items]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(run, items))
+
+        self.stats['errors'] += results.count(False)
+        return [item for item, result in zip(items, results) if result]
+
+    def remote_users(self):
+        return self.remote('users', self.get_remote_users)
+
+    def remote_groups(self):
+        return self.remote('groups', self.get_remote_groups)
+
+    def sync_entities(self, kind, entities, get_key, get_fields, remote, add, update):
+        """
+        Add entities missing in the remote listing and update entities with a changed
+        fingerprint. Returns the number of pushed entities.
+        """
+        snapshot = Snapshot(self.name, kind)
+        entities = [(get_key(entity), entity) for entity in entities]
+        snapshot.load(key for key, _ in entities)
+
+        changes = []
+        for key, entity in entities:
+            value = fingerprint(get_fields(entity))
+            if key not in remote:
+                changes.append((key, entity, value, add, 'added'))
+            elif snapshot.has_changed(key, value):
+                changes.append((key, entity, value, update, 'updated'))
+
+        def push(change):
+            key, entity, value, func, action = change
+            log.info('sync_push', system=self.name, kind=kind, key=key, action=action)
+            func(entity)
+
+        pushed = self.run_pushes(push, changes, lambda change: change[0])
+        for key, entity, value, func, action in pushed:
+            snapshot.set(key, value)
+            self.stats[action] += 1
+        snapshot.save()
+
+        return len(pushed)
+
+    def delete_excess_entities(self, kind, allowed_keys, remote, delete):
+        """
+        Delete remote entities without a matching internal entity.
+        """
+
+        def push(key):
+            log.warn('delete_excess', system=self.name, kind=kind, key=key)
+            delete(key)
+
+        deleted = self.run_pushes(push, list(set(remote) - set(allowed_keys)))
+        Snapshot(self.name, kind).delete(deleted)
+        self.stats['deleted'] += len(deleted)
+        return len(deleted)
+
     def sync_users(self, users):
-        for user in users:
-            if self.user_exists(user):
-                log.info('sync_update_user', user=user.username)
-                self.update_user(user)
-            else:
-                log.info('sync_add_user', user=user.username)
-                self.add_user(user)
+        return self.sync_entities(
+            'users', users, self.user_key, self.user_fields, self.remote_users(), self.add_user,
+            self.update_user
+        )
 
     def sync_groups(self, groups):
-        for group in groups:
-            if self.group_exists(group):
-                log.info('sync_update_group', group=group.name)
-                self.update_group(group)
-            else:
-                log.info('sync_add_group', group=group.name)
-                self.add_group(group)
+        return self.sync_entities(
+            'groups', groups, self.group_key, self.group_fields, self.remote_groups(),
+            self.add_group, self.update_group
+        )
+
+    def delete_excess_users(self, valid_users):
+        """
+        Delete excess users from the remote system.
+        """
+        valid_keys = [self.user_key(user) for user in valid_users]
+        return self.delete_excess_entities(
+            'users', valid_keys, self.remote_users(), self.delete_user
+        )
+
+    def delete_excess_groups(self, valid_groups):
+        """
+        Delete excess groups from the remote system.
+        """
+        valid_keys = [self.group_key(group) for group in valid_groups]
+        return self.delete_excess_entities(
+            'groups', valid_keys, self.remote_groups(), self.delete_group
+        )
 
     def migrate(self):
         """
@@ -34,6 +175,24 @@ class ExternalSystem:
         """
         pass
 
+    def get_remote_users(self):
+        """
+        List the users in the external system, returns a collection of user keys.
+        """
+        raise NotImplementedError
+
+    def user_key(self, user):
+        """
+        The key identifying the user in the external system.
+        """
+        raise NotImplementedError
+
+    def user_fields(self, user):
+        """
+        The user fields stored in the external system, used to detect changes.
+        """
+        raise NotImplementedError
+
     def add_user(self, user):
         """
         Add a user to the external system.
@@ -46,9 +205,9 @@ class ExternalSystem:
         """
         raise NotImplementedError
 
-    def delete_excess_users(self, valid_users):
+    def delete_user(self, key):
         """
-        Delete excess users from the remote system.
+        Delete a user from the external system.
         """
         raise NotImplementedError
 
@@ -58,6 +217,24 @@ class ExternalSystem:
         """
         return NotImplementedError
 
+    def get_remote_groups(self):
+        """
+        List the groups in the external system, returns a collection of group keys.
+        """
+        raise NotImplementedError
+
+    def group_key(self, group):
+        """
+        The key identifying the group in the external system.
+        """
+        raise NotImplementedError
+
+    def group_fields(self, group):
+        """
+        The group fields stored in the external system, used to detect changes.
+        """
+        raise NotImplementedError
+
     def add_group(self, group):
         """
         Add a group to the external system.
@@ -70,9 +247,9 @@ class ExternalSystem:
         """
         raise NotImplementedError
 
-    def delete_excess_groups(self, valid_groups):
+    def delete_group(self, key):
         """
-        Delete excess groups from the remote system.
+        Delete a group from the external system.
         """
         raise NotImplementedError
 
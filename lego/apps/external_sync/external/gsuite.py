@@ -1,8 +1,8 @@
-from django.conf import settings
+from googleapiclient.errors import HttpError
 from structlog import get_logger
 
 from lego.apps.email.models import EmailList
-from lego.apps.external_sync.base import ExternalSystem
+from lego.apps.external_sync.base import ExternalSystem, ThreadClients
 from lego.apps.external_sync.utils.gsuite import GSuiteLib
 
 log = get_logger()
@@ -16,7 +16,12 @@ class GSuiteSystem(ExternalSystem):
     name = 'gsuite'
 
     def __init__(self):
-        self.gsuite = GSuiteLib()
+        super().__init__()
+        self.clients = ThreadClients(GSuiteLib)
+
+    @property
+    def gsuite(self):
+        return self.clients.get()
 
     def migrate(self):
         pass
@@ -39,14 +44,35 @@ class GSuiteSystem(ExternalSystem):
         """
         return queryset.none()
 
+    def get_remote_users(self):
+        return {user['primaryEmail'] for user in self.gsuite.get_all_users()}
+
+    def user_key(self, user):
+        return user.internal_email_address
+
+    def user_fields(self, user):
+        return [
+            user.id, user.internal_email_address, user.first_name, user.last_name, user.email,
+            user.crypt_password_hash
+        ]
+
     def user_exists(self, user):
         return self.gsuite.user_exists(user.internal_email_address)
 
     def add_user(self, user):
-        return self.gsuite.add_user(
-            user.id, user.internal_email_address, user.first_name, user.last_name, user.email,
-            user.crypt_password_hash
-        )
+        """
+        Suspended users is not part of the user listing, these are updated instead. The update
+        removes the suspension.
+        """
+        try:
+            return self.gsuite.add_user(
+                user.id, user.internal_email_address, user.first_name, user.last_name, user.email,
+                user.crypt_password_hash
+            )
+        except HttpError as e:
+            if e.resp.status == 409:
+                return self.update_user(user)
+            raise
 
     def update_user(self, user):
         return self.gsuite.update_user(
@@ -54,16 +80,14 @@ class GSuiteSystem(ExternalSystem):
             user.crypt_password_hash
         )
 
-    def delete_excess_users(self, users):
-        allowed_users = [
-            f'{local_part}@{settings.GSUITE_DOMAIN}'
-            for local_part in users.values_list('internal_email_id', flat=True)
-        ]
-        existing_users = [user['primaryEmail'] for user in self.gsuite.get_all_users()]
-        excess_users = set(existing_users) - set(allowed_users)
-        for excess_user in excess_users:
-            log.warn('delete_excess_user', system=self.name, uid=excess_user)
-            self.gsuite.delete_user(excess_user)
+    def delete_user(self, key):
+        self.gsuite.delete_user(key)
+
+    def get_remote_groups(self):
+        """
+        Groups is not synced to GSuite, email lists are synced as extras.
+        """
+        return set()
 
     def group_exists(self, group):
         return False
@@ -74,32 +98,33 @@ class GSuiteSystem(ExternalSystem):
     def update_group(self, group):
         pass
 
-    def delete_excess_groups(self, groups):
-        pass
-
     """
     Extra sync of email lists.
     """
 
     def filter_extra(self):
-        return [EmailList.objects.all()]
+        return [EmailList.objects.prefetch_related('groups')]
+
+    def email_list_members(self, email_list):
+        return self.memoize(('members', email_list.id), email_list.members)
+
+    def email_list_fields(self, email_list):
+        return [email_list.name, sorted(self.email_list_members(email_list))]
 
     def sync_extra(self, email_lists):
-        for email_list in email_lists:
-            if self.gsuite.group_exists(email_list.email_address):
-                log.info('sync_update_email_list', email_list=email_list.email_address)
-                self.update_email_list(email_list)
-            else:
-                log.info('sync_add_email_list', email_list=email_list.email_address)
-                self.add_email_list(email_list)
+        remote_groups = self.remote('email_lists', self.gsuite.get_all_groups)
+        return self.sync_entities(
+            'email_lists', email_lists, lambda email_list: email_list.email_address,
+            self.email_list_fields, remote_groups, self.add_email_list, self.update_email_list
+        )
 
     def add_email_list(self, email_list):
         self.gsuite.add_group(email_list.name, email_list.email_address)
-        self.gsuite.set_memberships(email_list.email_address, email_list.members())
+        self.gsuite.set_memberships(email_list.email_address, self.email_list_members(email_list))
 
     def update_email_list(self, email_list):
         self.gsuite.update_group(email_list.email_address, email_list.name)
-        self.gsuite.set_memberships(email_list.email_address, email_list.members())
+        self.gsuite.set_memberships(email_list.email_address, self.email_list_members(email_list))
 
     def delete_excess_extra(self, email_lists):
         """
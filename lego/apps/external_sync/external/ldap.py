@@ -2,7 +2,7 @@ from django.conf import settings
 from django.db.models import Q
 from structlog import get_logger
 
-from lego.apps.external_sync.base import ExternalSystem
+from lego.apps.external_sync.base import ExternalSystem, ThreadClients
 from lego.apps.external_sync.utils.ldap import LDAPLib
 from lego.apps.users.constants import GROUP_COMMITTEE
 
@@ -24,7 +24,12 @@ class LDAPSystem(ExternalSystem):
     name = 'ldap'
 
     def __init__(self):
-        self.ldap = LDAPLib()
+        super().__init__()
+        self.clients = ThreadClients(LDAPLib)
+
+    @property
+    def ldap(self):
+        return self.clients.get()
 
     def migrate(self):
         """
@@ -45,6 +50,18 @@ class LDAPSystem(ExternalSystem):
         """
         return queryset.filter(Q(type=GROUP_COMMITTEE) | Q(name__in=settings.LDAP_GROUPS))
 
+    def get_remote_users(self):
+        return {str(user.uid) for user in self.ldap.get_all_users()}
+
+    def user_key(self, user):
+        return user.username
+
+    def user_fields(self, user):
+        """
+        Only the password is updated in LDAP.
+        """
+        return [user.crypt_password_hash]
+
     def user_exists(self, user):
         return bool(self.ldap.search_user(user.username))
 
@@ -61,30 +78,48 @@ class LDAPSystem(ExternalSystem):
             log.info('external_password_update', system=self.name, uid=user.username)
             self.ldap.change_password(user.username, user.crypt_password_hash)
 
-    def delete_excess_users(self, users):
-        allowed_users = users.values_list('username', flat=True)
-        existing_users = [str(user.uid) for user in self.ldap.get_all_users()]
-        excess_users = set(existing_users) - set(allowed_users)
-        for excess_user in excess_users:
-            log.warn('delete_excess_user', system=self.name, uid=excess_user)
-            self.ldap.delete_user(excess_user)
+    def delete_user(self, key):
+        self.ldap.delete_user(key)
+
+    def get_remote_groups(self):
+        """
+        Groups are identified by the gidNumber, the cn is used to delete and rename groups.
+        """
+        return {str(group.gidNumber): str(group.cn) for group in self.ldap.get_all_groups()}
+
+    def group_key(self, group):
+        return str(group.id)
+
+    def group_members(self, group):
+        return self.memoize(
+            ('members', group.id), lambda: list(
+                group.memberships.distinct('user').values_list('user__username', flat=True)
+            )
+        )
+
+    def group_fields(self, group):
+        return [group.name.lower(), sorted(self.group_members(group))]
 
     def group_exists(self, group):
         return bool(self.ldap.search_group(group.id))
 
     def add_group(self, group):
-        members = list(group.memberships.distinct('user').values_list('user__username', flat=True))
         self.ldap.add_group(group.id, group.name.lower())
-        self.ldap.update_group_members(group.name.lower(), members)
+        self.ldap.update_group_members(group.name.lower(), self.group_members(group))
 
     def update_group(self, group):
-        members = list(group.memberships.distinct('user').values_list('user__username', flat=True))
-        self.ldap.update_group_members(group.name.lower(), members)
-
-    def delete_excess_groups(self, groups):
-        allowed_groups = [name.lower() for name in groups.values_list('name', flat=True)]
-        existing_groups = [str(group.cn) for group in self.ldap.get_all_groups()]
-        excess_groups = set(existing_groups) - set(allowed_groups)
-        for excess_group in excess_groups:
-            log.warn('delete_excess_group', cn=excess_group)
-            self.ldap.delete_group(excess_group)
+        """
+        The cn is a part of the group DN, a renamed group is deleted and added with the new name.
+        """
+        cn = self.remote_groups().get(self.group_key(group))
+        if cn is not None and cn != group.name.lower():
+            log.info(
+                'external_group_rename', system=self.name, old_cn=cn, new_cn=group.name.lower()
+            )
+            self.ldap.delete_group(cn)
+            return self.add_group(group)
+
+        self.ldap.update_group_members(group.name.lower(), self.group_members(group))
+
+    def delete_group(self, key):
+        self.ldap.delete_group(self.remote_groups()[key])
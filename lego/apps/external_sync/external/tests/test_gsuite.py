@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import override_settings
+from googleapiclient.errors import HttpError
+
+from lego.apps.external_sync.utils.gsuite import GSuiteLib
+from lego.utils.test_utils import BaseTestCase
+
+
+def http_error(status, content=b''):
+    return HttpError(SimpleNamespace(status=status, reason=''), content)
+
+
+@override_settings(GSUITE_MAX_RETRIES=3)
+@mock.patch('lego.apps.external_sync.utils.gsuite.time.sleep')
+class GSuiteBackoffTestCase(BaseTestCase):
+    def setUp(self):
+        self.gsuite = GSuiteLib.__new__(GSuiteLib)
+        self.request = mock.Mock()
+
+    def test_rate_limited_request_is_retried(self, mock_sleep):
+        """Requests answered with rate limit errors are retried with a growing delay"""
+        self.request.execute.side_effect = [
+            http_error(403, b'{"reason": "userRateLimitExceeded"}'),
+            http_error(429),
+            dict(ok=True),
+        ]
+
+        self.assertEqual(self.gsuite.execute(self.request), {'ok': True})
+        self.assertEqual(mock_sleep.call_count, 2)
+        first_delay, second_delay = [args[0] for args, _ in mock_sleep.call_args_list]
+        self.assertLess(first_delay, second_delay)
+
+    def test_retries_are_bounded(self, mock_sleep):
+        """The error is raised when the retries are used up"""
+        self.request.execute.side_effect = http_error(503)
+
+        with self.assertRaises(HttpError):
+            self.gsuite.execute(self.request)
+        self.assertEqual(self.request.execute.call_count, 4)
+
+    def test_client_errors_are_not_retried(self, mock_sleep):
+        """Errors like not found and permission denied are raised right away"""
+        for error in [http_error(404), http_error(403, b'{"reason": "forbidden"}')]:
+            self.request.execute.reset_mock()
+            self.request.execute.side_effect = error
+            with self.assertRaises(HttpError):
+                self.gsuite.execute(self.request)
+            self.assertEqual(self.request.execute.call_count, 1)
+        mock_sleep.assert_not_called()
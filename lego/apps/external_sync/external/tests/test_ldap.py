@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from unittest import mock
 from unittest.mock import call
 
@@ -93,6 +94,21 @@ class LDAPTestCase(BaseTestCase):
         """Make sure memberships gets updated at group update"""
         group = AbakusGroup.objects.get(name='UserAdminTest')
         members = list(group.memberships.values_list('user__username', flat=True))
+        self.ldap.ldap.get_all_groups.return_value = [
+            SimpleNamespace(gidNumber=group.id, cn=group.name.lower())
+        ]
 
         self.ldap.update_group(group)
         self.ldap.ldap.update_group_members.assert_called_once_with(group.name.lower(), members)
+        self.ldap.ldap.delete_group.assert_not_called()
+
+    def test_update_renamed_group(self):
+        """The group is deleted and added again when the cn has changed"""
+        group = AbakusGroup.objects.get(name='UserAdminTest')
+        self.ldap.ldap.get_all_groups.return_value = [
+            SimpleNamespace(gidNumber=group.id, cn='oldname')
+        ]
+
+        self.ldap.update_group(group)
+        self.ldap.ldap.delete_group.assert_called_once_with('oldname')
+        self.ldap.ldap.add_group.assert_called_once_with(group.id, group.name.lower())
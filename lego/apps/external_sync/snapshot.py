@@ -0,0 +1,55 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+
+def fingerprint(fields):
+    """
+    Hash the fields an external system stores about an entity. Changes to fields the system
+    doesn't care about gives the same fingerprint.
+    """
+    data = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class Snapshot:
+    """
+    Fingerprints of the entities last pushed to an external system, stored in the cache without
+    a timeout. A missing fingerprint is treated as a change, so a cleared cache gives a full sync.
+    """
+
+    def __init__(self, system, kind):
+        self.prefix = f'external_sync:{system}:{kind}:'
+        self.fingerprints = {}
+        self.changed = {}
+
+    def load(self, keys):
+        """
+        Load the fingerprints of the given entity keys in one round trip.
+        """
+        prefixed = cache.get_many([f'{self.prefix}{key}' for key in keys])
+        self.fingerprints = {key[len(self.prefix):]: value for key, value in prefixed.items()}
+
+    def has_changed(self, key, value):
+        return self.fingerprints.get(key) != value
+
+    def set(self, key, value):
+        self.changed[key] = value
+
+    def save(self):
+        """
+        Store the fingerprints of the entities pushed during this run.
+        """
+        if self.changed:
+            cache.set_many(
+                {f'{self.prefix}{key}': value
+                 for key, value in self.changed.items()}, None
+            )
+            self.fingerprints.update(self.changed)
+            self.changed = {}
+
+    def delete(self, keys):
+        keys = list(keys)
+        if keys:
+            cache.delete_many([f'{self.prefix}{key}' for key in keys])
@@ -1,3 +1,8 @@
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 from structlog import get_logger
 
@@ -9,22 +14,30 @@ from .external.ldap import LDAPSystem
 log = get_logger()
 
 
+def lock_key(system_name):
+    return f'external_sync:lock:{system_name}'
+
+
 class Sync:
     """
-    Export users and groups to external systems.
-    We should split this into multiple celery tasks and add a lock at a later point.
+    Export users and groups to external systems. Each system pushes the entities changed since
+    the last run, see ExternalSystem.
+    Systems are synced by separate celery tasks, a lock per system prevents overlapping runs.
     """
 
-    def __init__(self):
-        self.systems = [
-            LDAPSystem(),
-        ]
+    def __init__(self, names=None):
+        self.systems = []
+        for system_cls in self.get_system_classes():
+            if names is not None and system_cls.name not in names:
+                continue
+            try:
+                self.systems.append(system_cls())
+            except ImproperlyConfigured:
+                pass
 
-        try:
-            gsuite = GSuiteSystem()
-            self.systems.append(gsuite)
-        except ImproperlyConfigured:
-            pass
+    @staticmethod
+    def get_system_classes():
+        return [LDAPSystem, GSuiteSystem]
 
     def lookup_querysets(self):
         users = User.objects.all()
@@ -32,39 +45,63 @@ class Sync:
         return users, groups
 
     def sync(self):
-
-        users, groups = self.lookup_querysets()
-
         for system in self.systems:
-            log.info('sync_migrate', system=system.name)
-            system.migrate()
+            self.sync_system(system)
+
+    def sync_system(self, system):
+        """
+        Sync one system, returns the sync statistics or None when another run holds the lock.
+        """
+        key = lock_key(system.name)
+        token = uuid4().hex
+        if not cache.add(key, token, settings.EXTERNAL_SYNC_LOCK_TIMEOUT):
+            log.warn('sync_locked', system=system.name)
+            return
+
+        start = time.perf_counter()
+        try:
+            self.run_system(system)
+        finally:
+            if cache.get(key) == token:
+                cache.delete(key)
+
+        log.info(
+            'sync_done', system=system.name,
+            duration_ms=round((time.perf_counter() - start) * 1000, 2), **system.stats
+        )
+        return system.stats
+
+    def run_system(self, system):
+        users, groups = self.lookup_querysets()
+        system.reset()
 
-            sync_users = system.filter_users(users)
-            sync_groups = system.filter_groups(groups)
+        log.info('sync_migrate', system=system.name)
+        system.migrate()
 
-            log.info('sync_users', system=system.name, users=sync_users.count())
-            system.sync_users(sync_users)
+        sync_users = system.filter_users(users)
+        sync_groups = system.filter_groups(groups)
 
-            log.info('sync_groups', system=system.name, groups=sync_groups.count())
-            system.sync_groups(sync_groups)
+        changes = system.sync_users(sync_users)
+        log.info('sync_users', system=system.name, changes=changes)
 
-            log.info('delete_excess_groups', system=system.name)
-            system.delete_excess_groups(sync_groups)
+        changes = system.sync_groups(sync_groups)
+        log.info('sync_groups', system=system.name, changes=changes)
 
-            log.info('delete_excess_users', system=system.name)
-            system.delete_excess_users(sync_users)
+        changes = system.delete_excess_groups(sync_groups)
+        log.info('delete_excess_groups', system=system.name, changes=changes)
 
-            extra_filter = getattr(system, 'filter_extra', None)
-            if extra_filter:
-                """
-                Sync extras if the system has implemented the 'filter_extra' function.
-                """
-                extras = extra_filter()
+        changes = system.delete_excess_users(sync_users)
+        log.info('delete_excess_users', system=system.name, changes=changes)
 
-                log.info('sync_extra', system=system.name)
-                system.sync_extra(*extras)
+        extra_filter = getattr(system, 'filter_extra', None)
+        if extra_filter:
+            """
+            Sync extras if the system has implemented the 'filter_extra' function.
+            """
+            extras = extra_filter()
 
-                log.info('delete_excess_extra', system=system.name)
-                system.delete_excess_extra(*extras)
+            changes = system.sync_extra(*extras)
+            log.info('sync_extra', system=system.name, changes=changes)
 
-            log.info('sync_done', system=system.name)
+            log.info('delete_excess_extra', system=system.name)
+            system.delete_excess_extra(*extras)
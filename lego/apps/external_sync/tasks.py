@@ -7,9 +7,22 @@ from .sync import Sync
 @celery_app.task(bind=True, base=AbakusTask)
 def sync_external_systems(self, logger_context=None):
     """
-    Sync external systems.
+    Sync external systems, each system is synced by a separate task.
     """
     self.setup_logger(logger_context)
 
-    sync = Sync()
-    sync.sync()
+    for system_cls in Sync.get_system_classes():
+        sync_external_system.delay(system_cls.name)
+
+
+@celery_app.task(bind=True, base=AbakusTask)
+def sync_external_system(self, name, logger_context=None):
+    """
+    Sync a single external system. The task returns right away if the system isn't configured
+    or another sync of the system is running.
+    """
+    self.setup_logger(logger_context)
+
+    sync = Sync(names=[name])
+    for system in sync.systems:
+        sync.sync_system(system)
@@ -0,0 +1,107 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from googleapiclient.errors import HttpError
+from ldap3.core.exceptions import LDAPNoSuchObjectResult
+
+
+class FakeLDAPLib:
+    """
+    In-memory replacement for LDAPLib, counts the calls made to the directory. Writes to missing
+    entries raises like a connection with raise_exceptions.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.calls = Counter()
+
+    def get_all_users(self):
+        self.calls['get_all_users'] += 1
+        return [SimpleNamespace(uid=uid) for uid in self.users]
+
+    def get_all_groups(self):
+        self.calls['get_all_groups'] += 1
+        return [SimpleNamespace(cn=cn, gidNumber=group['gid']) for cn, group in self.groups.items()]
+
+    def add_user(self, uid, first_name, last_name, email, password_hash):
+        self.calls['add_user'] += 1
+        self.users[uid] = password_hash
+
+    def delete_user(self, uid):
+        self.calls['delete_user'] += 1
+        self.users.pop(uid)
+
+    def check_password(self, uid, password_hash):
+        self.calls['check_password'] += 1
+        return self.users[uid] == password_hash
+
+    def change_password(self, uid, password_hash):
+        self.calls['change_password'] += 1
+        self.users[uid] = password_hash
+
+    def add_group(self, gid, name):
+        self.calls['add_group'] += 1
+        self.groups[name] = {'gid': gid, 'members': []}
+
+    def update_group_members(self, cn, members):
+        self.calls['update_group_members'] += 1
+        if cn not in self.groups:
+            raise LDAPNoSuchObjectResult()
+        self.groups[cn]['members'] = sorted(members)
+
+    def delete_group(self, cn):
+        self.calls['delete_group'] += 1
+        if cn not in self.groups:
+            raise LDAPNoSuchObjectResult()
+        self.groups.pop(cn)
+
+    def update_organization_unit(self, name):
+        pass
+
+
+class FakeGSuiteLib:
+    """
+    In-memory replacement for GSuiteLib. Suspended users are left out of the user listing, like
+    the query used by GSuiteLib.get_all_users.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.calls = Counter()
+
+    def get_all_users(self):
+        self.calls['get_all_users'] += 1
+        active = [user_key for user_key, user in self.users.items() if not user['suspended']]
+        return [dict(primaryEmail=user_key) for user_key in active]
+
+    def add_user(self, user_id, user_key, first_name, last_name, email, password_hash):
+        self.calls['add_user'] += 1
+        if user_key in self.users:
+            raise HttpError(SimpleNamespace(status=409, reason='Conflict'), b'')
+        self.users[user_key] = {'password': password_hash, 'suspended': False}
+
+    def update_user(self, user_id, user_key, first_name, last_name, email, password_hash):
+        self.calls['update_user'] += 1
+        self.users[user_key] = {'password': password_hash, 'suspended': False}
+
+    def delete_user(self, user_key):
+        self.calls['delete_user'] += 1
+        self.users[user_key]['suspended'] = True
+
+    def get_all_groups(self):
+        self.calls['get_all_groups'] += 1
+        return set(self.groups)
+
+    def add_group(self, name, group_key):
+        self.calls['add_group'] += 1
+        self.groups[group_key] = {'name': name, 'members': set()}
+
+    def update_group(self, group_key, name):
+        self.calls['update_group'] += 1
+        self.groups[group_key]['name'] = name
+
+    def set_memberships(self, group_key, member_keys):
+        self.calls['set_memberships'] += 1
+        self.groups[group_key]['members'] = set(member_keys)
@@ -0,0 +1,154 @@
+from unittest import mock
+
+from lego.apps.email.models import EmailAddress, EmailList
+from lego.apps.external_sync.external.gsuite import GSuiteSystem
+from lego.apps.external_sync.external.ldap import LDAPSystem
+from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseTestCase
+
+from .fakes import FakeGSuiteLib, FakeLDAPLib
+
+
+def run_sync(system, users, groups):
+    system.reset()
+    system.sync_users(users)
+    system.sync_groups(groups)
+    system.delete_excess_groups(groups)
+    system.delete_excess_users(users)
+
+
+class LDAPIncrementalSyncTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    @mock.patch('lego.apps.external_sync.external.ldap.LDAPLib', FakeLDAPLib)
+    def setUp(self):
+        self.system = LDAPSystem()
+        self.ldap = self.system.ldap
+        self.users = User.objects.filter(username='test1')
+        self.groups = AbakusGroup.objects.filter(name='UserAdminTest')
+
+    def test_first_run_adds_everything(self):
+        """Test that entities missing in the directory are added after one listing"""
+        run_sync(self.system, self.users, self.groups)
+
+        self.assertEqual(self.ldap.calls['get_all_users'], 1)
+        self.assertEqual(self.ldap.calls['get_all_groups'], 1)
+        self.assertEqual(self.ldap.users, {'test1': self.users.get().crypt_password_hash})
+        self.assertEqual(
+            self.ldap.groups['useradmintest']['members'],
+            sorted(self.groups.get().memberships.values_list('user__username', flat=True))
+        )
+
+    def test_unchanged_entities_are_skipped(self):
+        """Test that a second run without changes doesn't push anything"""
+        run_sync(self.system, self.users, self.groups)
+        self.ldap.calls.clear()
+
+        run_sync(self.system, self.users, self.groups)
+        self.assertEqual(set(self.ldap.calls), {'get_all_users', 'get_all_groups'})
+
+    def test_changed_password_is_pushed(self):
+        """Test that only the user with a changed password hash is updated"""
+        run_sync(self.system, self.users, self.groups)
+        self.ldap.calls.clear()
+        self.users.update(crypt_password_hash='changed')
+
+        run_sync(self.system, self.users, self.groups)
+        self.assertEqual(self.ldap.users['test1'], 'changed')
+        self.assertEqual(self.ldap.calls['change_password'], 1)
+        self.assertEqual(self.ldap.calls['update_group_members'], 0)
+
+    def test_changed_membership_is_pushed(self):
+        """Test that new members updates the group"""
+        run_sync(self.system, self.users, self.groups)
+        self.groups.get().add_user(User.objects.get(username='test2'))
+
+        run_sync(self.system, self.users, self.groups)
+        self.assertIn('test2', self.ldap.groups['useradmintest']['members'])
+
+    def test_excess_entities_are_deleted(self):
+        """Test that entities without an internal match are deleted and forgotten"""
+        run_sync(self.system, self.users, self.groups)
+
+        run_sync(self.system, User.objects.none(), AbakusGroup.objects.none())
+        self.assertEqual(self.ldap.users, {})
+        self.assertEqual(self.ldap.groups, {})
+
+        run_sync(self.system, self.users, self.groups)
+        self.assertIn('test1', self.ldap.users)
+
+    def test_renamed_group_is_replaced(self):
+        """Test that a renamed group is deleted and added with the new cn"""
+        group = self.groups.get()
+        groups = AbakusGroup.objects.filter(pk=group.pk)
+        run_sync(self.system, self.users, groups)
+        members = self.ldap.groups['useradmintest']['members']
+        groups.update(name='Renamed')
+
+        run_sync(self.system, self.users, groups)
+        self.assertEqual(self.ldap.groups, {'renamed': {'gid': group.id, 'members': members}})
+        self.assertEqual(self.ldap.calls['delete_group'], 1)
+
+    def test_failed_push_is_retried(self):
+        """Test that a failed update isn't stored in the snapshot"""
+        run_sync(self.system, self.users, self.groups)
+        self.groups.get().add_user(User.objects.get(username='test2'))
+
+        with mock.patch.object(self.ldap, 'update_group_members', side_effect=Exception):
+            run_sync(self.system, self.users, self.groups)
+        self.assertEqual(self.system.stats['errors'], 1)
+
+        run_sync(self.system, self.users, self.groups)
+        self.assertIn('test2', self.ldap.groups['useradmintest']['members'])
+
+
+class GSuiteIncrementalSyncTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    @mock.patch('lego.apps.external_sync.external.gsuite.GSuiteLib', FakeGSuiteLib)
+    def setUp(self):
+        self.system = GSuiteSystem()
+        self.gsuite = self.system.gsuite
+
+        self.user = User.objects.get(username='test1')
+        self.user.internal_email = EmailAddress.objects.create(email='test1')
+        self.user.save()
+        self.users = User.objects.filter(pk=self.user.pk)
+
+        self.email_list = EmailList.objects.create(
+            name='List', email=EmailAddress.objects.create(email='list')
+        )
+        self.email_list.users.add(self.user)
+
+    def run_sync(self):
+        run_sync(self.system, self.users, AbakusGroup.objects.none())
+        self.system.sync_extra(*self.system.filter_extra())
+
+    def test_unchanged_entities_are_skipped(self):
+        """Test that only the listings are requested when nothing has changed"""
+        self.run_sync()
+        self.assertEqual(self.gsuite.calls['add_user'], 1)
+        self.assertEqual(self.gsuite.calls['set_memberships'], 1)
+        self.gsuite.calls.clear()
+
+        self.run_sync()
+        self.assertEqual(set(self.gsuite.calls), {'get_all_users', 'get_all_groups'})
+
+    def test_changed_email_list_is_pushed(self):
+        """Test that a renamed email list is updated"""
+        self.run_sync()
+        self.email_list.name = 'Renamed'
+        self.email_list.save()
+
+        self.run_sync()
+        self.assertEqual(self.gsuite.groups['list@abakus.no']['name'], 'Renamed')
+
+    def test_suspended_user_is_restored(self):
+        """Test that suspended users missing in the listing are updated instead of added"""
+        self.run_sync()
+        self.gsuite.delete_user(self.user.internal_email_address)
+
+        self.run_sync()
+        self.assertFalse(self.gsuite.users[self.user.internal_email_address]['suspended'])
@@ -1,9 +1,16 @@
+from collections import Counter
 from unittest import mock
 
-from lego.apps.external_sync.sync import Sync
+from django.core.cache import cache
+from django.test import override_settings
+
+from lego.apps.external_sync.external.ldap import LDAPSystem
+from lego.apps.external_sync.sync import Sync, lock_key
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseTestCase
 
+from .fakes import FakeLDAPLib
+
 
 class SyncTestCase(BaseTestCase):
     """
@@ -17,6 +24,8 @@ class SyncTestCase(BaseTestCase):
         self.groups = AbakusGroup.objects.all()
 
         self.system_mock = mock.Mock()
+        self.system_mock.name = 'mock'
+        self.system_mock.stats = Counter()
         self.sync = Sync()
         self.sync.systems = [self.system_mock]
 
@@ -39,3 +48,63 @@ class SyncTestCase(BaseTestCase):
 
         self.system_mock.delete_excess_groups.assert_called_once_with(self.groups)
         self.system_mock.delete_excess_users.assert_called_once_with(self.users)
+
+    def test_sync_is_skipped_while_locked(self):
+        """Another run holds the lock, the system is left alone"""
+        cache.set(lock_key('mock'), 'other', 60)
+
+        self.assertIsNone(self.sync.sync_system(self.system_mock))
+        self.system_mock.sync_users.assert_not_called()
+        self.assertEqual(cache.get(lock_key('mock')), 'other')
+
+    def test_lock_is_released(self):
+        """The lock is released after a run, also when the run fails"""
+        self.system_mock.filter_extra = None
+        self.system_mock.sync_users.side_effect = RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            self.sync.sync_system(self.system_mock)
+        self.assertIsNone(cache.get(lock_key('mock')))
+
+
+@override_settings(EXTERNAL_SYNC_WORKERS=4)
+class ConcurrentSyncTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    def setUp(self):
+        self.ldap = FakeLDAPLib()
+        with mock.patch('lego.apps.external_sync.external.ldap.LDAPLib', lambda: self.ldap):
+            self.system = LDAPSystem()
+
+        self.users = User.objects.all()
+        User.objects.update(crypt_password_hash='hash')
+        self.groups = AbakusGroup.objects.all()
+
+    def test_pushes_run_in_worker_threads(self):
+        """All changes are pushed by the thread pool, and counted in the stats"""
+        self.system.sync_users(self.users)
+        self.system.sync_groups(self.groups)
+
+        self.assertEqual(set(self.ldap.users), set(self.users.values_list('username', flat=True)))
+        self.assertEqual(len(self.ldap.groups), self.groups.count())
+        self.assertEqual(self.system.stats['added'], self.users.count() + self.groups.count())
+
+    def test_failed_pushes_are_counted_and_retried(self):
+        """A failing push doesn't stop the others, and is pushed again on the next run"""
+        add_user = self.ldap.add_user
+
+        def failing_add_user(uid, *args):
+            if uid == 'test1':
+                raise RuntimeError()
+            return add_user(uid, *args)
+
+        self.ldap.add_user = failing_add_user
+        self.system.sync_users(self.users)
+        self.assertEqual(self.system.stats['errors'], 1)
+        self.assertNotIn('test1', self.ldap.users)
+
+        self.ldap.add_user = add_user
+        self.system.reset()
+        self.assertEqual(self.system.sync_users(self.users), 1)
+        self.assertIn('test1', self.ldap.users)
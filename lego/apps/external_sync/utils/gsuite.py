@@ -1,15 +1,23 @@
+import random
+import time
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from httplib2 import Http
 from oauth2client.service_account import ServiceAccountCredentials
+from structlog import get_logger
+
+log = get_logger()
 
 scopes = [
     'https://www.googleapis.com/auth/admin.directory.user',
     'https://www.googleapis.com/auth/admin.directory.group'
 ]
 
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 class GSuiteLib:
     """
@@ -36,8 +44,34 @@ class GSuiteLib:
         )
         return credentials.create_delegated(settings.GSUITE_DELEGATED_ACCOUNT)
 
+    def should_retry(self, error):
+        """
+        Retry rate limited requests and server errors. The API answers 403 with the reason
+        rateLimitExceeded or userRateLimitExceeded when the quota is used up.
+        """
+        status = error.resp.status
+        if status in RETRY_STATUSES:
+            return True
+        content = error.content.decode(errors='ignore') if error.content else ''
+        return status == 403 and 'ratelimitexceeded' in content.lower()
+
+    def execute(self, request):
+        """
+        Execute a request, retry with exponential backoff and jitter when the API is rate
+        limited.
+        """
+        for attempt in range(settings.GSUITE_MAX_RETRIES + 1):
+            try:
+                return request.execute()
+            except HttpError as e:
+                if attempt == settings.GSUITE_MAX_RETRIES or not self.should_retry(e):
+                    raise
+                delay = min(2**attempt + random.random(), settings.GSUITE_MAX_BACKOFF)
+                log.warn('gsuite_backoff', status=e.resp.status, attempt=attempt, delay=delay)
+                time.sleep(delay)
+
     def get_user(self, user_key):
-        return self.client.users().get(userKey=user_key).execute()
+        return self.execute(self.client.users().get(userKey=user_key))
 
     def user_exists(self, user_key):
         try:
@@ -49,7 +83,7 @@ class GSuiteLib:
             raise
 
     def add_user(self, user_id, user_key, first_name, last_name, email, password_hash):
-        return self.client.users().insert(
+        request = self.client.users().insert(
             body={
                 'name': {
                     'givenName': first_name,
@@ -68,10 +102,11 @@ class GSuiteLib:
                     'type': 'other'
                 }]
             }
-        ).execute()
+        )
+        return self.execute(request)
 
     def update_user(self, user_id, user_key, first_name, last_name, email, password_hash):
-        return self.client.users().update(
+        request = self.client.users().update(
             userKey=user_key, body={
                 'suspended': False,
                 'name': {
@@ -89,14 +124,16 @@ class GSuiteLib:
                     'type': 'other'
                 }]
             }
-        ).execute()
+        )
+        return self.execute(request)
 
     def delete_user(self, user_key):
         """
         The delete method is actually just to suspend the user.
         """
         if user_key not in settings.GSUITE_EXTERNAL_USERS:
-            return self.client.users().update(userKey=user_key, body={'suspended': True}).execute()
+            request = self.client.users().update(userKey=user_key, body={'suspended': True})
+            return self.execute(request)
 
     def get_all_users(self):
         """
@@ -107,7 +144,7 @@ class GSuiteLib:
         request = api.list(domain='abakus.no', query='isSuspended=false')
 
         while request is not None:
-            users_response = request.execute()
+            users_response = self.execute(request)
 
             remote_users = users_response.get('users', [])
             users = users + remote_users
@@ -116,8 +153,23 @@ class GSuiteLib:
 
         return users
 
+    def get_all_groups(self):
+        """
+        Retrieve the email addresses of all groups on Google GSuite.
+        """
+        groups = set()
+        api = self.client.groups()
+        request = api.list(domain=settings.GSUITE_DOMAIN)
+
+        while request is not None:
+            groups_response = self.execute(request)
+            groups.update(group['email'] for group in groups_response.get('groups', []))
+            request = api.list_next(request, groups_response)
+
+        return groups
+
     def get_group(self, group_key):
-        return self.client.groups().get(groupKey=group_key).execute()
+        return self.execute(self.client.groups().get(groupKey=group_key))
 
     def group_exists(self, group_key):
         try:
@@ -129,10 +181,12 @@ class GSuiteLib:
             raise
 
     def add_group(self, name, group_key):
-        return self.client.groups().insert(body={'name': name, 'email': group_key}).execute()
+        request = self.client.groups().insert(body={'name': name, 'email': group_key})
+        return self.execute(request)
 
     def update_group(self, group_key, name):
-        return self.client.groups().update(groupKey=group_key, body={'name': name}).execute()
+        request = self.client.groups().update(groupKey=group_key, body={'name': name})
+        return self.execute(request)
 
     def get_members(self, group_key):
         members = []
@@ -141,7 +195,7 @@ class GSuiteLib:
             request = api.list(groupKey=group_key)
 
             while request is not None:
-                members_response = request.execute()
+                members_response = self.execute(request)
 
                 remote_members = members_response.get('members', [])
                 members = members + remote_members
@@ -169,12 +223,13 @@ class GSuiteLib:
         The API returns 404 when we try to add an unknown gmail account.
         """
         try:
-            return self.client.members().insert(
+            request = self.client.members().insert(
                 groupKey=group_key, body={
                     'role': role,
                     'email': user_key
                 }
-            ).execute()
+            )
+            return self.execute(request)
         except HttpError as e:
             if e.resp.status == 404:
                 return
@@ -185,7 +240,8 @@ class GSuiteLib:
 
     def delete_membership(self, group_key, user_key):
         try:
-            return self.client.members().delete(groupKey=group_key, memberKey=user_key).execute()
+            request = self.client.members().delete(groupKey=group_key, memberKey=user_key)
+            return self.execute(request)
         except HttpError as e:
             if e.resp.status == 404:
                 # OK, does not exists anyway
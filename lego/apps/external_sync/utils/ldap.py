@@ -4,9 +4,10 @@ from ldap3 import MODIFY_DELETE, MODIFY_REPLACE, Connection
 
 class LDAPLib:
     def __init__(self):
+        # Failed writes should raise, the sync only stores the state of successful pushes.
         self.connection = Connection(
             server=settings.LDAP_SERVER, user=settings.LDAP_USER, password=settings.LDAP_PASSWORD,
-            auto_bind=True
+            auto_bind=True, raise_exceptions=True
         )
 
         self.user_base = ','.join(('ou=users', settings.LDAP_BASE_DN))
@@ -1,20 +1,34 @@
 from django.utils import timezone
-
-from lego.apps.feeds.serializers import FeedActivitySerializer
+from django.utils.dateparse import parse_datetime
 
 from . import verbs
 
 
-class Activity:
+def encode_time(value):
+    """
+    Same format as the DRF DateTimeField, ISO 8601 with Z as the UTC offset.
+    """
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
 
-    object_id = None
-    object_content_type = None
+def decode_time(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Invalid activity time {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
-    actor_id = None
-    actor_content_type = None
 
-    target_id = None
-    target_content_type = None
+class Activity:
+
+    __slots__ = (
+        'verb', 'time', 'extra_context', 'actor_id', 'actor_content_type', 'object_id',
+        'object_content_type', 'target_id', 'target_content_type'
+    )
 
     def __init__(self, actor, verb, object, target=None, time=None, extra_context=None):
         if isinstance(verb, int):
@@ -93,28 +107,46 @@ class Activity:
             raise ValueError(
                 'Can only compare to Activity not %r of type %s' % (other, type(other))
             )
-        return self.serialization_id == other.serialization_id
+        return self.activity_id == other.activity_id
 
     def __lt__(self, other):
-        return self.serialization_id < other.serialization_id
+        return self.activity_id < other.activity_id
 
     def __hash__(self):
-        return hash(self.serialization_id)
+        return hash(self.activity_id)
 
     def serialize(self):
-        serializer = FeedActivitySerializer(self)
-        return serializer.data
+        """
+        Encode the activity as a dict. The output is identical to the FeedActivitySerializer, the
+        format is stored in the activity_store of the feeds and returned by the feed API.
+        """
+        return {
+            'activity_id': str(self.activity_id),
+            'verb': self.verb.id,
+            'time': encode_time(self.time),
+            'extra_context': self.extra_context,
+            'actor': self.actor,
+            'object': self.object,
+            'target': self.target,
+        }
 
     @classmethod
     def deserialize(cls, data):
-        serializer = FeedActivitySerializer(data=data)
-        serializer.is_valid(raise_exception=True)
-
-        verb_id = serializer.validated_data['verb']['id']
-
-        return cls(
-            actor=serializer.validated_data['actor'], verb=verb_id,
-            object=serializer.validated_data['object'],
-            target=serializer.validated_data.get('target'), time=serializer.validated_data['time'],
-            extra_context=serializer.validated_data['extra_context']
-        )
+        """
+        Decode an activity created by serialize. This is called for every activity in a feed
+        page, the instance is populated directly instead of validating the data with DRF.
+        """
+        if not data.get('object'):
+            raise ValueError(f'Invalid activity {data!r}')
+
+        activity = cls.__new__(cls)
+        try:
+            activity.verb = verbs.verbs[int(data['verb'])]
+            activity.time = decode_time(data['time'])
+            activity._set_instance_fields('object', data['object'])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f'Invalid activity {data!r}') from e
+        activity._set_instance_fields('actor', data.get('actor'))
+        activity._set_instance_fields('target', data.get('target'))
+        activity.extra_context = data.get('extra_context') or {}
+        return activity
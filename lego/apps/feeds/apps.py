@@ -1,4 +1,5 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
 
 
 class FeedsConfig(AppConfig):
@@ -7,6 +8,11 @@ class FeedsConfig(AppConfig):
 
     def ready(self):
         super().ready()
-        """
-        """
+        from .attr_cache import AttrCache
+        from .signals import attr_cache_invalidation_callback
         from .verbs import verbs  # noqa
+
+        for content_type in set(AttrCache.RENDERS) | set(AttrCache.DEPENDENCIES):
+            model = apps.get_model(content_type)
+            for signal in [post_save, post_delete]:
+                signal.connect(attr_cache_invalidation_callback, sender=model)
@@ -1,4 +1,9 @@
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
 from django.core.cache import cache
+from django.db import transaction
 from structlog import get_logger
 
 from lego.utils.content_types import string_to_model_cls
@@ -8,17 +13,78 @@ from . import attr_renderers
 log = get_logger()
 
 
+class LocalLRUCache:
+    """
+    Bounded in-process cache, the least recently used entries are removed first.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        result = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires < now:
+                    del self.entries[key]
+                    continue
+                self.entries.move_to_end(key)
+                result[key] = value
+        return result
+
+    def set_many(self, items, timeout):
+        expires = time.monotonic() + timeout
+        with self.lock:
+            for key, value in items.items():
+                self.entries[key] = (expires, value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
 class AttrCache:
     """
     The feed contains a lot of content strings, it's heavy to lookup all these values
-    on each request. The AttrCache stores the lookups for an small amount of time to reduce the
-    load on the database.
+    on each request. The AttrCache stores the lookups in two tiers, a small in-process LRU cache
+    in front of the shared cache.
 
-    We don't do any invalidation, the cached values is only stored for a small amount of time.
+    Cached values are removed from the shared cache when the instance is saved or deleted, see
+    the signals in the feeds app. Other processes may keep a value in the local tier for
+    LOCAL_TIMEOUT seconds after an invalidation.
     """
 
     CACHE_KEY = 'feed_attr_cache_'
 
+    LOCAL_TIMEOUT = 30
+    LOCAL_MAX_SIZE = 4096
+    DEFAULT_TIMEOUT = 60 * 60
+    TIMEOUTS = {
+        'users.user': 60 * 60 * 6,
+        # Event.register_batch updates registrations in bulk without signals, the short timeout
+        # limits how long a stale registration is rendered.
+        'events.registration': 60,
+    }
+
+    local_cache = LocalLRUCache(LOCAL_MAX_SIZE)
+    # Hits and misses by content type and tier, counted in this process.
+    statistics = defaultdict(Counter)
+
     RENDERS = {
         'users.user': attr_renderers.render_user,
         'events.event': attr_renderers.render_event,
@@ -31,31 +97,107 @@ class AttrCache:
         'restricted.restrictedmail': attr_renderers.render_restricted_mail
     }
 
-    RELATED_FIELDS = {'meetings.meetinginvitation': ['meeting']}
+    # Renders that include fields from a related model, the cached values of the
+    # dependent content type is invalidated when the related instance changes.
+    # {related content type: [(dependent content type, foreign key), ...]}
+    DEPENDENCIES = {
+        'meetings.meeting': [('meetings.meetinginvitation', 'meeting')],
+        'gallery.gallery': [('gallery.gallerypicture', 'gallery')],
+    }
+
+    @staticmethod
+    def get_content_type(content_string):
+        return content_string.split('-', maxsplit=1)[0]
+
+    def count(self, content_strings, tier):
+        for content_string in content_strings:
+            self.statistics[self.get_content_type(content_string)][tier] += 1
 
     def lookup_cache(self, content_strings):
         """
-        Lookup cache keys
+        Lookup cache keys, the local tier first and the shared cache for the remaining keys.
         """
+        values = self.local_cache.get_many(content_strings)
+        self.count(values.keys(), 'local_hits')
+
+        remaining = [
+            content_string for content_string in content_strings if content_string not in values
+        ]
+        if not remaining:
+            return values
+
         cache_result = cache.get_many(
-            [self.CACHE_KEY + content_string for content_string in content_strings]
+            [self.CACHE_KEY + content_string for content_string in remaining]
         )
 
         # Remove the cache_key prefix
-        values = {}
+        shared_values = {}
         for key, value in cache_result.items():
-            values[key[len(self.CACHE_KEY):]] = value
+            shared_values[key[len(self.CACHE_KEY):]] = value
 
+        self.count(shared_values.keys(), 'shared_hits')
+        self.local_cache.set_many(shared_values, self.LOCAL_TIMEOUT)
+        values.update(shared_values)
         return values
 
     def save_lookups(self, items):
         """
-        Cache the items we looked up for a small amount of time.
+        Cache the items we looked up, the timeout in the shared cache depends on the content type.
         """
-        cache.set_many(
-            {f'{self.CACHE_KEY}{key}': value
-             for key, value in items.items()}, timeout=60
-        )
+        by_timeout = {}
+        for key, value in items.items():
+            timeout = self.TIMEOUTS.get(self.get_content_type(key), self.DEFAULT_TIMEOUT)
+            by_timeout.setdefault(timeout, {})[f'{self.CACHE_KEY}{key}'] = value
+
+        for timeout, values in by_timeout.items():
+            cache.set_many(values, timeout=timeout)
+        self.local_cache.set_many(items, self.LOCAL_TIMEOUT)
+
+    @classmethod
+    def invalidate(cls, content_strings):
+        """
+        Remove content strings from both tiers. The shared cache is cleared again when the
+        transaction commits, a concurrent lookup may have cached the old value.
+        """
+        keys = [cls.CACHE_KEY + content_string for content_string in content_strings]
+        if not keys:
+            return
+
+        def delete():
+            cache.delete_many(keys)
+            cls.local_cache.delete_many(content_strings)
+
+        delete()
+        transaction.on_commit(delete)
+
+    @classmethod
+    def invalidate_instance(cls, instance):
+        content_type = f'{instance._meta.app_label}.{instance._meta.model_name}'
+        content_strings = [f'{content_type}-{instance.pk}']
+
+        for dependent, field in cls.DEPENDENCIES.get(content_type, []):
+            model = string_to_model_cls(dependent)
+            pks = model.objects.filter(**{field: instance.pk}).values_list('pk', flat=True)
+            content_strings += [f'{dependent}-{pk}' for pk in pks]
+
+        cls.invalidate(content_strings)
+
+    @classmethod
+    def get_statistics(cls):
+        """
+        Returns the hit counters and hit rate for each content type in this process.
+        """
+        result = {}
+        for content_type, counter in cls.statistics.items():
+            hits = counter['local_hits'] + counter['shared_hits']
+            total = hits + counter['misses']
+            result[content_type] = {
+                'local_hits': counter['local_hits'],
+                'shared_hits': counter['shared_hits'],
+                'misses': counter['misses'],
+                'hit_rate': hits / total if total else 0.0,
+            }
+        return result
 
     def extract_properties(self, content_type, ids):
         """
@@ -70,9 +212,14 @@ class AttrCache:
             return []
 
         # We need to use getattr on objects because we need to support custom object properties.
-        # .values() would have been much better if this wasn't a requirement...
-        related_fields = self.RELATED_FIELDS.get(content_type, [])
-        queryset = model.objects.filter(pk__in=list(ids)).select_related(*related_fields)
+        # Renderers declare the fields they use, only these fields are loaded.
+        queryset = model.objects.filter(pk__in=list(ids))
+        related_fields = getattr(render, 'related', ())
+        if related_fields:
+            queryset = queryset.select_related(*related_fields)
+        fields = getattr(render, 'fields', None)
+        if fields:
+            queryset = queryset.only(*fields)
         result = {}
 
         for instance in queryset:
@@ -118,7 +265,8 @@ class AttrCache:
         """
         result = self.lookup_cache(content_strings)
 
-        lookup_required = content_strings - set(result.keys())
+        lookup_required = set(content_strings) - set(result.keys())
+        self.count(lookup_required, 'misses')
         lookup_groups = self.filter_lookup(lookup_required)
 
         lookups = {}
@@ -127,7 +275,8 @@ class AttrCache:
             lookup = self.extract_properties(content_type, ids)
             lookups.update(lookup)
 
-        self.save_lookups(lookups)
+        if lookups:
+            self.save_lookups(lookups)
 
         result.update(lookups)
 
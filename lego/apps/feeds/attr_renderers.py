@@ -1,6 +1,21 @@
 from lego.apps.files.thumbor import generate_url
 
 
+def render_fields(*fields, related=()):
+    """
+    Declare the model fields a renderer uses. The AttrCache only loads these fields, and joins
+    the related fields with select_related.
+    """
+
+    def decorator(render):
+        render.fields = fields
+        render.related = related
+        return render
+
+    return decorator
+
+
+@render_fields('id', 'username', 'first_name', 'last_name', 'picture', 'gender')
 def render_user(user):
     return {
         'id': user.id,
@@ -11,10 +26,15 @@ def render_user(user):
     }
 
 
+@render_fields('id', 'title', 'event_type')
 def render_event(event):
     return {'id': event.id, 'title': event.title, 'event_type': event.event_type}
 
 
+@render_fields(
+    'id', 'meeting', 'meeting__title', 'meeting__start_time', 'meeting__location',
+    related=['meeting']
+)
 def render_meeting_invitation(meeting_invitation):
     return {
         'id': meeting_invitation.id,
@@ -27,14 +47,17 @@ def render_meeting_invitation(meeting_invitation):
     }
 
 
+@render_fields('id', 'title')
 def render_article(article):
     return {'id': article.id, 'title': article.title}
 
 
+@render_fields('id', 'message')
 def render_announcement(announcement):
     return {'id': announcement.id, 'message': announcement.message}
 
 
+@render_fields('id', 'gallery', 'gallery__title', related=['gallery'])
 def render_gallery_picture(gallery_picture):
     return {
         'id': gallery_picture.id,
@@ -58,14 +81,17 @@ def render_abakus_group(abakus_group):
     }
 
 
+@render_fields('id', 'pool', 'unregistration_date')
 def render_registration(registration):
-    pool = registration.pool
+    # Only the pool id is needed, accessing the pool would query the database.
+    pool_id = registration.pool_id
     return {
         'id': registration.id,
-        'waiting_list': pool is None and registration.unregistration_date is None,
-        'registered': not (pool is None and registration.unregistration_date),
+        'waiting_list': pool_id is None and registration.unregistration_date is None,
+        'registered': not (pool_id is None and registration.unregistration_date),
     }
 
 
+@render_fields('id')
 def render_restricted_mail(restrictedmail):
     return {'id': restrictedmail.id}
@@ -1,3 +1,5 @@
+import math
+
 from lego.apps.feeds.constants import ADD, REMOVE
 
 from .tasks import feed_fanout
@@ -6,7 +8,11 @@ from .utils import chunks
 
 class FeedManager:
 
+    # Smallest chunk size, small fanouts are split into chunks of this size.
     fanout_chunk_size = 10
+    # Large fanouts are divided into at most this many tasks, bounded by the
+    # `fanout_max_chunk_size` of the feed.
+    fanout_max_tasks = 20
 
     def add_activity(self, activity, recipients, feed_classes):
         for feed in feed_classes:
@@ -22,16 +28,27 @@ class FeedManager:
     def retrieve_feed(self, feed_class, feed_id):
         return feed_class.objects.filter(feed_id=str(feed_id))
 
+    def get_chunk_size(self, feed, recipient_count):
+        """
+        Returns the number of recipients per fanout task. The chunk size grows with the number of
+        recipients, an activity for 3000 recipients is split into 20 tasks instead of 300.
+        """
+        chunk_size = math.ceil(recipient_count / self.fanout_max_tasks)
+        return max(self.fanout_chunk_size, min(chunk_size, feed.fanout_max_chunk_size))
+
     def _feed_operation(self, operation, activity, recipients, feed):
         """
         Divide the fanout task into multiple celery tasks
         """
+        # The activity is serialized once and shared by all chunks.
+        payload = activity.serialize()
+        feed_name = feed._meta.model_name
         if recipients:
-            recipient_chunks = chunks(list(recipients), self.fanout_chunk_size)
-            for chunk in recipient_chunks:
-                feed_fanout.delay(operation, activity.serialize(), chunk, feed._meta.model_name)
+            chunk_size = self.get_chunk_size(feed, len(recipients))
+            for chunk in chunks(list(recipients), chunk_size):
+                feed_fanout.delay(operation, payload, chunk, feed_name)
         else:
-            feed_fanout.delay(operation, activity.serialize(), [], feed._meta.model_name)
+            feed_fanout.delay(operation, payload, [], feed_name)
 
 
 feed_manager = FeedManager()
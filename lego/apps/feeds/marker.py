@@ -4,6 +4,9 @@ from lego.apps.feeds.storage import RedisListStorage
 class MarkerModelMixin:
     """
     The marker model mixin is responsible for storing unseen and unread counts.
+
+    The unseen and unread lists contain activity ids, an aggregated activity is seen or read
+    when none of its activities are in the list.
     """
 
     @classmethod
@@ -18,12 +21,16 @@ class MarkerModelMixin:
 
     @classmethod
     def mark_activity(cls, feed_id, activity, seen, read):
+        cls.mark_activities(feed_id, [activity], seen, read)
+
+    @classmethod
+    def mark_activities(cls, feed_id, activities, seen, read):
         storage = RedisListStorage(feed_id)
         kwargs = {}
         if seen:
-            kwargs['unseen'] = [activity]
+            kwargs['unseen'] = activities
         if read:
-            kwargs['unread'] = [activity]
+            kwargs['unread'] = activities
         storage.remove(**kwargs)
 
     @classmethod
@@ -38,14 +45,42 @@ class MarkerModelMixin:
         unseen, unread = storage.count('unseen', 'unread')
         return {'unseen_count': unseen, 'unread_count': unread}
 
+    @classmethod
+    def get_markers(cls, feed_id):
+        """
+        Fetch the unseen and unread activity ids with one pipelined request.
+        """
+        storage = RedisListStorage(feed_id)
+        unseen, unread = storage.get('unseen', 'unread')
+        return set(unseen), set(unread)
+
+    @classmethod
+    def annotate_markers(cls, feed_id, items):
+        """
+        Attach the markers to all items on a page, is_seen and is_read uses the attached markers
+        instead of fetching the lists for each item.
+        """
+        markers = cls.get_markers(feed_id)
+        for item in items:
+            item._markers = markers
+
+    @property
+    def marker_activity_ids(self):
+        return {activity.get('activity_id') for activity in self.activity_store or []}
+
+    def _get_markers(self):
+        markers = getattr(self, '_markers', None)
+        if markers is None:
+            markers = self.get_markers(self.feed_id)
+            self._markers = markers
+        return markers
+
     @property
     def is_seen(self):
-        storage = RedisListStorage(self.feed_id)
-        unseen = storage.get('unseen')
-        return self.id not in unseen
+        unseen, _ = self._get_markers()
+        return unseen.isdisjoint(self.marker_activity_ids)
 
     @property
     def is_read(self):
-        storage = RedisListStorage(self.feed_id)
-        unread = storage.get('unread')
-        return self.id not in unread
+        _, unread = self._get_markers()
+        return unread.isdisjoint(self.marker_activity_ids)
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.4 on 2026-10-18 07:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0005_auto_20180425_1834'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='timelinestorage',
+            unique_together={('activity_id', 'feed', 'aggregated_id')},
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.postgres.fields import JSONField
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
 
 from lego.apps.feeds.activity import Activity
 from lego.apps.feeds.marker import MarkerModelMixin
@@ -20,6 +23,8 @@ class FeedBase(models.Model):
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     max_aggregated_activities_length = 10
+    # Upper bound for the number of recipients handled by a single fanout task.
+    fanout_max_chunk_size = 500
 
     class Meta:
         abstract = True
@@ -37,7 +42,18 @@ class FeedBase(models.Model):
 
     @property
     def activities(self):
-        return [Activity.deserialize(activity) for activity in self.activity_store]
+        """
+        The deserialized activity store. The result is memoized on the instance, the serializer
+        accesses the activities through several properties for each row.
+        """
+        cached = getattr(self, '_activities', None)
+        if cached is None or cached[0] is not self.activity_store:
+            cached = (
+                self.activity_store,
+                [Activity.deserialize(activity) for activity in self.activity_store or []]
+            )
+            self._activities = cached
+        return cached[1]
 
     @property
     def last_activity(self):
@@ -64,6 +80,38 @@ class FeedBase(models.Model):
 
         return [activity.id for activity in result]
 
+    @classmethod
+    def save_activities(cls, aggregated_activities, batch_size=500):
+        """
+        Save the activity store and ordering key of many aggregated activities, using one UPDATE
+        for each batch instead of one for each row.
+        """
+        updated_at = timezone.now()
+        aggregated_activities = list(aggregated_activities)
+        for i in range(0, len(aggregated_activities), batch_size):
+            batch = aggregated_activities[i:i + batch_size]
+            cls.objects.filter(id__in=[aggregated.id for aggregated in batch]).update(
+                activity_store=Case(
+                    *[
+                        When(
+                            id=aggregated.id, then=Cast(
+                                Value(aggregated.activity_store, output_field=JSONField()),
+                                JSONField()
+                            )
+                        ) for aggregated in batch
+                    ]
+                ),
+                ordering_key=Case(
+                    *[
+                        When(id=aggregated.id, then=Value(str(aggregated.ordering_key)))
+                        for aggregated in batch
+                    ], output_field=CharField()
+                ),
+                updated_at=updated_at,
+            )
+            for aggregated in batch:
+                aggregated.updated_at = updated_at
+
     def add_activity(self, activity):
         """
         Add activity to the activity store
@@ -75,6 +123,7 @@ class FeedBase(models.Model):
 
         activities.insert(0, activity.serialize())
         self.activity_store = activities
+        self._activities = None
         self.ordering_key = activity.activity_id
 
     def remove_activity(self, activity):
@@ -86,6 +135,7 @@ class FeedBase(models.Model):
             for raw_activity in self.activity_store:
                 if raw_activity.get('activity_id') == str(activity.activity_id):
                     self.activity_store.remove(raw_activity)
+        self._activities = None
         if self.last_activity:
             self.ordering_key = self.last_activity.activity_id
         else:
@@ -113,6 +163,8 @@ class AggregatedFeedBase(FeedBase):
 class NotificationFeedBase(FeedBase, MarkerModelMixin):
 
     objects = AggregatedFeedManager()
+    # Every recipient updates the notification markers, keep the tasks short.
+    fanout_max_chunk_size = 100
 
     class Meta(FeedBase.Meta):
         abstract = True
@@ -137,7 +189,7 @@ class TimelineStorage(models.Model):
     aggregated_id = models.PositiveIntegerField(db_index=True)
 
     class Meta:
-        unique_together = ('activity_id', 'feed')
+        unique_together = ('activity_id', 'feed', 'aggregated_id')
 
     @classmethod
     def aggregated_ids(cls, activity_id, feed):
@@ -149,17 +201,31 @@ class TimelineStorage(models.Model):
     @classmethod
     def add_ids(cls, activity_id, aggregated_ids, feed):
         """
-        Naive solution without bulk support.
+        Store the aggregated ids with one bulk insert, ids that already are stored are skipped.
+        Falls back to inserting one row at the time if a concurrent insert causes a conflict.
         """
-        for aggregated_id in aggregated_ids:
-            try:
-                cls.objects.create(
-                    activity_id=str(activity_id),
-                    feed=feed._meta.model_name,
-                    aggregated_id=aggregated_id,
-                )
-            except IntegrityError:
-                pass
+        activity_id = str(activity_id)
+        feed_name = feed._meta.model_name
+        existing_ids = set(
+            cls.objects.filter(
+                activity_id=activity_id, feed=feed_name, aggregated_id__in=aggregated_ids
+            ).values_list('aggregated_id', flat=True)
+        )
+        rows = [
+            cls(activity_id=activity_id, feed=feed_name, aggregated_id=aggregated_id)
+            for aggregated_id in set(aggregated_ids) - existing_ids
+        ]
+
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(rows)
+        except IntegrityError:
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        row.save()
+                except IntegrityError:
+                    pass
 
     @classmethod
     def remove_ids(cls, activity_id, aggregated_ids, feed):
@@ -11,14 +11,28 @@ class FeedActivitySerializer(serializers.Serializer):
     target = serializers.CharField(required=False, allow_null=True)
 
 
+class ActivityField(serializers.Field):
+    """
+    Read only field for activities, encoded with the Activity codec. Gives the same output as
+    FeedActivitySerializer without running the serializer fields for every activity.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value.serialize()
+
+
 class AggregatedFeedSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     ordering_key = serializers.CharField()
     verb = serializers.CharField()
     created_at = serializers.DateTimeField()
     updated_at = serializers.DateTimeField()
-    last_activity = FeedActivitySerializer()
-    activities = FeedActivitySerializer(many=True)
+    last_activity = ActivityField()
+    activities = serializers.ListField(child=ActivityField())
     activity_count = serializers.IntegerField()
     actor_ids = serializers.ListField(child=serializers.CharField())
 
@@ -0,0 +1,5 @@
+from lego.apps.feeds.attr_cache import AttrCache
+
+
+def attr_cache_invalidation_callback(sender, instance, **kwargs):
+    AttrCache.invalidate_instance(instance)
@@ -29,6 +29,11 @@ class RedisListStorage:
     def get_keys(self, list_names):
         return [self.get_key(list_name) for list_name in list_names]
 
+    def to_value(self, item):
+        if isinstance(item, bytes):
+            item = item.decode()
+        return self.data_type(item)
+
     def to_result(self, results):
         if results:
             if len(results) == 1:
@@ -73,7 +78,7 @@ class RedisListStorage:
             for key in keys:
                 pipe.lrange(key, 0, -1)
             results = pipe.execute()
-            results = [list(map(self.data_type, items)) for items in results]
+            results = [[self.to_value(item) for item in items] for items in results]
             return self.to_result(results)
 
     def flush(self, *args):
@@ -1,10 +1,23 @@
+import time
+
+from structlog import get_logger
+
 from lego import celery_app
 from lego.utils.tasks import AbakusTask
 
 from .utils import fanout
 
+log = get_logger()
+
 
 @celery_app.task(bind=True, base=AbakusTask)
 def feed_fanout(self, operation, activity, recipients, feed, logger_context=None):
     self.setup_logger(logger_context)
-    return fanout(operation, activity, recipients, feed)
+
+    start = time.perf_counter()
+    result = fanout(operation, activity, recipients, feed)
+    log.info(
+        'feed_fanout_chunk', operation=operation, feed=feed, recipients=len(recipients),
+        duration_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+    return result
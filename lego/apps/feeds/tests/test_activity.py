@@ -0,0 +1,52 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import PersonalFeed
+from lego.apps.feeds.serializers import FeedActivitySerializer
+from lego.apps.feeds.verbs import EventCreateVerb, MeetingInvitationVerb
+
+
+class ActivityCodecTestCase(TestCase):
+    def setUp(self):
+        self.activity = Activity(
+            actor='users.user-1', verb=EventCreateVerb, object='events.event-2',
+            target='users.user-3', time=timezone.now(), extra_context={'title': 'Event'}
+        )
+
+    def test_serialize_matches_serializer(self):
+        self.assertEqual(
+            self.activity.serialize(), dict(FeedActivitySerializer(self.activity).data)
+        )
+
+    def test_round_trip(self):
+        activity = Activity.deserialize(self.activity.serialize())
+        self.assertEqual(activity.activity_id, self.activity.activity_id)
+        self.assertEqual(activity.time, self.activity.time)
+        self.assertEqual(activity.verb, EventCreateVerb)
+        self.assertEqual(activity.actor, 'users.user-1')
+        self.assertEqual(activity.target, 'users.user-3')
+        self.assertEqual(activity.extra_context, {'title': 'Event'})
+
+    def test_round_trip_without_optional_fields(self):
+        activity = Activity(verb=MeetingInvitationVerb, actor=None, object='meetings.meeting-1')
+        decoded = Activity.deserialize(activity.serialize())
+        self.assertIsNone(decoded.actor)
+        self.assertIsNone(decoded.target)
+        self.assertEqual(decoded.activity_id, activity.activity_id)
+
+    def test_deserialize_invalid_data(self):
+        data = self.activity.serialize()
+        for field in ['object', 'verb', 'time']:
+            with self.assertRaises(ValueError):
+                Activity.deserialize({**data, field: None})
+
+    def test_activities_are_memoized(self):
+        aggregated = PersonalFeed(feed_id='1', group='group')
+        aggregated.add_activity(self.activity)
+        activities = aggregated.activities
+        self.assertIs(aggregated.activities, activities)
+        self.assertIs(aggregated.last_activity, activities[0])
+
+        aggregated.remove_activity(self.activity)
+        self.assertEqual(aggregated.activities, [])
@@ -0,0 +1,70 @@
+from lego.apps.feeds.attr_cache import AttrCache, LocalLRUCache
+from lego.apps.meetings.models import Meeting
+from lego.apps.users.models import User
+from lego.utils.test_utils import BaseTestCase
+
+
+class AttrCacheTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_meetings.yaml', 'test_users.yaml']
+
+    def setUp(self):
+        self.attr_cache = AttrCache()
+        AttrCache.statistics.clear()
+        self.meeting = Meeting.objects.get(id=1)
+        self.invitation, _ = self.meeting.invite_user(User.objects.get(id=1))
+        self.meeting_string = f'meetings.meetinginvitation-{self.invitation.id}'
+
+    def test_lookup_is_served_from_the_local_tier(self):
+        result = self.attr_cache.bulk_lookup({'users.user-1', self.meeting_string})
+        self.assertEqual(result['users.user-1']['username'], User.objects.get(id=1).username)
+        self.assertEqual(result[self.meeting_string]['meeting']['title'], self.meeting.title)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.attr_cache.bulk_lookup({'users.user-1', self.meeting_string}), result
+            )
+
+        statistics = AttrCache.get_statistics()
+        self.assertEqual(statistics['users.user']['misses'], 1)
+        self.assertEqual(statistics['users.user']['local_hits'], 1)
+        self.assertEqual(statistics['users.user']['hit_rate'], 0.5)
+
+    def test_shared_tier_fills_local_tier(self):
+        self.attr_cache.bulk_lookup({'users.user-1'})
+        AttrCache.local_cache.clear()
+
+        with self.assertNumQueries(0):
+            self.attr_cache.bulk_lookup({'users.user-1'})
+        self.assertEqual(AttrCache.get_statistics()['users.user']['shared_hits'], 1)
+
+    def test_save_invalidates_cached_value(self):
+        self.attr_cache.bulk_lookup({'users.user-1'})
+        user = User.objects.get(id=1)
+        user.first_name = 'Changed'
+        user.save()
+
+        result = self.attr_cache.bulk_lookup({'users.user-1'})
+        self.assertEqual(result['users.user-1']['first_name'], 'Changed')
+
+    def test_related_save_invalidates_dependent_value(self):
+        self.attr_cache.bulk_lookup({self.meeting_string})
+        self.meeting.title = 'Changed'
+        self.meeting.save()
+
+        result = self.attr_cache.bulk_lookup({self.meeting_string})
+        self.assertEqual(result[self.meeting_string]['meeting']['title'], 'Changed')
+
+
+class LocalLRUCacheTestCase(BaseTestCase):
+    def test_least_recently_used_entry_is_removed(self):
+        local_cache = LocalLRUCache(2)
+        local_cache.set_many({'a': 1, 'b': 2}, 60)
+        local_cache.get_many(['a'])
+        local_cache.set_many({'c': 3}, 60)
+        self.assertEqual(local_cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+    def test_expired_entries_are_ignored(self):
+        local_cache = LocalLRUCache(2)
+        local_cache.set_many({'a': 1}, -1)
+        self.assertEqual(local_cache.get_many(['a']), {})
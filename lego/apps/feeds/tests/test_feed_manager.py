@@ -1,8 +1,10 @@
+from unittest import mock
+
 from django.test import TransactionTestCase
 
 from lego.apps.feeds.activity import Activity
 from lego.apps.feeds.feed_manager import feed_manager
-from lego.apps.feeds.models import NotificationFeed
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed, TimelineStorage
 from lego.apps.feeds.verbs import MeetingInvitationVerb
 from lego.apps.meetings.models import Meeting
 from lego.apps.users.models import User
@@ -45,3 +47,54 @@ class FeedManagerTestCase(TransactionTestCase):
         # Remove the second activity and mage sure the aggregated activity is removed
         self.manager.remove_activity(activity1, [], [NotificationFeed])
         self.assertEqual(0, NotificationFeed.objects.count())
+
+    def test_fanout_to_many_recipients(self):
+        meeting = Meeting.objects.get(id=1)
+        user = User.objects.get(id=1)
+        recipients = list(User.objects.values_list('id', flat=True))
+
+        activity = Activity(actor=user, verb=MeetingInvitationVerb, object=meeting, target=user)
+        self.manager.add_activity(activity, recipients, [PersonalFeed])
+        self.assertEqual(len(recipients), PersonalFeed.objects.count())
+        self.assertEqual(
+            len(recipients),
+            len(TimelineStorage.aggregated_ids(activity.activity_id, PersonalFeed))
+        )
+
+        # The second activity is added to the existing aggregated activities
+        activity2 = Activity(
+            actor=user, verb=MeetingInvitationVerb, object=Meeting.objects.get(id=2), target=user
+        )
+        self.manager.add_activity(activity2, recipients, [PersonalFeed])
+        self.assertEqual(len(recipients), PersonalFeed.objects.count())
+        for aggregated_activity in PersonalFeed.objects.all():
+            self.assertEqual(aggregated_activity.activity_count, 2)
+            self.assertEqual(aggregated_activity.ordering_key, str(activity2.activity_id))
+
+        self.manager.remove_activity(activity2, [], [PersonalFeed])
+        for aggregated_activity in PersonalFeed.objects.all():
+            self.assertEqual(aggregated_activity.activity_count, 1)
+            self.assertEqual(aggregated_activity.ordering_key, str(activity.activity_id))
+
+        self.manager.remove_activity(activity, [], [PersonalFeed])
+        self.assertEqual(0, PersonalFeed.objects.count())
+        self.assertEqual(0, TimelineStorage.objects.count())
+
+    def test_chunk_size_adapts_to_recipients(self):
+        self.assertEqual(self.manager.get_chunk_size(PersonalFeed, 5), 10)
+        self.assertEqual(self.manager.get_chunk_size(PersonalFeed, 3000), 150)
+        self.assertEqual(self.manager.get_chunk_size(PersonalFeed, 100000), 500)
+        self.assertEqual(self.manager.get_chunk_size(NotificationFeed, 3000), 100)
+
+    @mock.patch('lego.apps.feeds.feed_manager.feed_fanout')
+    def test_fanout_tasks_share_payload(self, mock_fanout):
+        meeting = Meeting.objects.get(id=1)
+        user = User.objects.get(id=1)
+        activity = Activity(actor=user, verb=MeetingInvitationVerb, object=meeting, target=user)
+
+        self.manager.add_activity(activity, range(1, 3001), [PersonalFeed])
+
+        calls = mock_fanout.delay.call_args_list
+        self.assertEqual(len(calls), 20)
+        self.assertEqual(sum(len(call[0][2]) for call in calls), 3000)
+        self.assertTrue(all(call[0][1] is calls[0][0][1] for call in calls))
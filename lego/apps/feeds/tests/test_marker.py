@@ -0,0 +1,60 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import NotificationFeed
+from lego.apps.feeds.verbs import MeetingInvitationVerb
+
+
+class MarkerTestCase(TestCase):
+
+    feed_id = 'marker-test'
+
+    def setUp(self):
+        NotificationFeed.mark_all(self.feed_id, True, True)
+        self.items = []
+        for object_id in range(1, 4):
+            activity = Activity(
+                actor='users.user-1', verb=MeetingInvitationVerb,
+                object=f'meetings.meeting-{object_id}', time=timezone.now()
+            )
+            item = NotificationFeed(feed_id=self.feed_id, group=str(object_id))
+            item.add_activity(activity)
+            item.save()
+            self.items.append(item)
+
+    def tearDown(self):
+        NotificationFeed.mark_all(self.feed_id, True, True)
+
+    def fresh_items(self):
+        return list(NotificationFeed.objects.filter(feed_id=self.feed_id).order_by('id'))
+
+    def test_new_items_are_unseen_and_unread(self):
+        for item in self.fresh_items():
+            self.assertFalse(item.is_seen)
+            self.assertFalse(item.is_read)
+        self.assertEqual(
+            NotificationFeed.get_notification_data(self.feed_id), {
+                'unseen_count': 3,
+                'unread_count': 3
+            }
+        )
+
+    def test_mark_single_item(self):
+        first = self.items[0]
+        first.mark_activities(self.feed_id, list(first.marker_activity_ids), True, False)
+
+        items = self.fresh_items()
+        NotificationFeed.annotate_markers(self.feed_id, items)
+        self.assertEqual([item.is_seen for item in items], [True, False, False])
+        self.assertEqual([item.is_read for item in items], [False, False, False])
+
+    def test_annotated_markers_are_shared(self):
+        items = self.fresh_items()
+        NotificationFeed.annotate_markers(self.feed_id, items)
+        self.assertTrue(all(item._markers is items[0]._markers for item in items))
+
+        NotificationFeed.mark_all(self.feed_id, True, True)
+        items = self.fresh_items()
+        NotificationFeed.annotate_markers(self.feed_id, items)
+        self.assertTrue(all(item.is_seen and item.is_read for item in items))
@@ -35,16 +35,16 @@ def add_to_feed(activity, feed, recipients):
     group_search_offset = 20
     group = aggregator.get_group(activity)
 
-    existing_aggregated_activities = feed.objects.find_matching_groups(
-        group, group_search_offset, recipients
+    existing_aggregated_activities = list(
+        feed.objects.find_matching_groups(group, group_search_offset, recipients)
     )
 
     # Populate existing aggregated activities
     for aggregated_activity in existing_aggregated_activities:
         aggregated_activity.add_activity(activity)
-        aggregated_activity.save()
-        recipients.remove(aggregated_activity.feed_id)
+        recipients.discard(aggregated_activity.feed_id)
         timeline_ids.add(aggregated_activity.id)
+    feed.save_activities(existing_aggregated_activities)
 
     # Create new aggregated activity for users that don't have an item already
     activity_ids = feed.create_activities(activity, recipients, group)
@@ -63,13 +63,17 @@ def remove_from_feed(activity, feed, recipients):
     """
 
     aggregated_ids = TimelineStorage.aggregated_ids(activity.activity_id, feed)
-    aggregated_activities = feed.objects.filter(id__in=aggregated_ids)
-    for aggregated_activity in aggregated_activities:
+    empty_ids = []
+    changed_activities = []
+    for aggregated_activity in feed.objects.filter(id__in=aggregated_ids):
         aggregated_activity.remove_activity(activity)
         if len(aggregated_activity.activity_store) == 0:
-            aggregated_activity.delete()
+            empty_ids.append(aggregated_activity.id)
         else:
-            aggregated_activity.save()
+            changed_activities.append(aggregated_activity)
+
+    feed.objects.filter(id__in=empty_ids).delete()
+    feed.save_activities(changed_activities)
     TimelineStorage.remove_ids(activity.activity_id, aggregated_ids, feed)
 
 
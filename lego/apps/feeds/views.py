@@ -77,6 +77,16 @@ class FeedMarkerViewSet(viewsets.GenericViewSet):
 
     serializer_class = AggregatedMarkedFeedSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        """
+        Fetch the markers once for all items on a page.
+        """
+        if kwargs.get('many') and args:
+            items = list(args[0])
+            self.get_queryset().model.annotate_markers(self.request.user.id, items)
+            args = (items, ) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
     @decorators.list_route(serializer_class=MarkSerializer, methods=['POST'])
     def mark_all(self, request):
         """
@@ -100,10 +110,12 @@ class FeedMarkerViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        feed = self.get_queryset().model
+        aggregated_activity = self.get_object()
         seen = serializer.validated_data['seen']
         read = serializer.validated_data['read']
-        feed.mark_all(self.request.user.id, str(pk), seen, read)
+        aggregated_activity.mark_activities(
+            self.request.user.id, list(aggregated_activity.marker_activity_ids), seen, read
+        )
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -1,10 +1,11 @@
+from django.db.models import Prefetch
 from django.utils import timezone
 from rest_framework import permissions, viewsets
 from rest_framework.response import Response
 
 from lego.apps.articles.models import Article
 from lego.apps.articles.serializers import PublicArticleSerializer
-from lego.apps.events.models import Event
+from lego.apps.events.models import Event, Pool
 from lego.apps.events.serializers.events import EventSearchSerializer
 from lego.apps.permissions.constants import LIST
 from lego.apps.permissions.utils import get_permission_handler
@@ -29,7 +30,10 @@ class FrontpageViewSet(viewsets.ViewSet):
         events_handler = get_permission_handler(Event)
         queryset_events_base = Event.objects.all()\
             .filter(end_time__gt=timezone.now()).order_by('-pinned', 'start_time', 'id')\
-            .prefetch_related('pools', 'pools__registrations', 'company', 'tags')
+            .prefetch_related(
+                Prefetch('pools', queryset=Pool.objects.with_registration_count()), 'company',
+                'tags'
+            )
 
         if events_handler.has_perm(request.user, LIST, queryset=queryset_events_base):
             queryset_events = queryset_events_base
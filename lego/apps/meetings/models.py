@@ -69,14 +69,12 @@ class Meeting(BasisModel):
         invitation.delete(force=True)
         track(user, 'meeting.uninvite', properties={'meeting_id': self.id})
 
-    def restricted_lookup(self):
+    @classmethod
+    def lookup_recipient_ids(cls, meetings):
         """
-        Restricted mail
+        Restricted mail and announcements. Returns a subquery with the ids of the invited users.
         """
-        return self.invited_users, []
-
-    def announcement_lookup(self):
-        return self.invited_users
+        return MeetingInvitation.objects.filter(meeting__in=meetings).values('user_id')
 
     @property
     def comment_target(self):
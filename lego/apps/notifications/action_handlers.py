@@ -23,13 +23,12 @@ class AnnouncementHandler(Handler):
         )
         recipients = announcement.lookup_recipients()
         self.manager.add_activity(
-            activity,
-            [recipient.pk for recipient in recipients],
+            activity, list(recipients.values_list('pk', flat=True)),
             [NotificationFeed, PersonalFeed]
         )
 
         # Send notifications
-        for recipient in recipients:
+        for recipient in recipients.iterator():
             notification = AnnouncementNotification(recipient, announcement=announcement)
             notification.notify()
 
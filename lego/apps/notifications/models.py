@@ -3,6 +3,7 @@ from django.db import models
 from django.utils import timezone
 
 from lego.apps.action_handlers.events import handle_event
+from lego.apps.users.recipients import lookup_recipients
 from lego.utils.models import BasisModel
 
 from .constants import CHANNEL_CHOICES, CHANNELS, NOTIFICATION_CHOICES, NOTIFICATION_TYPES
@@ -45,6 +46,18 @@ class NotificationSetting(models.Model):
         # When enabled is True return all valid channels in the channels field.
         return list(set(setting.channels or []) & set(CHANNELS))
 
+    @classmethod
+    def unsubscribed_user_ids(cls, notification_type, channel):
+        """
+        Returns a subquery with the ids of the users that has turned off the channel for the
+        notification type. Matches `active_channels`, users without a setting are subscribed.
+        """
+        if notification_type not in NOTIFICATION_TYPES:
+            raise ValueError('You asked for an invalid notification_type')
+
+        return cls.objects.filter(notification_type=notification_type)\
+            .exclude(enabled=True, channels__contains=[channel]).values('user_id')
+
     @classmethod
     def lookup_setting(cls, user, notification_type):
         return cls.objects.get_or_create(
@@ -60,7 +73,8 @@ class Announcement(BasisModel):
     Send important messages to selected recipients.
     A notification is created when a message is saved.
     This works in the same way as restricted mail.
-    The lookup functions on the relations is called announcement_lookup.
+    The recipients are looked up with lego.apps.users.recipients, the models in the relations
+    implements the lookup_recipient_ids classmethod.
     """
 
     message = models.TextField()
@@ -75,19 +89,10 @@ class Announcement(BasisModel):
 
     def lookup_recipients(self):
         """
-        Lookup users that should receive this message.
+        Lookup users that should receive this message. Returns a queryset, the users are resolved
+        by one query.
         """
-        all_users = []
-
-        for relation_name in self.MANY_TO_MANY_RELATIONS:
-            relation = getattr(self, relation_name)
-            for instance in relation.all():
-                announcement_lookup = getattr(instance, 'announcement_lookup', None)
-                if announcement_lookup:
-                    users = announcement_lookup()
-                    all_users += list(users)
-
-        return list(set(all_users))
+        return lookup_recipients(self, self.MANY_TO_MANY_RELATIONS)
 
     def send(self):
         if self.sent:
@@ -39,3 +39,13 @@ class NotificationSettingTestCase(BaseTestCase):
             NotificationSetting.active_channels(user, constants.WEEKLY_MAIL),
             [constants.EMAIL]
         )
+
+    def test_unsubscribed_user_ids(self):
+        """The subquery matches the users without the channel in active_channels"""
+        unsubscribed = set(
+            NotificationSetting.unsubscribed_user_ids(constants.WEEKLY_MAIL, constants.EMAIL)
+            .values_list('user_id', flat=True)
+        )
+        for user in User.objects.all():
+            channels = NotificationSetting.active_channels(user, constants.WEEKLY_MAIL)
+            self.assertEqual(user.pk in unsubscribed, constants.EMAIL not in channels)
@@ -10,3 +10,7 @@ OBJECT_PERMISSIONS_FIELDS = (
     'can_edit_groups',
     'can_edit_users',
 )
+
+# Strategies used by PermissionHandler.filter_queryset on ObjectPermissionsModels.
+FILTER_QUERYSET_JOIN = 'join'
+FILTER_QUERYSET_EXISTS = 'exists'
@@ -1,3 +1,52 @@
+from functools import lru_cache
+
+
+class KeywordPermissionMatcher:
+    """
+    Prefix matcher for keyword permissions. A user with the permission `/sudo/admin/` has every
+    permission starting with `/sudo/admin/`.
+
+    Permissions are stored in a trie over the path segments, so a lookup walks the segments of
+    the requested permission once instead of comparing it with every permission the user has.
+    Permissions that doesn't end with a slash can't be split into segments, these are checked
+    with `startswith` like before.
+    """
+
+    __slots__ = ('root', 'prefixes')
+
+    def __init__(self, permissions):
+        self.root = {}
+        self.prefixes = []
+        for permission in permissions:
+            if not permission.endswith('/'):
+                self.prefixes.append(permission)
+                continue
+            node = self.root
+            for segment in permission.split('/')[:-1]:
+                node = node.setdefault(segment, {})
+            node[None] = True
+
+    def match(self, perm):
+        node = self.root
+        # The part after the last slash is not a complete segment.
+        for segment in perm.split('/')[:-1]:
+            node = node.get(segment)
+            if node is None:
+                break
+            if None in node:
+                return True
+        return any(perm.startswith(prefix) for prefix in self.prefixes)
+
+
+@lru_cache(maxsize=512)
+def compile_permissions(permissions):
+    """
+    Returns a matcher for a frozenset of keyword permissions. Users with the same permission set
+    share the matcher, and a changed permission set gives a new one.
+    """
+    return KeywordPermissionMatcher(permissions)
+
+
 class KeywordPermissions:
     """
     This class manages keyword permissions.
@@ -8,18 +57,14 @@ class KeywordPermissions:
         if user.is_anonymous:
             return set()
 
-        perms = set()
-        for group in user.all_groups:
-            available_perms = group.permissions
-            if available_perms:
-                perms.update(available_perms)
+        return set(user.keyword_permissions)
 
-        return perms
+    @staticmethod
+    def get_matcher(user):
+        return compile_permissions(frozenset(user.keyword_permissions))
 
     @staticmethod
     def has_perm(user, perm):
-        permissions = KeywordPermissions.get_group_permissions(user)
-        for permission in permissions:
-            if perm.startswith(permission):
-                return True
-        return False
+        if user.is_anonymous:
+            return False
+        return KeywordPermissions.get_matcher(user).match(perm)
@@ -1,6 +1,8 @@
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
 
-from lego.apps.permissions.constants import CREATE, LIST, VIEW
+from lego.apps.permissions.constants import (
+    CREATE, FILTER_QUERYSET_EXISTS, FILTER_QUERYSET_JOIN, LIST, OBJECT_PERMISSIONS_FIELDS, VIEW
+)
 from lego.apps.permissions.models import ObjectPermissionsModel
 
 
@@ -45,6 +47,11 @@ class PermissionHandler:
 
     perms_without_object = [CREATE]
 
+    # How filter_queryset filters ObjectPermissionsModels. The join strategy ORs joins on the
+    # permission relations and removes duplicates with DISTINCT, the exists strategy uses
+    # correlated EXISTS subqueries instead. Both return the same objects.
+    filter_queryset_strategy = FILTER_QUERYSET_JOIN
+
     def permissions_grant(self, permissions, user, obj=None, queryset=None):
         """
         Lookup possible permissions the user has access to.
@@ -59,6 +66,20 @@ class PermissionHandler:
 
         return list(filtered_permissions)
 
+    def permissions_grant_bulk(self, permissions, user, objects):
+        """
+        Lookup possible permissions the user has access to on a list of objects. The object
+        permission relations are prefetched for all objects at once, instead of being queried
+        for every object and permission.
+
+        :return: A dict with the permissions granted on each object, keyed by the object pk.
+        """
+        objects = list(objects)
+        if objects and isinstance(objects[0], ObjectPermissionsModel):
+            prefetch_related_objects(objects, *OBJECT_PERMISSIONS_FIELDS)
+
+        return {obj.pk: self.permissions_grant(permissions, user, obj) for obj in objects}
+
     def has_object_level_permissions(self, user, perm, obj=None, queryset=None):
         """
         Check whether the queryset or object requires a permission check at object level.
@@ -152,8 +173,11 @@ class PermissionHandler:
             if not user.is_authenticated:
                 return queryset.filter(require_auth=False)
 
+            if self.filter_queryset_strategy == FILTER_QUERYSET_EXISTS:
+                return self.filter_queryset_exists(user, queryset)
+
             # User is authenticated, display objects created by user or object with group rights.
-            groups = [abakus_group.pk for abakus_group in user.all_groups]
+            groups = user.all_group_ids
             return queryset.filter(
                 Q(can_edit_users__in=[user.pk])
                 | Q(can_edit_groups__in=groups)
@@ -163,6 +187,34 @@ class PermissionHandler:
 
         return queryset
 
+    def filter_queryset_exists(self, user, queryset):
+        """
+        Filter an ObjectPermissionsModel queryset with EXISTS subqueries on the permission
+        relations. The queryset isn't multiplied by joins, so DISTINCT isn't needed.
+        """
+        model = queryset.model
+        groups = list(user.all_group_ids)
+
+        def related_exists(field_name, values):
+            field = model._meta.get_field(field_name)
+            lookups = {
+                field.m2m_field_name(): OuterRef('pk'),
+                f'{field.m2m_reverse_field_name()}__in': values,
+            }
+            return Exists(field.remote_field.through.objects.filter(**lookups))
+
+        annotations = {'permission_can_edit_user': related_exists('can_edit_users', [user.pk])}
+        if groups:
+            annotations['permission_can_edit_group'] = related_exists('can_edit_groups', groups)
+            annotations['permission_can_view_group'] = related_exists('can_view_groups', groups)
+
+        query = Q(created_by=user) | Q(require_auth=False)
+        for annotation in annotations:
+            query |= Q(**{annotation: True})
+
+        # Django 2.0 can't filter on expressions directly, the subqueries has to be annotated.
+        return queryset.annotate(**annotations).filter(query)
+
     def require_auth(self, perm, obj=None, queryset=None):
         require_auth = self.authentication_map.get(perm, self.default_require_auth)
         if not require_auth:
@@ -207,17 +259,18 @@ class PermissionHandler:
     def has_object_permissions(self, user, perm, obj):
         if perm in self.safe_methods:
             # Check can_view
-            if _check_intersection(
-                user.all_groups,
-                obj.can_view_groups.all() | obj.can_edit_groups.all()
-            ):
+            group_ids = [group.pk for group in obj.can_view_groups.all()] + \
+                [group.pk for group in obj.can_edit_groups.all()]
+            if _check_intersection(user.all_group_ids, group_ids):
                 return True
             elif user in obj.can_edit_users.all():
                 return True
             return False
         else:
             # Check can_edit
-            if _check_intersection(user.all_groups, obj.can_edit_groups.all()):
+            if _check_intersection(
+                user.all_group_ids, [group.pk for group in obj.can_edit_groups.all()]
+            ):
                 return True
             elif user in obj.can_edit_users.all():
                 return True
@@ -1,4 +1,4 @@
-from lego.apps.permissions.keyword import KeywordPermissions
+from lego.apps.permissions.keyword import KeywordPermissionMatcher, KeywordPermissions
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseTestCase
 
@@ -9,7 +9,7 @@ class KeywordPermissionsTestCase(BaseTestCase):
 
     def setUp(self):
         self.test_user = User.objects.get(username='useradmin_test')
-        self.useradmin_group = AbakusGroup.objects.get(name='UserAdminTest')
+        self.useradmin_group = AbakusGroup.objects_with_text.get(name='UserAdminTest')
         self.useradmin_group.add_user(self.test_user)
 
     def test_has_perm_exact(self):
@@ -24,3 +24,31 @@ class KeywordPermissionsTestCase(BaseTestCase):
     def test_has_perm_incorrect(self):
         has_perm = KeywordPermissions.has_perm(self.test_user, '/sudo')
         self.assertFalse(has_perm)
+
+    def test_has_perm_after_permission_change(self):
+        self.assertFalse(KeywordPermissions.has_perm(self.test_user, '/sudo/admin/events/'))
+        self.useradmin_group.permissions = ['/sudo/admin/']
+        self.useradmin_group.save()
+
+        test_user = User.objects.get(pk=self.test_user.pk)
+        self.assertTrue(KeywordPermissions.has_perm(test_user, '/sudo/admin/events/'))
+
+
+class KeywordPermissionMatcherTestCase(BaseTestCase):
+    def setUp(self):
+        self.matcher = KeywordPermissionMatcher(['/sudo/admin/users/', '/sudo/admin/events/list/'])
+
+    def test_match_prefix(self):
+        self.assertTrue(self.matcher.match('/sudo/admin/users/'))
+        self.assertTrue(self.matcher.match('/sudo/admin/users/edit/'))
+        self.assertTrue(self.matcher.match('/sudo/admin/events/list/'))
+
+    def test_match_requires_complete_segments(self):
+        self.assertFalse(self.matcher.match('/sudo/admin/users'))
+        self.assertFalse(self.matcher.match('/sudo/admin/usersgroups/'))
+        self.assertFalse(self.matcher.match('/sudo/admin/events/'))
+
+    def test_match_without_trailing_slash(self):
+        matcher = KeywordPermissionMatcher(['/sudo/admin'])
+        self.assertTrue(matcher.match('/sudo/admin/users/'))
+        self.assertTrue(matcher.match('/sudo/administrator/'))
@@ -1,7 +1,10 @@
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from lego.apps.permissions.constants import DELETE, EDIT, FILTER_QUERYSET_EXISTS, VIEW
+from lego.apps.permissions.permissions import PermissionHandler
 from lego.apps.permissions.tests.models import TestModel
 from lego.apps.permissions.tests.view import TestViewSet
+from lego.apps.permissions.utils import get_permission_handler
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseAPITestCase
 
@@ -151,3 +154,48 @@ class PermissionTestCase(BaseAPITestCase):
             f'/permissiontest/{self.test_object.id}/', self.test_update_object
         )
         self.assertEqual(response.status_code, 404)
+
+    def test_permissions_grant_bulk(self):
+        """
+        The bulk grant should match permissions_grant, without querying relations per object
+        """
+        for i in range(5):
+            test_object = TestModel(name=f'bulk_object_{i}', require_auth=True)
+            test_object.save(current_user=self.creator)
+            test_object.can_view_groups.add(self.webkom)
+
+        handler = get_permission_handler(TestModel)
+        permissions = [VIEW, EDIT, DELETE]
+        user = User.objects.get(pk=self.allowed_user.pk)
+        user.all_group_ids
+
+        with self.assertNumQueries(4):
+            grants = handler.permissions_grant_bulk(permissions, user, TestModel.objects.all())
+
+        for test_object in TestModel.objects.all():
+            self.assertEqual(
+                set(grants[test_object.pk]),
+                set(handler.permissions_grant(permissions, user, test_object))
+            )
+        self.assertEqual(set(grants[self.test_object.pk]), {VIEW, EDIT, DELETE})
+
+    def test_filter_queryset_strategies_are_equal(self):
+        abakus = AbakusGroup.objects.get(name='Abakus')
+        for i, group in enumerate([self.webkom, abakus, None]):
+            for require_auth in [True, False]:
+                test_object = TestModel(name=f'strategy_{i}', require_auth=require_auth)
+                test_object.save(current_user=self.disallowed_user)
+                if group:
+                    test_object.can_edit_groups.add(group)
+                    test_object.can_view_groups.add(self.webkom, group)
+                test_object.can_edit_users.add(self.allowed_user, self.creator)
+
+        join_handler = PermissionHandler()
+        exists_handler = PermissionHandler()
+        exists_handler.filter_queryset_strategy = FILTER_QUERYSET_EXISTS
+
+        for user in User.objects.all():
+            self.assertEqual(
+                list(join_handler.filter_queryset(user, TestModel.objects.order_by('id'))),
+                list(exists_handler.filter_queryset(user, TestModel.objects.order_by('id')))
+            )
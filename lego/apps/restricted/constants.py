@@ -1 +1,11 @@
 RESTRICTED_TOKEN_PREFIX = 'LEGOTOKEN'
+
+BATCH_PENDING = 'pending'
+BATCH_SENT = 'sent'
+BATCH_FAILED = 'failed'
+
+BATCH_STATUSES = (
+    (BATCH_PENDING, BATCH_PENDING),
+    (BATCH_SENT, BATCH_SENT),
+    (BATCH_FAILED, BATCH_FAILED),
+)
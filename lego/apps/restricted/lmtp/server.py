@@ -0,0 +1,264 @@
+import asyncio
+import socket
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from structlog import get_logger
+
+from . import channel
+
+log = get_logger()
+
+VERSION = 'Lego LMTP'
+
+
+class LMTPStats:
+    """
+    Counters for the server, the latency is measured from the end of the DATA command until
+    the message is processed.
+    """
+
+    def __init__(self, window=1000):
+        self.started = time.monotonic()
+        self.sessions = 0
+        self.messages = 0
+        self.bytes = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_message(self, size, latency):
+        self.messages += 1
+        self.bytes += size
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(value):
+            if not latencies:
+                return None
+            return round(latencies[int(value * (len(latencies) - 1))] * 1000, 2)
+
+        return {
+            'sessions': self.sessions,
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'messages_per_second': round(self.messages / uptime, 2) if uptime else 0,
+            'latency_p50_ms': percentile(0.5),
+            'latency_p95_ms': percentile(0.95),
+        }
+
+
+class LMTPSession:
+    """
+    A single LMTP connection. Message data is streamed to a spool file, the spool is handed to
+    the server handler in the worker pool when the DATA command completes.
+    """
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.peer = writer.get_extra_info('peername')
+        self.greeted = False
+        self.reset()
+
+    def reset(self):
+        self.mailfrom = None
+        self.recipients = []
+
+    async def push(self, *lines):
+        self.writer.write(''.join(f'{line}{channel.CRLF}' for line in lines).encode())
+        await self.writer.drain()
+
+    async def handle(self):
+        start = time.monotonic()
+        self.server.stats.sessions += 1
+        await self.push(f'220 {self.server.hostname} {VERSION}')
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                command, _, arg = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                method = getattr(self, f'lmtp_{command.upper()}', None)
+                if not command or method is None:
+                    await self.push(f'500 Error: command "{command}" not recognized')
+                    continue
+                if await method(arg.strip()) is False:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            log.warn('lmtp_session_aborted', peer=self.peer)
+        finally:
+            self.writer.close()
+            log.debug(
+                'lmtp_session_closed', peer=self.peer,
+                duration_ms=round((time.monotonic() - start) * 1000, 2)
+            )
+
+    @staticmethod
+    def parse_address(arg, keyword):
+        if not arg[:len(keyword)].upper() == keyword:
+            return None
+        address = arg[len(keyword):].strip().split(' ')[0]
+        if address.startswith('<') and address.endswith('>'):
+            address = address[1:-1]
+        return address
+
+    async def lmtp_LHLO(self, arg):
+        if not arg:
+            return await self.push('501 Syntax: LHLO hostname')
+        self.greeted = True
+        self.reset()
+        await self.push(
+            f'250-{self.server.hostname}', f'250-SIZE {self.server.max_message_size}',
+            '250-8BITMIME', '250 PIPELINING'
+        )
+
+    async def lmtp_HELO(self, arg):
+        await self.push(channel.ERR_502)
+
+    async def lmtp_EHLO(self, arg):
+        await self.push(channel.ERR_502)
+
+    async def lmtp_NOOP(self, arg):
+        await self.push(channel.OK_250)
+
+    async def lmtp_RSET(self, arg):
+        self.reset()
+        await self.push(channel.OK_250)
+
+    async def lmtp_QUIT(self, arg):
+        await self.push('221 Bye')
+        return False
+
+    async def lmtp_MAIL(self, arg):
+        if not self.greeted:
+            return await self.push('503 Error: send LHLO first')
+        if self.mailfrom is not None:
+            return await self.push('503 Error: nested MAIL command')
+        address = self.parse_address(arg, 'FROM:')
+        if address is None:
+            return await self.push('501 Syntax: MAIL FROM:<address>')
+        self.mailfrom = address
+        await self.push(channel.OK_250)
+
+    async def lmtp_RCPT(self, arg):
+        if self.mailfrom is None:
+            return await self.push('503 Error: need MAIL command')
+        address = self.parse_address(arg, 'TO:')
+        if not address:
+            return await self.push('501 Syntax: RCPT TO:<address>')
+        if address not in self.server.recipients:
+            log.warn('restricted_incorrect_destination_address', address=address)
+            return await self.push(channel.ERR_511)
+        self.recipients.append(address)
+        await self.push(channel.OK_250)
+
+    async def lmtp_DATA(self, arg):
+        if not self.recipients:
+            return await self.push('503 Error: need RCPT command')
+        await self.push('354 End data with <CR><LF>.<CR><LF>')
+
+        with self.server.create_spool() as spool:
+            size = await self.read_data(spool)
+            if size > self.server.max_message_size:
+                status = '552 Error: message too large'
+            else:
+                start = time.monotonic()
+                status = await self.server.process(self.mailfrom, spool, size)
+                latency = time.monotonic() - start
+                self.server.stats.record_message(size, latency)
+                log.info(
+                    'lmtp_message_processed', peer=self.peer, size=size, status=status,
+                    duration_ms=round(latency * 1000, 2)
+                )
+
+        # LMTP returns one reply for each accepted recipient.
+        await self.push(*[status for _ in self.recipients])
+        self.reset()
+
+    async def read_data(self, spool):
+        """
+        Stream the message to the spool until the terminating dot line, and remove the dot
+        stuffing. Data past the size limit is read and discarded.
+        """
+        size = 0
+        line_start = True
+        while True:
+            try:
+                chunk = await self.reader.readuntil(b'\n')
+            except asyncio.LimitOverrunError as e:
+                chunk = await self.reader.read(e.consumed)
+            if not chunk:
+                raise ConnectionError('Connection closed during DATA')
+
+            if line_start:
+                if chunk in (b'.\r\n', b'.\n'):
+                    return size
+                if chunk.startswith(b'.'):
+                    chunk = chunk[1:]
+
+            line_start = chunk.endswith(b'\n')
+            size += len(chunk)
+            if size <= self.server.max_message_size:
+                spool.write(chunk)
+
+
+class LMTPServer:
+    """
+    Asyncio LMTP server accepting many concurrent sessions. The handler is called in a thread
+    pool with `(mailfrom, spool, size)` and returns the reply for the message.
+    """
+
+    def __init__(
+        self, handler, recipients, host, port, workers=4, max_message_size=50 * 1024 * 1024,
+        spool_max_memory=1024 * 1024, spool_dir=None, loop=None
+    ):
+        self.handler = handler
+        self.recipients = set(recipients)
+        self.host = host
+        self.port = port
+        self.max_message_size = max_message_size
+        self.spool_max_memory = spool_max_memory
+        self.spool_dir = spool_dir
+        self.hostname = socket.getfqdn()
+        self.loop = loop or asyncio.get_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.stats = LMTPStats()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        log.info('lmtp_server_start', address=self.address)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def handle_connection(self, reader, writer):
+        await LMTPSession(self, reader, writer).handle()
+
+    def create_spool(self):
+        """
+        Messages are kept in memory up to spool_max_memory bytes, larger messages are written
+        to a temporary file.
+        """
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_max_memory, dir=self.spool_dir)
+
+    async def process(self, mailfrom, spool, size):
+        spool.seek(0)
+        return await self.loop.run_in_executor(self.executor, self.handler, mailfrom, spool, size)
+
+    async def log_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            log.info('lmtp_stats', **self.stats.snapshot())
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        self.executor.shutdown(wait=False)
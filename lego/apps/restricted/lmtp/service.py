@@ -1,7 +1,7 @@
-import asyncore
-import smtpd
+import asyncio
 
 from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
 from structlog import get_logger
 
@@ -14,81 +14,90 @@ from lego.utils.management_command import BaseCommand
 
 from . import channel
 from .parser import LMTPEmailParser
+from .server import LMTPServer
 
-smtpd.__version__ = 'Lego LMTP'
 log = get_logger()
 
 
-class LMTPService(BaseCommand, smtpd.SMTPServer):
+def process_message(mailfrom, spool, size):
+    """
+    Parse and process a spooled message. This runs in the worker pool of the LMTP server, and
+    returns the reply sent for every recipient of the message.
+    """
+    # Worker threads keeps their database connection between messages.
+    close_old_connections()
+    parser = LMTPEmailParser(spool, mailfrom, ParserMessageType.BINARY_FILE, original_size=size)
+
+    try:
+        message = parser.parse()
+    except ParseEmailException:
+        log.exception('lmtp_email_parse_error')
+        return channel.ERR_451
+    except MessageIDNotExistException:
+        log.exception('lmtp_message_no_message_id')
+        return channel.ERR_550_MID
+    except DefectMessageException:
+        log.exception('lmtp_message_defect')
+        return channel.ERR_501
+
+    try:
+        message_data = {'original_size': message.original_size, 'received_time': timezone.now()}
+
+        message_processor = MessageProcessor(mailfrom, message, message_data)
+        message_processor.process_message()
+
+        return channel.OK_250
+
+    except Exception:
+        from raven.contrib.django.raven_compat.models import client
+        client.captureException()
+        log.exception('lmtp_lookup_failure')
+        return channel.ERR_550
+    finally:
+        close_old_connections()
+
+
+class LMTPService(BaseCommand):
     """
     This class provides a interface for transporting mail into LEGO using LMTP.
     Command: manage.py restricted_email
     Settings:
         LMTP_HOST = 'localhost'
         LMTP_PORT = 8024
+        LMTP_WORKERS = 4
+        LMTP_MAX_MESSAGE_SIZE = 50 * 1024 * 1024
+        LMTP_SPOOL_MAX_MEMORY = 1024 * 1024
+        LMTP_SPOOL_DIR = None
+        LMTP_STATS_INTERVAL = 60
     """
 
     help = 'Start a lmtp server for incoming restricted messages'
-    channel_class = channel.Channel
 
-    def run(self, *args, **kwargs):
-        asyncore.loop(use_poll=True)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.server = None
 
-    def close(self):
-        asyncore.socket_map.clear()
-        asyncore.close_all()
-
-    def __init__(self):
-        localaddr = settings.LMTP_HOST, int(settings.LMTP_PORT)
-        log.info('lmtp_server_start', address=localaddr)
-        smtpd.SMTPServer.__init__(self, localaddr, remoteaddr=None)
-        super().__init__()
-
-    def handle_accept(self):
-        conn, addr = self.accept()
-        channel.Channel(self, conn, addr)
-        log.debug('lmtp_message_accept', address=addr)
-
-    def process_message(self, peer, mailfrom, recipients, data, **kwargs):
-        parser = LMTPEmailParser(data, mailfrom, ParserMessageType.BYTES)
-
-        try:
-            message = parser.parse()
-        except ParseEmailException:
-            log.exception('lmtp_email_parse_error')
-            return channel.CRLF.join(channel.ERR_451 for _ in recipients)
-        except MessageIDNotExistException:
-            log.exception('lmtp_message_no_message_id')
-            return channel.CRLF.join(channel.ERR_550_MID for _ in recipients)
-        except DefectMessageException:
-            log.exception('lmtp_message_defect')
-            return channel.CRLF.join(channel.ERR_501 for _ in recipients)
-
-        status = []
-        for recipient in recipients:
-
-            if recipient not in [
+    def run(self, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        self.server = LMTPServer(
+            process_message,
+            recipients=[
                 settings.RESTRICTED_ADDRESS,
                 f'{settings.RESTRICTED_ADDRESS}@{settings.RESTRICTED_DOMAIN}'
-            ]:
-                log.warn('restricted_incorrect_destination_address', address=recipient)
-                return status.append(channel.ERR_511)
+            ],
+            host=settings.LMTP_HOST,
+            port=int(settings.LMTP_PORT),
+            workers=settings.LMTP_WORKERS,
+            max_message_size=settings.LMTP_MAX_MESSAGE_SIZE,
+            spool_max_memory=settings.LMTP_SPOOL_MAX_MEMORY,
+            spool_dir=settings.LMTP_SPOOL_DIR,
+            loop=loop,
+        )
+        loop.run_until_complete(self.server.start())
+        loop.create_task(self.server.log_stats(settings.LMTP_STATS_INTERVAL))
+        loop.run_forever()
 
-            try:
-                message_data = {
-                    'original_size': message.original_size,
-                    'received_time': timezone.now()
-                }
-
-                message_processor = MessageProcessor(mailfrom, message, message_data)
-                message_processor.process_message()
-
-                return status.append(channel.OK_250)
-
-            except Exception:
-                from raven.contrib.django.raven_compat.models import client
-                client.captureException()
-                log.exception('lmtp_lookup_failure')
-                status.append(channel.ERR_550)
-
-        return channel.CRLF.join(status)
+    def close(self):
+        if self.server:
+            self.server.close()
+            log.info('lmtp_server_stop', **self.server.stats.snapshot())
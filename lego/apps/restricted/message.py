@@ -34,3 +34,59 @@ class EmailMessage:
         base_cls_name = obj.__class__.__name__
         obj.__class__ = type(base_cls_name, (cls, base_cls), {})
         return obj
+
+
+class RecipientMessage:
+    """
+    A serialized message with a To header for a single recipient. The header is inserted at the
+    end of the header block, the rest of the message is shared by all recipients.
+    """
+
+    def __init__(self, raw, header_end, recipient):
+        self.raw = raw
+        self.header_end = header_end
+        self.recipient = recipient
+
+    def get_charset(self):
+        return None
+
+    def as_bytes(self, linesep='\n'):
+        headers, body = self.raw[:self.header_end], self.raw[self.header_end:]
+        to_header = f'To: {self.recipient}'.encode()
+        return b''.join([headers, linesep.encode(), to_header, body])
+
+    def as_string(self, linesep='\n'):
+        return self.as_bytes(linesep).decode(errors='replace')
+
+
+class RawEmailMessage:
+    """
+    Send a message serialized once to many recipients. Only the envelope and the To header
+    changes between recipients, the message isn't copied.
+    """
+
+    def __init__(self, recipient, sender, raw, header_end=None):
+        self.recipient = recipient
+        self.from_email = sender
+        self.raw = raw
+        self.header_end = self.find_header_end(raw) if header_end is None else header_end
+        self.encoding = None
+
+    @staticmethod
+    def find_header_end(raw):
+        header_end = raw.find(b'\r\n\r\n')
+        return header_end if header_end >= 0 else len(raw.rstrip(b'\r\n'))
+
+    @staticmethod
+    def serialize(message):
+        """
+        Serialize a message without a To header, the result is stored and sent to each recipient.
+        """
+        del message['To']
+        return EmailMessage.extend_instance(message, MIMEMixin).as_bytes(linesep='\r\n')
+
+    def recipients(self):
+        return [self.recipient]
+
+    def message(self):
+        return RecipientMessage(self.raw, self.header_end, self.recipient)
@@ -1,15 +1,15 @@
-from copy import deepcopy
 from email.message import Message
 from email.mime.text import MIMEText
 
 from django.conf import settings
-from django.core.mail import get_connection
+from django.db import transaction
 from structlog import get_logger
 
 from lego.apps.action_handlers.registry import get_handler
-from lego.apps.restricted.models import RestrictedMail
+from lego.apps.restricted.models import MailDelivery, RestrictedMail
 
-from .message import EmailMessage
+from .message import RawEmailMessage
+from .tasks import send_mail_delivery
 from .utils import get_mail_token
 
 log = get_logger()
@@ -41,7 +41,6 @@ class MessageProcessor:
             self.action_handler.run(None, 'failure', sender=self.sender, reason='TOKEN_INVALID')
             return None
 
-        recipients = restricted_message.lookup_recipients()
         sender = self.get_sender(restricted_message)
 
         message = self.rewrite_message(self.message, sender)
@@ -50,11 +49,14 @@ class MessageProcessor:
             # Add a footer with a note about the from address rewrite.
             self.decorate(message, restricted_message.hide_sender, self.sender)
 
-        self.send(recipients, sender, message)
-        restricted_message.mark_used()
+        # The message is stored and sent by celery, the creator is notified when all batches
+        # are sent.
+        with transaction.atomic():
+            delivery = self.persist(restricted_message, sender, message)
+            restricted_message.mark_used()
+            transaction.on_commit(lambda: send_mail_delivery.delay(delivery.id))
 
-        # Send a success message to the creator
-        self.action_handler.run(restricted_message, 'sent')
+        return delivery
 
     def get_sender(self, restricted_mail):
         """
@@ -109,14 +111,14 @@ class MessageProcessor:
         return message
 
     @staticmethod
-    def send(recipients, sender, message):
+    def persist(restricted_mail, sender, message):
         """
-        Create a new connection and bulk send mails
+        Store the processed message once, the batches are created by the delivery task.
         """
-        connection = get_connection(fail_silently=False)
-        messages = [EmailMessage(recipient, sender, deepcopy(message)) for recipient in recipients]
-        log.info('restricted_mail_process_messages', sender=sender, recipients=len(messages))
-        return connection.send_messages(messages)
+        return MailDelivery.objects.create(
+            restricted_mail=restricted_mail, sender=sender,
+            message=RawEmailMessage.serialize(message)
+        )
 
     @staticmethod
     def decorate(message, hide_sender, sender):
@@ -0,0 +1,90 @@
+# Generated by Django 2.0.4 on 2026-10-18 07:18
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restricted', '0003_auto_20171210_1610'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailDelivery',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    )
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now, editable=False
+                    )
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(default=django.utils.timezone.now, editable=False)
+                ),
+                ('sender', models.CharField(max_length=254)),
+                ('message', models.BinaryField()),
+                ('finished_at', models.DateTimeField(null=True)),
+                (
+                    'restricted_mail',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, related_name='delivery',
+                        to='restricted.RestrictedMail'
+                    )
+                ),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MailDeliveryBatch',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    )
+                ),
+                (
+                    'recipients',
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=254), size=None
+                    )
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[('pending', 'pending'), ('sent', 'sent'), ('failed', 'failed')],
+                        default='pending', max_length=16
+                    )
+                ),
+                ('sent', models.PositiveIntegerField(default=0)),
+                (
+                    'rejected',
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=254), default=list, size=None
+                    )
+                ),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                (
+                    'delivery',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name='batches',
+                        to='restricted.MailDelivery'
+                    )
+                ),
+            ],
+        ),
+    ]
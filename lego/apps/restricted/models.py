@@ -8,7 +8,10 @@ from structlog import get_logger
 from lego.apps.notifications.constants import EMAIL, WEEKLY_MAIL
 from lego.apps.notifications.models import NotificationSetting
 from lego.apps.users.models import AbakusGroup
-from lego.utils.models import BasisModel
+from lego.apps.users.recipients import iterate_addresses, lookup_recipients
+from lego.utils.models import BasisModel, TimeStampModel
+
+from . import constants
 
 log = get_logger()
 
@@ -21,8 +24,8 @@ class RestrictedMail(BasisModel):
     The creator must provide the from mail and attach the generated token to the mail for
     security reasons.
 
-    All models in the ManyToManyFields must contain a restricted_lookup function that returns a
-    tuple ([users], [raw_addresses])
+    All models in the ManyToManyFields must contain a lookup_recipient_ids classmethod that returns
+    a subquery with user ids, see `lego.apps.users.recipients`.
     """
 
     MANY_TO_MANY_RELATIONS = ['users', 'groups', 'events', 'meetings']
@@ -42,43 +45,48 @@ class RestrictedMail(BasisModel):
     @classmethod
     def get_restricted_mail(cls, from_address, token):
         try:
-            return cls.objects\
-                .prefetch_related(*cls.MANY_TO_MANY_RELATIONS)\
-                .get(used=None, from_address=from_address.lower(), token=token)
+            return cls.objects.get(used=None, from_address=from_address.lower(), token=token)
         except cls.DoesNotExist:
             return None
         except cls.MultipleObjectsReturned:
             log.exception('multiple_restricted_mails_returned')
             return None
 
-    def lookup_recipients(self):
+    def lookup_recipient_users(self):
         """
-        Loop over all many-to-many relations and lookup recipients.
+        Returns a queryset with the users receiving the mail. Weekly mails goes to all students,
+        users who has unsubscribed from the weekly mail are left out.
         """
-        all_users = []
-        all_raw_addresses = self.raw_addresses or []
-
-        for relation_name in self.MANY_TO_MANY_RELATIONS:
-            relation = getattr(self, relation_name)
-            for instance in relation.all():
-                restricted_lookup = getattr(instance, 'restricted_lookup', None)
-                if restricted_lookup:
-                    users, raw_addresses = restricted_lookup()
-                    all_users += list(users)
-                    all_raw_addresses += list(raw_addresses)
+        extra_ids = []
+        if self.weekly:
+            extra_ids.append(
+                AbakusGroup.lookup_recipient_ids(AbakusGroup.objects.filter(name='Students'))
+            )
 
+        users = lookup_recipients(self, self.MANY_TO_MANY_RELATIONS, extra_ids)
         if self.weekly:
-            all_users += (AbakusGroup.objects.get(name="Students").restricted_lookup()[0])
+            users = users.exclude(
+                pk__in=NotificationSetting.unsubscribed_user_ids(WEEKLY_MAIL, EMAIL)
+            )
+        return users
 
-        recipients = set(all_raw_addresses)
+    def iterate_recipients(self):
+        """
+        Stream the unique recipient addresses, the raw addresses first.
+        """
+        seen = set()
+        for address in self.raw_addresses or []:
+            if address not in seen:
+                seen.add(address)
+                yield address
 
-        for user in all_users:
-            if self.weekly:
-                if EMAIL not in NotificationSetting.active_channels(user, WEEKLY_MAIL):
-                    continue
-            recipients.add(user.email_address)
+        for _, address in iterate_addresses(self.lookup_recipient_users()):
+            if address not in seen:
+                seen.add(address)
+                yield address
 
-        return list(recipients)
+    def lookup_recipients(self):
+        return list(self.iterate_recipients())
 
     def mark_used(self, timestamp=None):
         """
@@ -111,3 +119,85 @@ class RestrictedMail(BasisModel):
     def create_token():
         token = get_random_string(128)
         return token
+
+
+class MailDelivery(TimeStampModel):
+    """
+    A received restricted mail waiting to be sent. The processed message is stored once, and
+    the recipients are sent in batches by celery.
+    """
+
+    restricted_mail = models.OneToOneField(
+        RestrictedMail, related_name='delivery', on_delete=models.CASCADE
+    )
+    sender = models.CharField(max_length=254)
+    message = models.BinaryField()
+    finished_at = models.DateTimeField(null=True)
+
+    def create_batches(self, batch_size):
+        """
+        Split the recipients of the restricted mail into batches. The recipients are streamed,
+        only one batch is kept in memory.
+        """
+        batches = []
+        recipients = []
+        for recipient in self.restricted_mail.iterate_recipients():
+            recipients.append(recipient)
+            if len(recipients) == batch_size:
+                batches.append(MailDeliveryBatch(delivery=self, recipients=recipients))
+                recipients = []
+            if len(batches) == 100:
+                MailDeliveryBatch.objects.bulk_create(batches)
+                batches = []
+
+        if recipients:
+            batches.append(MailDeliveryBatch(delivery=self, recipients=recipients))
+        MailDeliveryBatch.objects.bulk_create(batches)
+
+    def progress(self):
+        """
+        Returns the number of recipients, sent and rejected recipients and the number of
+        batches in each status.
+        """
+        batches = dict(
+            self.batches.values_list('status').annotate(count=models.Count('id'))
+            .order_by('status')
+        )
+        counts = self.batches.aggregate(
+            recipients=models.Sum(models.Func('recipients', function='CARDINALITY')),
+            sent=models.Sum('sent'),
+            rejected=models.Sum(models.Func('rejected', function='CARDINALITY')),
+        )
+        progress = {key: value or 0 for key, value in counts.items()}
+        progress['batches'] = batches
+        return progress
+
+    def finish(self):
+        """
+        Mark the delivery as finished when no batches are pending. Returns True for the caller
+        finishing the delivery, the last batches may complete at the same time.
+        """
+        if self.batches.filter(status=constants.BATCH_PENDING).exists():
+            return False
+        return bool(
+            MailDelivery.objects.filter(pk=self.pk, finished_at=None)
+            .update(finished_at=timezone.now())
+        )
+
+
+class MailDeliveryBatch(models.Model):
+    """
+    A batch of recipients, sent by one task over a single SMTP connection. The number of sent
+    recipients and the rejected recipients are stored when a send fails, a retry continues after
+    the last handled recipient.
+    """
+
+    delivery = models.ForeignKey(MailDelivery, related_name='batches', on_delete=models.CASCADE)
+    recipients = ArrayField(models.CharField(max_length=254))
+    status = models.CharField(
+        max_length=16, choices=constants.BATCH_STATUSES, default=constants.BATCH_PENDING
+    )
+    sent = models.PositiveIntegerField(default=0)
+    rejected = ArrayField(models.CharField(max_length=254), default=list)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
@@ -18,10 +18,12 @@ class ParserMessageType:
 
 
 class EmailParser:
-    def __init__(self, raw_message, mail_from, message_type):
+    def __init__(self, raw_message, mail_from, message_type, original_size=None):
         self.raw_message = raw_message
         self.mail_from = mail_from
         self.message_type = message_type
+        # File objects has no length, the size is passed by the caller.
+        self.original_size = original_size
         self.log = log
 
     def parse(self):
@@ -43,7 +45,8 @@ class EmailParser:
             raise DefectMessageException
 
         # Add headers used by LEGO
-        msg.original_size = len(self.raw_message)
+        msg.original_size = self.original_size if self.original_size is not None \
+            else len(self.raw_message)
         msg['X-MailFrom'] = self.mail_from
 
         return msg
@@ -0,0 +1,145 @@
+import time
+from smtplib import SMTPException, SMTPRecipientsRefused, SMTPResponseException
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from structlog import get_logger
+
+from lego import celery_app
+from lego.apps.action_handlers.registry import get_handler
+from lego.utils.tasks import AbakusTask
+
+from . import constants
+from .message import RawEmailMessage
+from .models import MailDelivery, MailDeliveryBatch, RestrictedMail
+
+log = get_logger()
+
+
+def finish_delivery(delivery):
+    """
+    Notify the creator of the restricted mail when the last batch is done. The creator is told
+    about recipients in failed batches and rejected recipients instead of a successful send.
+    """
+    if not delivery.finish():
+        return
+
+    progress = delivery.progress()
+    log.info('restricted_mail_delivery_finished', delivery_id=delivery.id, **progress)
+
+    restricted_mail = delivery.restricted_mail
+    handler = get_handler(RestrictedMail)
+    not_sent = progress['recipients'] - progress['sent']
+    if not not_sent:
+        return handler.run(restricted_mail, 'sent')
+
+    if restricted_mail.created_by:
+        handler.run(
+            restricted_mail, 'failure', sender=restricted_mail.created_by.email,
+            reason=f'{not_sent} av {progress["recipients"]} mottakere fikk ikke eposten'
+        )
+
+
+def is_permanent_error(error):
+    """
+    Refused recipients and 5xx replies fails again on a retry, other errors are temporary.
+    """
+    if isinstance(error, SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+@celery_app.task(serializer='json', bind=True, base=AbakusTask)
+def send_mail_delivery(self, delivery_id, logger_context=None):
+    """
+    Split the recipients of a received restricted mail into batches, and send each batch with a
+    separate task. The batches are sent in parallel by the workers, each over its own SMTP
+    connection.
+    """
+    self.setup_logger(logger_context)
+
+    with transaction.atomic():
+        delivery = MailDelivery.objects.select_for_update().select_related('restricted_mail')\
+            .get(pk=delivery_id)
+        if not delivery.batches.exists():
+            delivery.create_batches(settings.RESTRICTED_BATCH_SIZE)
+
+    batch_ids = list(
+        delivery.batches.filter(status=constants.BATCH_PENDING).values_list('id', flat=True)
+    )
+    log.info('restricted_mail_delivery_started', delivery_id=delivery_id, batches=len(batch_ids))
+
+    if not batch_ids:
+        return finish_delivery(delivery)
+
+    for batch_id in batch_ids:
+        send_mail_delivery_batch.delay(batch_id)
+
+
+@celery_app.task(serializer='json', bind=True, base=AbakusTask)
+def send_mail_delivery_batch(self, batch_id, logger_context=None):
+    """
+    Send the message to the recipients in a batch over one SMTP connection. The message is
+    serialized once, only the envelope and the To header changes for each recipient.
+    Recipients rejected by the server are skipped. Batches failing with a temporary error are
+    retried with a growing delay and continues after the last handled recipient.
+    """
+    self.setup_logger(logger_context)
+
+    batch = MailDeliveryBatch.objects.select_related('delivery__restricted_mail').get(pk=batch_id)
+    if batch.status != constants.BATCH_PENDING:
+        return
+
+    delivery = batch.delivery
+    raw = bytes(delivery.message)
+    header_end = RawEmailMessage.find_header_end(raw)
+
+    start = time.perf_counter()
+    sent = batch.sent
+    rejected = list(batch.rejected)
+    try:
+        with get_connection(fail_silently=False) as connection:
+            for recipient in batch.recipients[batch.sent + len(batch.rejected):]:
+                try:
+                    connection.send_messages(
+                        [RawEmailMessage(recipient, delivery.sender, raw, header_end)]
+                    )
+                    sent += 1
+                except SMTPException as e:
+                    if not is_permanent_error(e):
+                        raise
+                    log.warn(
+                        'restricted_mail_recipient_rejected', batch_id=batch.id,
+                        recipient=recipient, error=str(e)
+                    )
+                    rejected.append(recipient)
+    except (SMTPException, OSError) as e:
+        failed = self.request.retries >= settings.RESTRICTED_BATCH_MAX_RETRIES
+        MailDeliveryBatch.objects.filter(pk=batch.pk).update(
+            sent=sent, rejected=rejected, attempts=batch.attempts + 1, error=str(e),
+            status=constants.BATCH_FAILED if failed else constants.BATCH_PENDING
+        )
+        log.warn(
+            'restricted_mail_batch_error', batch_id=batch.id, sent=sent,
+            attempts=batch.attempts + 1, error=str(e)
+        )
+        if failed:
+            return finish_delivery(delivery)
+        raise self.retry(
+            exc=e, countdown=10 * 2**self.request.retries,
+            max_retries=settings.RESTRICTED_BATCH_MAX_RETRIES
+        )
+
+    MailDeliveryBatch.objects.filter(pk=batch.pk).update(
+        sent=sent, rejected=rejected, attempts=batch.attempts + 1, error='',
+        status=constants.BATCH_SENT
+    )
+    log.info(
+        'restricted_mail_batch_sent', batch_id=batch.id, recipients=sent - batch.sent,
+        rejected=len(rejected) - len(batch.rejected),
+        duration_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+    finish_delivery(delivery)
@@ -0,0 +1,134 @@
+import asyncio
+import io
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from lego.apps.restricted.lmtp import channel
+from lego.apps.restricted.lmtp.server import LMTPServer
+from lego.apps.restricted.lmtp.service import process_message
+
+from .utils import read_file
+
+RECIPIENT = 'restricted@abakus.no'
+
+
+class LMTPServerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.received = []
+        self.lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        options = dict(workers=4, max_message_size=100000, spool_max_memory=1000, loop=self.loop)
+        self.server = LMTPServer(self.handler, (RECIPIENT, ), '127.0.0.1', 0, **options)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.close()
+
+    def handler(self, mailfrom, spool, size):
+        with self.lock:
+            self.received.append((mailfrom, spool.read(), size, spool._rolled))
+        return channel.OK_250
+
+    def connect(self):
+        return smtplib.LMTP(*self.server.address)
+
+    def test_deliver_message(self):
+        client = self.connect()
+        client.sendmail('test@test.com', [RECIPIENT], 'Subject: Test\r\n\r\nHello\r\n')
+        client.quit()
+
+        mailfrom, data, size, rolled = self.received[0]
+        self.assertEqual(mailfrom, 'test@test.com')
+        self.assertEqual(data, b'Subject: Test\r\n\r\nHello\r\n')
+        self.assertEqual(size, len(data))
+        self.assertFalse(rolled)
+
+    def test_reject_unknown_recipient(self):
+        client = self.connect()
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            client.sendmail('test@test.com', ['unknown@abakus.no'], 'Subject: Test\r\n\r\n')
+        client.quit()
+        self.assertEqual(self.received, [])
+
+    def test_dot_unstuffing(self):
+        """The client stuffs lines starting with a dot, the server should restore them"""
+        client = self.connect()
+        client.sendmail('test@test.com', [RECIPIENT], 'Subject: Test\r\n\r\n.\r\n..dot\r\n')
+        client.quit()
+        self.assertEqual(self.received[0][1], b'Subject: Test\r\n\r\n.\r\n..dot\r\n')
+
+    def test_spool_large_message(self):
+        """Messages larger than spool_max_memory are written to a file"""
+        body = '\r\n'.join('x' * 70 for _ in range(100))
+        client = self.connect()
+        client.sendmail('test@test.com', [RECIPIENT], f'Subject: Test\r\n\r\n{body}\r\n')
+        client.quit()
+
+        _, data, size, rolled = self.received[0]
+        self.assertTrue(rolled)
+        self.assertEqual(size, len(data))
+
+    def test_message_too_large(self):
+        body = '\r\n'.join('x' * 70 for _ in range(2000))
+        client = self.connect()
+        with self.assertRaises(smtplib.SMTPDataError) as context:
+            client.sendmail('test@test.com', [RECIPIENT], f'Subject: Test\r\n\r\n{body}\r\n')
+        client.quit()
+        self.assertEqual(context.exception.smtp_code, 552)
+        self.assertEqual(self.received, [])
+
+    def test_concurrent_sessions(self):
+        def send(index):
+            client = self.connect()
+            for message in range(5):
+                body = f'Subject: {index} {message}\r\n\r\n'
+                client.sendmail(f'{index}@test.com', [RECIPIENT], body)
+            client.quit()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(send, range(10)))
+
+        self.assertEqual(len(self.received), 50)
+        stats = self.server.stats.snapshot()
+        self.assertEqual(stats['sessions'], 10)
+        self.assertEqual(stats['messages'], 50)
+        self.assertIsNotNone(stats['latency_p95_ms'])
+
+
+class ProcessMessageTestCase(SimpleTestCase):
+    def read_spool(self, name):
+        raw = read_file(f'{settings.BASE_DIR}/apps/restricted/fixtures/emails/{name}').encode()
+        return io.BytesIO(raw), len(raw)
+
+    @mock.patch('lego.apps.restricted.lmtp.service.close_old_connections')
+    @mock.patch('lego.apps.restricted.lmtp.service.MessageProcessor')
+    def test_process_message(self, mock_processor, mock_close):
+        spool, size = self.read_spool('valid.txt')
+
+        status = process_message('test@test.com', spool, size)
+
+        self.assertEqual(status, channel.OK_250)
+        mailfrom, message, message_data = mock_processor.call_args[0]
+        self.assertEqual(mailfrom, 'test@test.com')
+        self.assertEqual(message_data['original_size'], size)
+        mock_processor.return_value.process_message.assert_called_once()
+
+    @mock.patch('lego.apps.restricted.lmtp.service.close_old_connections')
+    @mock.patch('lego.apps.restricted.lmtp.service.MessageProcessor')
+    def test_process_message_without_message_id(self, mock_processor, mock_close):
+        spool, size = self.read_spool('no_message_id.txt')
+
+        status = process_message('test@test.com', spool, size)
+
+        self.assertEqual(status, channel.ERR_550_MID)
+        mock_processor.assert_not_called()
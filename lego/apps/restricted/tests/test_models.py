@@ -1,8 +1,9 @@
+from lego.apps.email.models import EmailAddress
 from lego.apps.events.tests.utils import get_dummy_users
 from lego.apps.notifications.constants import EMAIL, PUSH, WEEKLY_MAIL
 from lego.apps.notifications.models import NotificationSetting
 from lego.apps.restricted.models import RestrictedMail
-from lego.apps.users.models import AbakusGroup
+from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseTestCase
 
 
@@ -22,6 +23,37 @@ class RestrictedMailModelTestCase(BaseTestCase):
 
         self.assertCountEqual(recipients, ['test1@user.com', 'test2@user.com'])
 
+    def test_lookup_recipients_in_one_query(self):
+        """All relations are resolved by a single query"""
+        restricted_mail = RestrictedMail.objects.get(id=1)
+        with self.assertNumQueries(1):
+            restricted_mail.lookup_recipients()
+
+    def test_lookup_recipients_includes_descendant_groups(self):
+        """Members of child groups receives mail sent to the parent group"""
+        restricted_mail = RestrictedMail.objects.create(from_address='test@test.no')
+        parent = AbakusGroup.objects.get(name='Abakus')
+        child = AbakusGroup.objects.create(name='RestrictedChild', parent=parent)
+        user = get_dummy_users(1)[0]
+        child.add_user(user)
+        restricted_mail.groups.add(parent)
+
+        self.assertIn(user.email, restricted_mail.lookup_recipients())
+
+    def test_lookup_recipients_uses_internal_address(self):
+        """Users with a GSuite account receives mail on the internal address"""
+        restricted_mail = RestrictedMail.objects.create(
+            from_address='test@test.no', raw_addresses=['raw@test.no']
+        )
+        user = User.objects.get(username='test1')
+        user.internal_email = EmailAddress.objects.create(email='internaltest1')
+        user.save()
+        restricted_mail.users.add(user)
+
+        recipients = restricted_mail.lookup_recipients()
+        self.assertCountEqual(recipients, ['raw@test.no', user.email_address])
+        self.assertTrue(user.email_address.startswith('internaltest1@'))
+
     def test_mark_used(self):
         """The used field is not None when the item is marked as used"""
         restricted_mail = RestrictedMail.objects.get(id=1)
@@ -78,23 +78,15 @@ class MessageProcessorTestCase(BaseTestCase):
         self.processor.decorate(self.message, False, 'test@test.com')
         self.assertTrue(len(self.message.get_payload()) > payloads)
 
-    def test_send(self):
-        """Test the outbox and make sure we have correct headers in the messages."""
-        raw_message = read_file(
-            f'{settings.BASE_DIR}/apps/restricted/fixtures/emails/clean_headers.txt'
-        )
-        parser = EmailParser(raw_message, 'test@test.com', ParserMessageType.STRING)
-        message = parser.parse()
-        new_message = self.processor.rewrite_message(message, 'test@test.com')
-
-        messages = self.processor.send(
-            ['test1@test.com', 'test2@test.com'], 'test@test.com', new_message
-        )
-        self.assertEquals(2, messages)
-
-        outbox = mail.outbox
-        first_message = outbox[0].message()
-        self.assertSequenceEqual(
-            ['Subject', 'Content-Type', 'MIME-Version', 'Sender', 'From', 'To'],
-            first_message.keys()
-        )
+    @mock.patch('lego.apps.restricted.message_processor.send_mail_delivery')
+    def test_process_message_stores_delivery(self, mock_send_mail_delivery):
+        """The message is stored once and marked as used, nothing is sent right away"""
+        RestrictedMail.objects.filter(id=1).update(token='test_token')
+        processor = MessageProcessor('test@abakus.no', self.message, {})
+        delivery = processor.process_message()
+
+        self.assertEqual(delivery.restricted_mail_id, 1)
+        self.assertIn(b'Subject', bytes(delivery.message))
+        self.assertNotIn(b'token.txt', bytes(delivery.message))
+        self.assertIsNotNone(RestrictedMail.objects.get(id=1).used)
+        self.assertEqual(len(mail.outbox), 0)
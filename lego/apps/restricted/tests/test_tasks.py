@@ -0,0 +1,212 @@
+import asyncore
+import smtpd
+import threading
+from email import message_from_bytes
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import override_settings
+
+from lego.apps.restricted import constants
+from lego.apps.restricted.message_processor import MessageProcessor
+from lego.apps.restricted.models import MailDelivery, RestrictedMail
+from lego.apps.restricted.parser import EmailParser, ParserMessageType
+from lego.apps.restricted.tasks import send_mail_delivery
+from lego.apps.restricted.tests.utils import read_file
+from lego.utils.test_utils import BaseTestCase
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """
+    Drops the connection once, after the first message.
+    """
+    failures = 1
+
+    def send_messages(self, messages):
+        if len(mail.outbox) == 1 and FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class RejectingEmailBackend(locmem.EmailBackend):
+    """
+    Refuses one of the recipients with the given reply code.
+    """
+    code = 550
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.recipient == 'raw1@test.com':
+                raise SMTPRecipientsRefused({message.recipient: (self.code, b'Refused')})
+        return super().send_messages(messages)
+
+
+class SMTPSink(smtpd.SMTPServer):
+    """
+    Local debugging SMTP server collecting the received messages.
+    """
+
+    def __init__(self):
+        self.received = []
+        super().__init__(('127.0.0.1', 0), None, decode_data=False)
+
+    @property
+    def port(self):
+        return self.socket.getsockname()[1]
+
+    def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+        self.received.append((mailfrom, rcpttos, data))
+
+
+@override_settings(RESTRICTED_BATCH_SIZE=2)
+class MailDeliveryTestCase(BaseTestCase):
+
+    fixtures = [
+        'test_abakus_groups.yaml', 'test_users.yaml', 'test_companies.yaml', 'test_events.yaml',
+        'test_restricted_mails.yaml'
+    ]
+
+    def setUp(self):
+        raw_message = read_file(f'{settings.BASE_DIR}/apps/restricted/fixtures/emails/valid.txt')
+        message = EmailParser(raw_message, 'test@test.com', ParserMessageType.STRING).parse()
+        message = MessageProcessor.rewrite_message(message, 'test@abakus.no')
+
+        self.restricted_mail = RestrictedMail.objects.get(id=1)
+        self.restricted_mail.raw_addresses = ['raw1@test.com', 'raw2@test.com']
+        self.restricted_mail.save()
+        self.recipients = self.restricted_mail.lookup_recipients()
+        self.delivery = MessageProcessor.persist(self.restricted_mail, 'test@abakus.no', message)
+
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_delivery_is_sent_in_batches(self, mock_get_handler):
+        """Each recipient gets one message, and the creator is notified once"""
+        send_mail_delivery.delay(self.delivery.id)
+
+        self.assertCountEqual([message.recipient for message in mail.outbox], self.recipients)
+        self.assertEqual(self.delivery.batches.count(), 2)
+        progress = dict(recipients=4, sent=4, rejected=0, batches={constants.BATCH_SENT: 2})
+        self.assertEqual(self.delivery.progress(), progress)
+        self.delivery.refresh_from_db()
+        self.assertIsNotNone(self.delivery.finished_at)
+        mock_get_handler.return_value.run.assert_called_once_with(self.restricted_mail, 'sent')
+
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_message_headers(self, mock_get_handler):
+        """Test the outbox and make sure we have correct headers in the messages."""
+        raw_message = read_file(
+            f'{settings.BASE_DIR}/apps/restricted/fixtures/emails/clean_headers.txt'
+        )
+        message = EmailParser(raw_message, 'test@test.com', ParserMessageType.STRING).parse()
+        message = MessageProcessor.rewrite_message(message, 'test@test.com')
+        self.delivery.delete()
+        delivery = MessageProcessor.persist(self.restricted_mail, 'test@test.com', message)
+
+        send_mail_delivery.delay(delivery.id)
+        first_message = message_from_bytes(mail.outbox[0].message().as_bytes())
+        self.assertSequenceEqual(
+            ['Subject', 'Content-Type', 'MIME-Version', 'Sender', 'From', 'To'],
+            first_message.keys()
+        )
+
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_recipients_share_serialized_message(self, mock_get_handler):
+        """Only the To header differs between the messages"""
+        send_mail_delivery.delay(self.delivery.id)
+
+        first, second = [message.message().as_bytes(linesep='\r\n') for message in mail.outbox[:2]]
+        self.assertEqual(message_from_bytes(first)['To'], mail.outbox[0].recipient)
+        self.assertEqual(message_from_bytes(second)['To'], mail.outbox[1].recipient)
+        self.assertEqual(first.split(b'\r\n\r\n', 1)[1], second.split(b'\r\n\r\n', 1)[1])
+
+    @override_settings(EMAIL_BACKEND='lego.apps.restricted.tests.test_tasks.FlakyEmailBackend')
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_retry_continues_after_last_sent_recipient(self, mock_get_handler):
+        """A batch failing halfway is retried without sending duplicates"""
+        FlakyEmailBackend.failures = 1
+        send_mail_delivery.delay(self.delivery.id)
+
+        self.assertCountEqual([message.recipient for message in mail.outbox], self.recipients)
+        self.assertEqual(sorted(self.delivery.batches.values_list('attempts', flat=True)), [1, 2])
+
+    @override_settings(RESTRICTED_BATCH_MAX_RETRIES=0)
+    @override_settings(EMAIL_BACKEND='lego.apps.restricted.tests.test_tasks.FlakyEmailBackend')
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_failed_batch_finishes_delivery(self, mock_get_handler):
+        """The delivery finishes when the retries are used up, and the creator is told"""
+        FlakyEmailBackend.failures = 1
+        send_mail_delivery.delay(self.delivery.id)
+
+        progress = self.delivery.progress()
+        self.assertEqual(progress['batches'], {constants.BATCH_SENT: 1, constants.BATCH_FAILED: 1})
+        self.assertEqual(progress['sent'], 3)
+        mock_get_handler.return_value.run.assert_called_once_with(
+            self.restricted_mail, 'failure', sender=self.restricted_mail.created_by.email,
+            reason='1 av 4 mottakere fikk ikke eposten'
+        )
+
+    @override_settings(EMAIL_BACKEND='lego.apps.restricted.tests.test_tasks.RejectingEmailBackend')
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_rejected_recipient_is_skipped(self, mock_get_handler):
+        """A permanently refused recipient is recorded, the rest of the batch is sent"""
+        send_mail_delivery.delay(self.delivery.id)
+
+        self.assertCountEqual(
+            [message.recipient for message in mail.outbox],
+            [recipient for recipient in self.recipients if recipient != 'raw1@test.com']
+        )
+        progress = dict(recipients=4, sent=3, rejected=1, batches={constants.BATCH_SENT: 2})
+        self.assertEqual(self.delivery.progress(), progress)
+        self.assertEqual(list(self.delivery.batches.values_list('attempts', flat=True)), [1, 1])
+        mock_get_handler.return_value.run.assert_called_once_with(
+            self.restricted_mail, 'failure', sender=self.restricted_mail.created_by.email,
+            reason='1 av 4 mottakere fikk ikke eposten'
+        )
+
+    @override_settings(RESTRICTED_BATCH_MAX_RETRIES=1)
+    @override_settings(EMAIL_BACKEND='lego.apps.restricted.tests.test_tasks.RejectingEmailBackend')
+    @mock.patch.object(RejectingEmailBackend, 'code', 450)
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_temporary_refusal_is_retried(self, mock_get_handler):
+        """A 4xx refusal retries the batch instead of skipping the recipient"""
+        send_mail_delivery.delay(self.delivery.id)
+
+        batch = self.delivery.batches.get(recipients__contains=['raw1@test.com'])
+        self.assertEqual(batch.status, constants.BATCH_FAILED)
+        self.assertEqual(batch.attempts, 2)
+        self.assertEqual(batch.rejected, [])
+
+    @mock.patch('lego.apps.restricted.tasks.get_handler')
+    def test_delivery_to_smtp_server(self, mock_get_handler):
+        """Deliver to a local SMTP server, only the envelope and To header differs"""
+        server = SMTPSink()
+        thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.05})
+        thread.start()
+        try:
+            smtp_settings = {
+                'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                'EMAIL_HOST': '127.0.0.1',
+                'EMAIL_PORT': server.port,
+                'EMAIL_USE_TLS': False,
+                'EMAIL_HOST_USER': '',
+                'EMAIL_HOST_PASSWORD': '',
+            }
+            with override_settings(**smtp_settings):
+                send_mail_delivery.delay(self.delivery.id)
+        finally:
+            server.close()
+            thread.join(5)
+
+        self.assertCountEqual(
+            [rcpttos for _, rcpttos, _ in server.received],
+            [[recipient] for recipient in self.recipients]
+        )
+        for mailfrom, rcpttos, data in server.received:
+            message = message_from_bytes(data)
+            self.assertEqual(mailfrom, 'test@abakus.no')
+            self.assertEqual(message['To'], rcpttos[0])
+            self.assertEqual(message['Subject'], 'Restricted Message')
+        self.assertEqual(MailDelivery.objects.get(pk=self.delivery.pk).progress()['sent'], 4)
@@ -1,9 +1,16 @@
 from django.apps import AppConfig
 from django.conf import settings
+from django.core.signals import request_started
 from django.utils.module_loading import autodiscover_modules
 
 from . import backend
 from .backends.elasticsearch import ElasticsearchBackend
+from .backends.local import LocalBackend
+
+BACKENDS = {
+    ElasticsearchBackend.name: ElasticsearchBackend,
+    LocalBackend.name: LocalBackend,
+}
 
 
 class SearchConfig(AppConfig):
@@ -18,9 +25,16 @@ class SearchConfig(AppConfig):
         """
         if not settings.TESTING:
             # Simple way to initialize the search backend. We may change this in the future.
-            search_backed = ElasticsearchBackend()
+            search_backed = BACKENDS[settings.SEARCH_BACKEND]()
             search_backed.set_up()
             backend.current_backend = search_backed
 
             autodiscover_modules('search_indexes')
             from .signals import post_save_callback, post_delete_callback  # noqa
+
+            if isinstance(search_backed, LocalBackend):
+                # The database isn't available yet, fill the index before the first request.
+                request_started.connect(
+                    lambda **kwargs: search_backed.populate(), weak=False,
+                    dispatch_uid='search_local_backend_populate'
+                )
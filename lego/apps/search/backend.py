@@ -31,10 +31,11 @@ class SearchBacked:
         """
         pass
 
-    def update_many(self, tuple_list):
+    def update_many(self, tuple_list, index=None):
         """
         Bulk update items. Used by the update function by default.
         The tuple_list us a list of tuples containing ('content_type', 'pk', 'data')
+        Write to index instead of the live index when the argument is provided.
         """
         raise NotImplementedError('Please implement the update_many function.')
 
@@ -57,15 +58,40 @@ class SearchBacked:
         """
         raise NotImplementedError('Please implement the clear function.')
 
-    def search(self, query, content_types=None, filters=None):
+    def create_index(self):
+        """
+        Create a new empty index used by rebuild_index. Changes is written to both the live and
+        the new index until activate_index is called. Backends without support for multiple
+        indexes clears the live index and returns None.
+        """
+        self.clear()
+        return None
+
+    def refresh_index(self, index):
+        """
+        Called by rebuild_index while it builds index. Backends writing changes to the new index
+        stops doing so when the rebuild stops calling this function.
+        """
+        pass
+
+    def activate_index(self, index, delete_old=True):
+        """
+        Replace the live index with an index created by create_index.
+        """
+        pass
+
+    def search(self, query, content_types=None, filters=None, permissions=None):
         """
         Search on a string 'query', use content_type or/and filters to filter the search.
+        Documents with indexed object permissions is filtered with the DocumentPermissions passed
+        in permissions.
         """
         raise NotImplementedError('Please implement the search function.')
 
-    def autocomplete(self, query, content_types=None):
+    def autocomplete(self, query, content_types=None, permissions=None):
         """
         Autocomplete on a string 'query', use content_type or/and filters to filter the search.
+        Documents with indexed object permissions is filtered like in the search function.
         """
         raise NotImplementedError('Please implement the autocomplete function.')
 
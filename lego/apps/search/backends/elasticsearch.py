@@ -1,6 +1,8 @@
 import certifi
 from django.conf import settings
+from django.core.cache import cache
 from django.template.loader import render_to_string
+from django.utils import timezone
 from elasticsearch import Elasticsearch, NotFoundError
 from elasticsearch.helpers import bulk
 
@@ -11,6 +13,13 @@ class ElasticsearchBackend(SearchBacked):
 
     name = 'elasticsearch'
 
+    # Prefix used on the object permission fields in the documents.
+    permission_prefix = 'acl_'
+    # Cache key with the name of the index being built by rebuild_index. The key expires when
+    # the rebuild stops refreshing it, a crashed rebuild doesn't leave the writes doubled.
+    rebuild_index_key = 'search:rebuild_index'
+    rebuild_index_timeout = 15 * 60
+
     connection = None
 
     def set_up(self):
@@ -26,19 +35,32 @@ class ElasticsearchBackend(SearchBacked):
         """
         return settings.SEARCH_INDEX
 
-    def _bulk(self, actions):
+    def _write_indexes(self, index=None):
+        """
+        Return the indexes changes is written to. SEARCH_INDEX is an alias for the live index,
+        changes is also written to the index being built by rebuild_index.
+        """
+        if index:
+            return [index]
+        indexes = [self._index_name()]
+        rebuild_index = cache.get(self.rebuild_index_key)
+        if rebuild_index:
+            indexes.append(rebuild_index)
+        return indexes
+
+    def _bulk(self, actions, **kwargs):
         """
         Execute many operations using the bulk interface.
         """
-        return bulk(self.connection, actions, stats_only=True)
+        return bulk(self.connection, actions, stats_only=True, **kwargs)
 
-    def _index(self, content_type, pk, data):
+    def _index(self, content_type, pk, data, index=None):
         """
         Shortcut to index a instance.
         """
         action = {
             '_op_type': 'index',
-            '_index': self._index_name(),
+            '_index': index or self._index_name(),
             '_id': f'{content_type}-{pk}',
             '_type': 'document',
             'id_': pk,
@@ -47,13 +69,13 @@ class ElasticsearchBackend(SearchBacked):
         data.update(action)
         return data
 
-    def _remove(self, content_type, pk):
+    def _remove(self, content_type, pk, index=None):
         """
         Shortcut to create a item removal operation.
         """
         action = {
             '_op_type': 'delete',
-            '_index': self._index_name(),
+            '_index': index or self._index_name(),
             '_id': f'{content_type}-{pk}',
             '_type': 'document',
         }
@@ -61,13 +83,59 @@ class ElasticsearchBackend(SearchBacked):
 
     def _clear(self):
         """
-        We do a index deletion and creation when we clean a index.
+        We create a new empty index and point the alias to it when we clean a index.
         """
-        try:
-            self.connection.indices.delete(settings.SEARCH_INDEX)
-        except NotFoundError:
-            pass
-        self.connection.indices.create(settings.SEARCH_INDEX)
+        self.activate_index(self._create_index())
+
+    def _create_index(self):
+        """
+        Create a new index named after the alias and a timestamp. The index template matches the
+        name, the index gets the same settings and mappings as the live index.
+        """
+        index = f'{self._index_name()}-{timezone.now():%Y%m%d%H%M%S%f}'
+        self.connection.indices.create(index)
+        return index
+
+    def create_index(self):
+        index = self._create_index()
+        self.refresh_index(index)
+        return index
+
+    def refresh_index(self, index):
+        cache.set(self.rebuild_index_key, index, self.rebuild_index_timeout)
+
+    def activate_index(self, index, delete_old=True):
+        """
+        Point the alias to the new index, the change is atomic for indexes behind the alias.
+        """
+        alias = self._index_name()
+        indices = self.connection.indices
+        actions = [{'add': {'index': index, 'alias': alias}}]
+
+        old_indexes = []
+        if indices.exists_alias(name=alias):
+            old_indexes = [name for name in indices.get_alias(name=alias).keys() if name != index]
+            actions = [{
+                'remove': {
+                    'index': name,
+                    'alias': alias
+                }
+            } for name in old_indexes] + actions
+        elif indices.exists(index=alias):
+            # The live index was created before the alias was introduced. The index has to be
+            # removed before the alias can use the name, this only happens once.
+            indices.delete(index=alias)
+
+        indices.update_aliases(body={'actions': actions})
+        if cache.get(self.rebuild_index_key) == index:
+            cache.delete(self.rebuild_index_key)
+
+        if delete_old:
+            for name in old_indexes:
+                try:
+                    indices.delete(index=name)
+                except NotFoundError:
+                    pass
 
     def _search(self, payload):
         return self.connection.search(settings.SEARCH_INDEX, doc_type='document', body=payload)
@@ -103,7 +171,7 @@ class ElasticsearchBackend(SearchBacked):
         """
         self._refresh_template()
 
-    def update_many(self, tuple_list):
+    def update_many(self, tuple_list, index=None):
         def create_operation(data_tuple):
             content_type, pk, data = data_tuple
             data_fields = dict()
@@ -120,53 +188,108 @@ class ElasticsearchBackend(SearchBacked):
             filter_fields = data.get('filters', {})
             data_fields.update({f'{k}_filter': v for k, v in filter_fields.items()})
 
-            return self._index(content_type, pk, data_fields)
+            # Add object permissions
+            permissions = data.get('permissions') or {}
+            data_fields.update({f'{self.permission_prefix}{k}': v for k, v in permissions.items()})
 
-        return self._bulk(map(create_operation, tuple_list))
+            return content_type, pk, data_fields
+
+        indexes = self._write_indexes(index)
+
+        def create_operations():
+            for data_tuple in tuple_list:
+                content_type, pk, data_fields = create_operation(data_tuple)
+                for index_name in indexes:
+                    yield self._index(content_type, pk, dict(data_fields), index_name)
+
+        return self._bulk(create_operations())
 
     def remove_many(self, tuple_list):
-        def create_operation(data_tuple):
+        def create_operation(data_tuple, index=None):
             content_type, pk = data_tuple
-            return self._remove(content_type, pk)
-
+            return self._remove(content_type, pk, index)
+
+        tuple_list = list(tuple_list)
+        _, *rebuild_indexes = self._write_indexes()
+        for index in rebuild_indexes:
+            # The document may not be copied to the new index yet.
+            self._bulk(
+                (create_operation(data_tuple, index) for data_tuple in tuple_list),
+                raise_on_error=False
+            )
         return self._bulk(map(create_operation, tuple_list))
 
     def clear(self):
         self._clear()
 
-    def search(self, query, content_types=None, filters=None):
+    def _permission_filter(self, permissions):
         """
-        TODO: Implement content type filtering
+        Build a filter matching the documents the user can view. Documents of content types
+        without indexed object permissions is matched and checked after the search.
         """
-        if not filters:
-            search_query = {
-                'query': {
-                    'multi_match': {
-                        "query": query,
-                        "operator": "and",
-                        "fields": "*"
+        prefix = self.permission_prefix
+        should = [{'bool': {'must_not': {'terms': {'type_': permissions.content_types}}}}]
+
+        if permissions.public:
+            should.append({'term': {f'{prefix}require_auth': False}})
+
+        if permissions.user_id:
+            if permissions.granted_content_types:
+                should.append({'terms': {'type_': permissions.granted_content_types}})
+            if permissions.group_ids:
+                should += [
+                    {
+                        'terms': {
+                            f'{prefix}can_view_groups': permissions.group_ids
+                        }
                     },
-                }
-            }
-        else:
-            search_query = {
-                'query': {
-                    'bool': {
-                        'must': {
-                            'multi_match': {
-                                'query': query,
-                                'operator': 'and',
-                                "fields": "*"
-                            }
-                        },
-                        'filter': [{
-                            'terms': {
-                                f'{k}_filter': v
-                            }
-                        } for k, v in filters.items()]
+                    {
+                        'terms': {
+                            f'{prefix}can_edit_groups': permissions.group_ids
+                        }
+                    },
+                ]
+            should += [
+                {
+                    'term': {
+                        f'{prefix}can_edit_users': permissions.user_id
                     }
-                }
+                },
+                {
+                    'term': {
+                        f'{prefix}created_by': permissions.user_id
+                    }
+                },
+            ]
+
+        return {'bool': {'should': should, 'minimum_should_match': 1}}
+
+    def _document_permissions(self, source):
+        prefix = self.permission_prefix
+        return {key[len(prefix):]: value for key, value in source.items() if key.startswith(prefix)}
+
+    def search(self, query, content_types=None, filters=None, permissions=None):
+        """
+        TODO: Implement content type filtering
+        """
+        multi_match = {
+            'multi_match': {
+                'query': query,
+                'operator': 'and',
+                'fields': '*',
+                # The permission fields isn't text, don't fail on them.
+                'lenient': True,
             }
+        }
+
+        filter_query = [{'terms': {f'{k}_filter': v}} for k, v in (filters or {}).items()]
+        if permissions is not None:
+            filter_query.append(self._permission_filter(permissions))
+
+        if not filter_query:
+            search_query = {'query': multi_match}
+        else:
+            search_query = {'query': {'bool': {'must': multi_match, 'filter': filter_query}}}
 
         result = self._search(search_query)
 
@@ -183,7 +306,7 @@ class ElasticsearchBackend(SearchBacked):
 
         return filter(lambda hit: hit is not None, map(parse_result, result['hits']['hits']))
 
-    def autocomplete(self, query, content_types=None):
+    def autocomplete(self, query, content_types=None, permissions=None):
         autocomplete_query = {
             'suggest': {
                 'autocomplete': {
@@ -209,6 +332,11 @@ class ElasticsearchBackend(SearchBacked):
         def parse_result(hit):
             source = hit['_source']
             search_index = self.get_search_index(hit['_source']['type_'])
+            # The completion suggester can't filter on the permissions, check them here.
+            if permissions is not None and not permissions.allows(
+                source['type_'], self._document_permissions(source)
+            ):
+                return None
             if search_index:
                 result_fields = [
                     field for field in search_index.get_autocomplete_result_fields()
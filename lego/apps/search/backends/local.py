@@ -0,0 +1,188 @@
+import re
+import threading
+from collections import Counter
+
+from lego.apps.search import registry
+from lego.apps.search.backend import SearchBacked
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def tokenize(value):
+    """
+    Split a value into lowercase words, html tags is removed. Lists and dicts are tokenized
+    recursively.
+    """
+    if value is None or isinstance(value, bool):
+        return []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return [token for item in value for token in tokenize(item)]
+    return TOKEN_PATTERN.findall(TAG_PATTERN.sub(' ', str(value)).lower())
+
+
+class LocalBackend(SearchBacked):
+    """
+    In-process search backend with an inverted index. The index lives in the memory of each
+    process and is lost on restart. The process serving requests fills the index from the
+    database before the first request, and indexes its own changes when they are committed.
+    Changes made by other processes, like celery workers, never reaches the index, so only use
+    this backend for tests and development with runserver. The results follows the same rules
+    as the elasticsearch backend: every word in the query has to match, filters matches any of
+    the values and autocomplete matches the beginning of the autocomplete values.
+    """
+
+    name = 'local'
+
+    autocomplete_size = 10
+
+    def set_up(self):
+        self.lock = threading.RLock()
+        self.documents = {}
+        self.postings = {}
+        self.populated = False
+
+    def populate(self):
+        """
+        Index every registered search index, only the first call does any work.
+        """
+        with self.lock:
+            if self.populated:
+                return
+            self.populated = True
+
+            for search_index in registry.index_registry.values():
+                for batch in search_index.iterate():
+                    documents = [
+                        search_index.prepare(instance) for instance in batch
+                        if search_index.should_update(instance)
+                    ]
+                    self.update_many(
+                        [
+                            (document['content_type'], document['pk'], document['data'])
+                            for document in documents
+                        ]
+                    )
+
+    def _unindex(self, key):
+        document = self.documents.pop(key, None)
+        if document:
+            for token in document['tokens']:
+                keys = self.postings.get(token)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[token]
+
+    def update_many(self, tuple_list, index=None):
+        with self.lock:
+            for content_type, pk, data in tuple_list:
+                key = (content_type, str(pk))
+                self._unindex(key)
+
+                fields = data.get('fields', {})
+                autocomplete = data.get('autocomplete') or []
+                if isinstance(autocomplete, str):
+                    autocomplete = [autocomplete]
+
+                tokens = Counter(tokenize(fields))
+                self.documents[key] = {
+                    'id': pk,
+                    'content_type': content_type,
+                    'fields': fields,
+                    'filters': data.get('filters', {}),
+                    'permissions': data.get('permissions'),
+                    'autocomplete': autocomplete,
+                    'tokens': tokens,
+                }
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(key)
+
+    def remove_many(self, tuple_list):
+        with self.lock:
+            for content_type, pk in tuple_list:
+                self._unindex((content_type, str(pk)))
+
+    def clear(self):
+        with self.lock:
+            self.documents = {}
+            self.postings = {}
+
+    def _matches_filters(self, document, filters):
+        for key, values in filters.items():
+            value = document['filters'].get(key)
+            document_values = value if isinstance(value, (list, tuple)) else [value]
+            if not {str(value) for value in document_values} & {str(value) for value in values}:
+                return False
+        return True
+
+    def _allowed(self, document, permissions):
+        if permissions is None:
+            return True
+        return permissions.allows(document['content_type'], document['permissions'] or {})
+
+    def _format(self, document, result_fields):
+        fields = document['fields']
+        result = {field: fields[field] for field in result_fields if field in fields}
+        result.update({'id': document['id'], 'content_type': document['content_type']})
+        return result
+
+    def search(self, query, content_types=None, filters=None, permissions=None):
+        """
+        Like the elasticsearch backend content_types isn't used by search.
+        """
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+
+        with self.lock:
+            postings = [self.postings.get(token, set()) for token in tokens]
+            keys = set.intersection(*postings)
+            documents = [self.documents[key] for key in keys]
+
+        documents = [
+            document for document in documents if self._matches_filters(document, filters or {})
+            and self._allowed(document, permissions)
+        ]
+        documents.sort(
+            key=lambda document: (
+                -sum(document['tokens'][token] for token in tokens), document['content_type'],
+                str(document['id'])
+            )
+        )
+
+        result = []
+        for document in documents:
+            search_index = self.get_search_index(document['content_type'])
+            if search_index:
+                result.append(self._format(document, search_index.get_result_fields()))
+        return result
+
+    def autocomplete(self, query, content_types=None, permissions=None):
+        prefix = query.lower()
+        with self.lock:
+            documents = list(self.documents.values())
+
+        matches = []
+        for document in documents:
+            if content_types and document['content_type'] not in content_types:
+                continue
+            for text in document['autocomplete']:
+                if text and text.lower().startswith(prefix):
+                    matches.append((text, document))
+                    break
+
+        matches.sort(key=lambda match: (match[0].lower(), str(match[1]['id'])))
+
+        result = []
+        for text, document in matches:
+            if len(result) == self.autocomplete_size:
+                break
+            search_index = self.get_search_index(document['content_type'])
+            if search_index and self._allowed(document, permissions):
+                hit = self._format(document, search_index.get_autocomplete_result_fields())
+                hit['text'] = text
+                result.append(hit)
+        return result
@@ -1,7 +1,10 @@
+from django.db.models import prefetch_related_objects
 from django.utils.encoding import force_text
 from elasticsearch.helpers import BulkIndexError
 from structlog import get_logger
 
+from lego.apps.permissions.constants import OBJECT_PERMISSIONS_FIELDS
+
 from . import backend
 
 log = get_logger()
@@ -15,6 +18,8 @@ class SearchIndex:
 
     queryset = None
     serializer_class = None
+    # Store the object permissions in the documents, the backend filters the results with these.
+    index_permissions = True
 
     def get_backend(self):
         """
@@ -98,6 +103,25 @@ class SearchIndex:
         serializer_class = self.get_serializer_class()
         return serializer_class(*args, **kwargs)
 
+    def has_document_permissions(self):
+        """
+        Returns True if the documents contain the object permissions of the instances. Results of
+        other indexes is filtered with the database after the search.
+        """
+        from .permissions import document_permissions_supported
+
+        return self.index_permissions and document_permissions_supported(self.get_model())
+
+    def get_permissions(self, instance):
+        """
+        Returns the object permissions indexed with the instance, or None.
+        """
+        from .permissions import get_document_permissions
+
+        if not self.has_document_permissions():
+            return None
+        return get_document_permissions(instance)
+
     def get_autocomplete(self, instance):
         """
         Implement this method to support autocomplete on the model. This function should return
@@ -131,6 +155,7 @@ class SearchIndex:
             'pk': force_text(instance.pk),
             'data': {
                 'autocomplete': self.get_autocomplete(instance),
+                'permissions': self.get_permissions(instance),
                 'filters': {k: v
                             for k, v in get_filter_data(data).items() if v or not v == ''},
                 'fields': {k: v
@@ -140,34 +165,50 @@ class SearchIndex:
 
         return prepared_instance
 
-    def update(self):
+    def iterate(self, start_after=None, batch_size=500):
         """
-        Updates the entire index.
-        We do this in batch to optimize performance. NB: Requires automatic IDs.
+        Iterate over the queryset in batches ordered by pk. Each batch continues after the last
+        pk of the previous batch, gaps in the pk sequence doesn't cost extra queries.
         """
-
-        def batch(queryset, func, chunk=100, start=0):
-            if not queryset.exists():
+        queryset = self.get_queryset().order_by('pk')
+        while True:
+            batch_queryset = queryset
+            if start_after is not None:
+                batch_queryset = queryset.filter(pk__gt=start_after)
+            batch = list(batch_queryset[:batch_size])
+            if not batch:
                 return
 
-            try:
-                while start < queryset.order_by('pk').last().pk:
-                    func(queryset.filter(pk__gt=start, pk__lte=start + chunk).iterator())
-                    start += chunk
-            except TypeError:
-                func(queryset.all().iterator())
-
-        def prepare(result):
-            prepared = self.prepare(result)
+            if self.has_document_permissions():
+                prefetch_related_objects(batch, *OBJECT_PERMISSIONS_FIELDS)
+            start_after = batch[-1].pk
+            yield batch
+
+    def update(self, start_after=None, batch_size=500, index=None, on_batch=None):
+        """
+        Updates the entire index, one bulk request for each batch.
+        Returns the number of indexed documents.
+
+        :param start_after: Resume after this pk.
+        :param index: Write to this index instead of the live index, used by rebuild_index.
+        :param on_batch: Called with the last pk of every indexed batch.
+        """
+
+        def prepare(instance):
+            prepared = self.prepare(instance)
             return prepared['content_type'], prepared['pk'], prepared['data']
 
-        def update_bulk(result_set):
+        count = 0
+        for batch in self.iterate(start_after, batch_size):
+            documents = [prepare(instance) for instance in batch if self.should_update(instance)]
             try:
-                self.get_backend().update_many(map(prepare, result_set))
+                self.get_backend().update_many(documents, index=index)
             except BulkIndexError as e:
                 log.critical(e)
-
-        batch(self.get_queryset(), update_bulk)
+            count += len(documents)
+            if on_batch:
+                on_batch(batch[-1].pk)
+        return count
 
     def update_instance(self, instance):
         """
@@ -0,0 +1,134 @@
+from django.db.models import prefetch_related_objects
+from django_redis import get_redis_connection
+from structlog import get_logger
+
+from lego.apps.permissions.constants import OBJECT_PERMISSIONS_FIELDS
+from lego.utils.content_types import split_string
+
+from . import backend
+from .registry import get_content_type_index
+
+log = get_logger()
+
+UPDATE_KEY = 'search:index_queue:update'
+REMOVE_KEY = 'search:index_queue:remove'
+RESTORE_KEY = 'search:index_queue:restore'
+
+
+class IndexQueue:
+    """
+    Pending index changes are stored in two redis sets, saving an instance many times before
+    the queue is flushed results in one update. The queue is flushed by a periodic task.
+    """
+
+    @property
+    def redis(self):
+        try:
+            return self._redis
+        except AttributeError:
+            self._redis = get_redis_connection('default')
+            return self._redis
+
+    def add_update(self, identifier):
+        pipe = self.redis.pipeline()
+        pipe.srem(REMOVE_KEY, identifier)
+        pipe.sadd(UPDATE_KEY, identifier)
+        pipe.execute()
+
+    def add_remove(self, identifier):
+        pipe = self.redis.pipeline()
+        pipe.srem(UPDATE_KEY, identifier)
+        pipe.sadd(REMOVE_KEY, identifier)
+        pipe.execute()
+
+    def pop_all(self):
+        """
+        Read and clear the queue in one transaction.
+        Returns a tuple of the identifiers to update and the identifiers to remove.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.smembers(UPDATE_KEY)
+        pipe.smembers(REMOVE_KEY)
+        pipe.delete(UPDATE_KEY, REMOVE_KEY)
+        updates, removals, _ = pipe.execute()
+
+        def decode(values):
+            return {value.decode() if isinstance(value, bytes) else value for value in values}
+
+        return decode(updates), decode(removals)
+
+    def restore(self, updates, removals):
+        """
+        Put popped identifiers back in the queue. Identifiers changed again since they were
+        popped are in the other set, the newest change is kept.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        for key, other_key, identifiers in (
+            (UPDATE_KEY, REMOVE_KEY, updates),
+            (REMOVE_KEY, UPDATE_KEY, removals)
+        ):
+            if identifiers:
+                pipe.sadd(RESTORE_KEY, *identifiers)
+                pipe.sdiffstore(RESTORE_KEY, RESTORE_KEY, other_key)
+                pipe.sunionstore(key, key, RESTORE_KEY)
+                pipe.delete(RESTORE_KEY)
+        pipe.execute()
+
+    def flush(self):
+        """
+        Send the pending changes to the search backend. Instances are loaded with one query for
+        each content type and indexed with one bulk request. The changes are queued again if
+        the flush fails.
+        """
+        updates, removals = self.pop_all()
+        if not updates and not removals:
+            return 0, 0
+
+        try:
+            return self.index(updates, removals)
+        except Exception:
+            self.restore(updates, removals)
+            raise
+
+    def index(self, updates, removals):
+        update_tuples = []
+        remove_tuples = [split_string(identifier) for identifier in removals]
+
+        pks_by_content_type = {}
+        for identifier in updates:
+            content_type, pk = split_string(identifier)
+            pks_by_content_type.setdefault(content_type, set()).add(pk)
+
+        for content_type, pks in pks_by_content_type.items():
+            index = get_content_type_index(content_type)
+            if not index:
+                continue
+
+            instances = list(index.get_queryset().filter(pk__in=pks))
+            if instances and index.has_document_permissions():
+                prefetch_related_objects(instances, *OBJECT_PERMISSIONS_FIELDS)
+
+            found = set()
+            for instance in instances:
+                found.add(str(instance.pk))
+                if not index.should_update(instance):
+                    continue
+                prepared = index.prepare(instance)
+                update_tuples.append((prepared['content_type'], prepared['pk'], prepared['data']))
+
+            # Instances deleted since they were queued is removed from the index.
+            remove_tuples += [(content_type, pk) for pk in pks - found]
+
+        search_backend = backend.current_backend
+        if update_tuples:
+            search_backend.update_many(update_tuples)
+        if remove_tuples:
+            search_backend.remove_many(remove_tuples)
+
+        log.info(
+            'search_index_queue_flushed', updates=len(update_tuples), removals=len(remove_tuples)
+        )
+        return len(update_tuples), len(remove_tuples)
+
+
+index_queue = IndexQueue()
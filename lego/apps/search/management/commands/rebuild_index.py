@@ -1,7 +1,7 @@
 import logging
 
 from lego.apps.search import backend
-from lego.apps.search.registry import index_registry
+from lego.apps.search.rebuild import rebuild
 from lego.utils.management_command import BaseCommand
 
 log = logging.getLogger(__name__)
@@ -9,16 +9,41 @@ log = logging.getLogger(__name__)
 
 class Command(BaseCommand):
 
-    help = 'Rebuild all search indexes.'
+    help = 'Rebuild all search indexes into a new index and replace the live index when done.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes used to index the content types',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            default=False,
+            help='Continue the last rebuild from its checkpoint',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of instances indexed in each bulk request',
+        )
+        parser.add_argument(
+            '--keep-old-index',
+            action='store_true',
+            default=False,
+            help='Keep the replaced index',
+        )
 
     def run(self, *args, **options):
         log.info('Rebuilding indexes')
         search_backend = backend.current_backend
         log.info(f'Using the {search_backend.name} backend...')
-        log.info('Clearing indexes')
-        search_backend.clear()
-        log.info('Cleared all indexes')
-        for content_type, index in index_registry.items():
-            log.info(f'Rebuilding the {content_type} index')
-            index.update()
+        total = rebuild(
+            workers=options['workers'], resume=options['resume'], batch_size=options['batch_size'],
+            delete_old=not options['keep_old_index']
+        )
+        log.info(f'Indexed {total} documents')
         log.info('Done!')
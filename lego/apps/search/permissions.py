@@ -1,8 +1,15 @@
+from django.apps import apps
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import prefetch_related_objects
 
-from lego.apps.permissions.constants import VIEW
+from lego.apps.permissions.constants import OBJECT_PERMISSIONS_FIELDS, VIEW
+from lego.apps.permissions.models import ObjectPermissionsModel
+from lego.apps.permissions.permissions import PermissionHandler
+from lego.apps.permissions.utils import get_permission_handler
 from lego.utils.content_types import string_to_model_cls
 
+from .registry import index_registry
+
 
 def has_permission(content_type, pk, user):
     """
@@ -17,3 +24,127 @@ def has_permission(content_type, pk, user):
         pass
 
     return False
+
+
+def get_permitted_keys(content_type, pks, user):
+    """
+    Load all instances of a content_type in one query, with the object permission relations
+    prefetched, and return the pks the user can view. Keyword permissions are matched in memory.
+    """
+    try:
+        model = apps.get_model(content_type)
+    except (LookupError, ValueError):
+        return set()
+
+    instances = list(model.objects.filter(pk__in=pks))
+    if instances and issubclass(model, ObjectPermissionsModel):
+        prefetch_related_objects(instances, *OBJECT_PERMISSIONS_FIELDS)
+
+    return {str(instance.pk) for instance in instances if user.has_perm(VIEW, instance)}
+
+
+def filter_hits(hits, user, skip_content_types=()):
+    """
+    Remove the hits the user isn't allowed to view. The hits are grouped by content_type, each
+    group is checked with one query instead of one query per hit. The order of the hits is kept.
+
+    :param skip_content_types: Content types already filtered by the search backend.
+    """
+    hits = list(hits)
+    pks_by_content_type = {}
+    for hit in hits:
+        if hit['content_type'] not in skip_content_types:
+            pks_by_content_type.setdefault(hit['content_type'], set()).add(hit['id'])
+
+    permitted = {
+        content_type: get_permitted_keys(content_type, pks, user)
+        for content_type, pks in pks_by_content_type.items()
+    }
+
+    return [
+        hit for hit in hits if hit['content_type'] in skip_content_types
+        or str(hit['id']) in permitted[hit['content_type']]
+    ]
+
+
+def document_permissions_supported(model):
+    """
+    The view permission can be evaluated from the indexed object permissions when the model is
+    an ObjectPermissionsModel and the permission handler doesn't customize the checks.
+    """
+    if not issubclass(model, ObjectPermissionsModel):
+        return False
+
+    handler = get_permission_handler(model)
+    handler_cls = type(handler)
+    return (
+        handler_cls.has_perm is PermissionHandler.has_perm
+        and handler_cls.has_object_permissions is PermissionHandler.has_object_permissions
+        and handler_cls.created_by is PermissionHandler.created_by
+        and handler.authentication_map.get(VIEW, handler.default_require_auth)
+    )
+
+
+def get_document_permissions(instance):
+    """
+    Returns the object permissions stored in the search document of an instance.
+    """
+    return {
+        'require_auth': instance.require_auth,
+        'can_view_groups': [group.pk for group in instance.can_view_groups.all()],
+        'can_edit_groups': [group.pk for group in instance.can_edit_groups.all()],
+        'can_edit_users': [user.pk for user in instance.can_edit_users.all()],
+        'created_by': instance.created_by_id,
+    }
+
+
+class DocumentPermissions:
+    """
+    The view permissions of a user, used by the search backends to filter documents with indexed
+    object permissions. This gives the same result as PermissionHandler.has_perm.
+    """
+
+    def __init__(self, user):
+        # Content types where the documents contain the object permissions.
+        self.content_types = [
+            content_type for content_type, index in index_registry.items()
+            if index.has_document_permissions()
+        ]
+
+        # Inactive users are denied everything by the permission backend.
+        self.public = user.is_anonymous or user.is_active
+        self.user_id = user.pk if user.is_authenticated and user.is_active else None
+        self.group_ids = list(user.all_group_ids) if self.user_id else []
+
+        # Content types the user can view through keyword permissions.
+        self.granted_content_types = []
+        if self.user_id:
+            for content_type in self.content_types:
+                model = index_registry[content_type].get_model()
+                handler = get_permission_handler(model)
+                if user.has_perms(handler.required_keyword_permissions(model, VIEW)):
+                    self.granted_content_types.append(content_type)
+
+    def allows(self, content_type, permissions):
+        """
+        Check a document in memory, permissions is the dict from get_document_permissions.
+        """
+        if content_type not in self.content_types:
+            return True
+        if not self.public:
+            return False
+        if not permissions.get('require_auth', True):
+            return True
+        if not self.user_id:
+            return False
+        if content_type in self.granted_content_types:
+            return True
+        groups = {
+            *(permissions.get('can_view_groups') or []),
+            *(permissions.get('can_edit_groups') or []),
+        }
+        return (
+            not groups.isdisjoint(self.group_ids)
+            or self.user_id in (permissions.get('can_edit_users') or [])
+            or self.user_id == permissions.get('created_by')
+        )
@@ -0,0 +1,108 @@
+import time
+from multiprocessing import Pool
+
+from django.core.cache import cache
+from django.db import connections
+from structlog import get_logger
+
+from . import backend
+from .registry import get_content_type_index, index_registry
+
+log = get_logger()
+
+CHECKPOINT_KEY = 'search:rebuild_index:checkpoint'
+COMPLETED = 'completed'
+
+
+def content_type_key(content_type):
+    return f'{CHECKPOINT_KEY}:{content_type}'
+
+
+def clear_checkpoint():
+    cache.delete_many(
+        [CHECKPOINT_KEY] + [content_type_key(content_type) for content_type in index_registry]
+    )
+
+
+def rebuild_content_type(content_type, index, start_after, batch_size):
+    """
+    Index all instances of a content type into index, starting after the pk start_after. The
+    checkpoint of the content type is updated after every batch, and the backend keeps writing
+    live changes to the index.
+    Returns the number of documents and the duration.
+    """
+    search_index = get_content_type_index(content_type)
+    key = content_type_key(content_type)
+    start = time.perf_counter()
+
+    def on_batch(last_pk):
+        cache.set(key, last_pk, None)
+        backend.current_backend.refresh_index(index)
+
+    count = search_index.update(
+        start_after=start_after, batch_size=batch_size, index=index, on_batch=on_batch
+    )
+
+    cache.set(key, COMPLETED, None)
+    return count, time.perf_counter() - start
+
+
+def setup_worker():
+    """
+    Worker processes can't share the connections of the parent process.
+    """
+    connections.close_all()
+    backend.current_backend.set_up()
+
+
+def rebuild(workers=1, resume=False, batch_size=500, delete_old=True):
+    """
+    Build a new index while the live index is used, and replace the live index when all content
+    types are indexed. A failed rebuild can be resumed from the checkpoint of each content type.
+    """
+    search_backend = backend.current_backend
+    checkpoint = cache.get(CHECKPOINT_KEY) if resume else None
+
+    if checkpoint:
+        index = checkpoint['index']
+        search_backend.refresh_index(index)
+        log.info('search_rebuild_resumed', index=index)
+    else:
+        clear_checkpoint()
+        index = search_backend.create_index()
+        cache.set(CHECKPOINT_KEY, {'index': index}, None)
+
+    progress = cache.get_many([content_type_key(content_type) for content_type in index_registry])
+    arguments = []
+    for content_type in index_registry:
+        start_after = progress.get(content_type_key(content_type))
+        if start_after != COMPLETED:
+            arguments.append((content_type, index, start_after, batch_size))
+
+    start = time.perf_counter()
+    if workers > 1 and len(arguments) > 1:
+        # Connections can't be shared with the forked processes.
+        connections.close_all()
+        with Pool(processes=workers, initializer=setup_worker) as pool:
+            results = pool.starmap(rebuild_content_type, arguments)
+    else:
+        results = [rebuild_content_type(*argument) for argument in arguments]
+
+    total = 0
+    for argument, (count, duration) in zip(arguments, results):
+        total += count
+        log.info(
+            'search_rebuild_content_type', content_type=argument[0], documents=count,
+            documents_per_second=round(count / duration) if duration else count
+        )
+
+    duration = time.perf_counter() - start
+    log.info(
+        'search_rebuild_indexed', documents=total, documents_per_second=round(total / duration)
+        if duration else total
+    )
+
+    if index:
+        search_backend.activate_index(index, delete_old=delete_old)
+    clear_checkpoint()
+    return total
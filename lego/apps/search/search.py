@@ -1,16 +1,13 @@
 from lego.apps.stats.utils import track
 
 from . import backend
-from .permissions import has_permission
+from .permissions import DocumentPermissions, filter_hits
 
 
 def autocomplete(query, types, user):
-    result = backend.current_backend.autocomplete(query, types)
-
-    def permission_check(hit):
-        return has_permission(hit['content_type'], hit['id'], user)
-
-    result = list(filter(permission_check, result))
+    permissions = DocumentPermissions(user)
+    result = backend.current_backend.autocomplete(query, types, permissions=permissions)
+    result = filter_hits(result, user, skip_content_types=permissions.content_types)
 
     track(
         user,
@@ -25,12 +22,9 @@ def autocomplete(query, types, user):
 
 
 def search(query, types, filters, user):
-    result = backend.current_backend.search(query, types, filters)
-
-    def permission_check(hit):
-        return has_permission(hit['content_type'], hit['id'], user)
-
-    result = list(filter(permission_check, result))
+    permissions = DocumentPermissions(user)
+    result = backend.current_backend.search(query, types, filters, permissions=permissions)
+    result = filter_hits(result, user, skip_content_types=permissions.content_types)
 
     track(
         user,
@@ -1,5 +1,8 @@
+from django.db import transaction
+
 from lego.utils.content_types import instance_to_string
 
+from .index_queue import index_queue
 from .registry import get_model_index
 from .tasks import instance_delete, instance_update
 
@@ -32,3 +35,39 @@ class AsyncSignalHandler(BaseSignalHandler):
         identifier = instance_to_string(instance)
         if identifier and get_model_index(instance):
             instance_delete.delay(identifier)
+
+
+class SyncSignalHandler(BaseSignalHandler):
+    """
+    This handler indexes model changes in the current process when the transaction commits. Used
+    by the local backend, the index only exists in the memory of the process.
+    """
+
+    def on_save(self, instance):
+        search_index = get_model_index(instance)
+        if search_index:
+            transaction.on_commit(lambda: search_index.update_instance(instance))
+
+    def on_delete(self, instance):
+        search_index = get_model_index(instance)
+        if search_index:
+            pk = instance.pk
+            transaction.on_commit(lambda: search_index.remove_instance(pk))
+
+
+class QueuedSignalHandler(BaseSignalHandler):
+    """
+    This handler adds model changes to the index queue. The queue is deduplicated and flushed in
+    bulk by the flush_index_queue task. Changes are queued when the transaction commits, the
+    flush would otherwise index rows that are not committed yet.
+    """
+
+    def on_save(self, instance):
+        identifier = instance_to_string(instance)
+        if identifier and get_model_index(instance):
+            transaction.on_commit(lambda: index_queue.add_update(identifier))
+
+    def on_delete(self, instance):
+        identifier = instance_to_string(instance)
+        if identifier and get_model_index(instance):
+            transaction.on_commit(lambda: index_queue.add_remove(identifier))
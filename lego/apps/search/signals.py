@@ -1,9 +1,15 @@
-from django.db.models.signals import post_delete, post_save
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .signal_handlers import AsyncSignalHandler
+from .backends.local import LocalBackend
+from .registry import get_model_index
+from .signal_handlers import QueuedSignalHandler, SyncSignalHandler
 
-signal_handler = AsyncSignalHandler()
+if settings.SEARCH_BACKEND == LocalBackend.name:
+    signal_handler = SyncSignalHandler()
+else:
+    signal_handler = QueuedSignalHandler()
 
 
 @receiver(post_save)
@@ -14,3 +20,19 @@ def post_save_callback(**kwargs):
 @receiver(post_delete)
 def post_delete_callback(**kwargs):
     signal_handler.on_delete(kwargs.get('instance'))
+
+
+@receiver(m2m_changed)
+def m2m_changed_callback(instance, action, reverse, model, pk_set, **kwargs):
+    """
+    The object permissions are stored in the documents, reindex instances when a relation like
+    can_view_groups changes.
+    """
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+
+    if not reverse:
+        signal_handler.on_save(instance)
+    elif pk_set and get_model_index(model):
+        for related_instance in model.objects.filter(pk__in=pk_set):
+            signal_handler.on_save(related_instance)
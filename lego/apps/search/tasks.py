@@ -5,6 +5,7 @@ from lego import celery_app
 from lego.utils.content_types import string_to_instance
 from lego.utils.tasks import AbakusTask
 
+from .index_queue import index_queue
 from .registry import get_content_type_index, get_model_index
 
 log = get_logger()
@@ -38,3 +39,12 @@ def instance_update(self, identifier, logger_context=None):
         # object gets removed from our index.
         log.warn('search_update_non_existing_instance', identifier=identifier)
         instance_delete.delay(identifier)
+
+
+@celery_app.task(serializer='json', bind=True, base=AbakusTask)
+def flush_index_queue(self, logger_context=None):
+    """
+    Index the changes collected by the QueuedSignalHandler since the last run.
+    """
+    self.setup_logger(logger_context)
+    index_queue.flush()
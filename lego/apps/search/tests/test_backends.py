@@ -0,0 +1,237 @@
+from unittest import SkipTest, mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+
+from lego.apps.articles.models import Article
+from lego.apps.articles.search_indexes import ArticleModelIndex
+from lego.apps.search.backends.elasticsearch import ElasticsearchBackend
+from lego.apps.search.backends.local import LocalBackend, tokenize
+from lego.apps.search.index import SearchIndex
+from lego.apps.search.permissions import DocumentPermissions
+from lego.apps.search.signal_handlers import SyncSignalHandler
+from lego.apps.users.models import User
+from lego.utils.test_utils import BaseTestCase
+
+
+class ArticleIndex(SearchIndex):
+    queryset = Article.objects.all()
+    result_fields = ('title', 'description')
+    autocomplete_result_fields = ('title', )
+
+
+def document(pk, title, description='', event_type=None, require_auth=False):
+    return (
+        'articles.article', str(pk), {
+            'autocomplete': title,
+            'filters': {
+                'event_type': event_type
+            } if event_type else {},
+            'fields': {
+                'title': title,
+                'description': description
+            },
+            'permissions': {
+                'require_auth': require_auth,
+                'can_view_groups': [],
+                'can_edit_groups': [],
+                'can_edit_users': [],
+                'created_by': 1,
+            },
+        }
+    )
+
+
+class SearchBackendConformanceMixin:
+    """
+    Tests every search backend has to pass. Subclasses sets up the backend in get_backend.
+    """
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    def get_backend(self):
+        raise NotImplementedError
+
+    def refresh(self):
+        pass
+
+    def setUp(self):
+        patcher = mock.patch.dict(
+            'lego.apps.search.registry.index_registry', {'articles.article': ArticleIndex()}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.backend = self.get_backend()
+        self.backend.clear()
+        self.backend.update_many(
+            [
+                document(1, 'Bedpres with Abakus', 'Company presentation', 'company_presentation'),
+                document(2, 'Abakus party', 'Party at the office', 'party'),
+                document(3, 'Secret party', 'Only for members', 'party', require_auth=True),
+            ]
+        )
+        self.refresh()
+
+    def ids(self, result):
+        return sorted(int(hit['id']) for hit in result)
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.ids(self.backend.search('abakus')), [1, 2])
+        self.assertEqual(self.ids(self.backend.search('abakus party')), [2])
+        self.assertEqual(self.ids(self.backend.search('missing')), [])
+
+    def test_search_result_fields(self):
+        hit = list(self.backend.search('bedpres'))[0]
+        self.assertEqual(
+            hit, {
+                'id': '1',
+                'content_type': 'articles.article',
+                'title': 'Bedpres with Abakus',
+                'description': 'Company presentation'
+            }
+        )
+
+    def test_search_filters(self):
+        self.assertEqual(
+            self.ids(self.backend.search('party', filters={'event_type': ['party']})), [2, 3]
+        )
+        self.assertEqual(
+            self.ids(self.backend.search('abakus', filters={'event_type': ['party', 'course']})),
+            [2]
+        )
+
+    def test_search_permissions(self):
+        anonymous = DocumentPermissions(AnonymousUser())
+        self.assertEqual(self.ids(self.backend.search('party', permissions=anonymous)), [2])
+
+        creator = DocumentPermissions(User.objects.get(pk=1))
+        self.assertEqual(self.ids(self.backend.search('party', permissions=creator)), [2, 3])
+
+    def test_update_and_remove(self):
+        self.backend.update_many([document(2, 'Abakus dinner')])
+        self.backend.remove_many([('articles.article', '1')])
+        self.refresh()
+        self.assertEqual(self.ids(self.backend.search('abakus')), [2])
+        self.assertEqual(self.ids(self.backend.search('party')), [3])
+
+    def test_autocomplete_prefix(self):
+        result = list(self.backend.autocomplete('aba'))
+        self.assertEqual(self.ids(result), [2])
+        self.assertEqual(result[0]['text'], 'Abakus party')
+        self.assertEqual(result[0]['title'], 'Abakus party')
+
+    def test_autocomplete_content_type_context(self):
+        self.assertEqual(self.ids(self.backend.autocomplete('se', ['articles.article'])), [3])
+        self.assertEqual(self.ids(self.backend.autocomplete('se', ['events.event'])), [])
+
+    def test_autocomplete_permissions(self):
+        anonymous = DocumentPermissions(AnonymousUser())
+        self.assertEqual(self.ids(self.backend.autocomplete('se', permissions=anonymous)), [])
+
+
+@mock.patch('lego.apps.search.permissions.index_registry', {'articles.article': ArticleIndex()})
+class LocalBackendTestCase(SearchBackendConformanceMixin, BaseTestCase):
+    def get_backend(self):
+        backend = LocalBackend()
+        backend.set_up()
+        return backend
+
+    def test_populate(self):
+        Article.objects.create(title='Generalforsamling', description='Abakus', text='text')
+        backend = LocalBackend()
+        backend.set_up()
+        with mock.patch.dict(
+            'lego.apps.search.registry.index_registry', {'articles.article': ArticleModelIndex()}
+        ):
+            backend.populate()
+            self.assertEqual(len(backend.search('generalforsamling')), 1)
+
+            Article.objects.create(title='Generalforsamling', description='Abakus', text='text')
+            backend.populate()
+            self.assertEqual(len(backend.search('generalforsamling')), 1)
+
+    def test_sync_signal_handler(self):
+        """The local backend is updated in-process when the transaction commits"""
+        article = Article.objects.create(title='Generalforsamling', description='Abakus', text='')
+        handler = SyncSignalHandler()
+        with mock.patch('lego.apps.search.backend.current_backend', self.backend), \
+                mock.patch.dict(
+                    'lego.apps.search.registry.index_registry',
+                    {'articles.article': ArticleModelIndex()}
+                ):
+            handler.on_save(article)
+            self.assertEqual(self.backend.search('generalforsamling'), [])
+
+            callbacks, connection.run_on_commit = connection.run_on_commit, []
+            for _, func in callbacks:
+                func()
+            self.assertEqual(self.ids(self.backend.search('generalforsamling')), [article.id])
+
+            handler.on_delete(article)
+            callbacks, connection.run_on_commit = connection.run_on_commit, []
+            for _, func in callbacks:
+                func()
+            self.assertEqual(self.backend.search('generalforsamling'), [])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('<p>Hello, World</p>'), ['hello', 'world'])
+        self.assertEqual(tokenize(['Æøå', {'key': 'Value'}, None, True]), ['æøå', 'value'])
+
+
+def elasticsearch_available():
+    backend = ElasticsearchBackend()
+    backend.set_up()
+    try:
+        return backend.connection is not None and backend.connection.ping()
+    except Exception:
+        return False
+
+
+@override_settings(SEARCH_INDEX='lego-search-test')
+@mock.patch('lego.apps.search.permissions.index_registry', {'articles.article': ArticleIndex()})
+class ElasticsearchBackendTestCase(SearchBackendConformanceMixin, BaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Checked when the tests run, importing the module shouldn't connect to Elasticsearch.
+        if not elasticsearch_available():
+            raise SkipTest('Elasticsearch is not available')
+        super().setUpClass()
+
+    def get_backend(self):
+        backend = ElasticsearchBackend()
+        backend.set_up()
+        backend.migrate()
+        return backend
+
+    def refresh(self):
+        self.backend.connection.indices.refresh(index=settings.SEARCH_INDEX)
+
+
+@override_settings(SEARCH_INDEX='lego-search-test')
+class ElasticsearchIndexTestCase(BaseTestCase):
+    def setUp(self):
+        self.backend = ElasticsearchBackend()
+        self.backend.connection = mock.Mock()
+        self.backend.connection.indices.exists_alias.return_value = False
+        self.backend.connection.indices.exists.return_value = False
+
+    def test_rebuild_index_expires(self):
+        with mock.patch('lego.apps.search.backends.elasticsearch.cache') as mock_cache:
+            index = self.backend.create_index()
+        mock_cache.set.assert_called_once_with(
+            ElasticsearchBackend.rebuild_index_key, index,
+            ElasticsearchBackend.rebuild_index_timeout
+        )
+
+    def test_clear_keeps_rebuild_index(self):
+        index = self.backend.create_index()
+        self.backend.clear()
+        self.assertEqual(cache.get(ElasticsearchBackend.rebuild_index_key), index)
+        self.assertIn(index, self.backend._write_indexes())
+
+        self.backend.activate_index(index)
+        self.assertIsNone(cache.get(ElasticsearchBackend.rebuild_index_key))
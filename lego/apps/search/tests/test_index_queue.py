@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.db import connection, transaction
+
+from lego.apps.articles.models import Article
+from lego.apps.search.index import SearchIndex
+from lego.apps.search.index_queue import index_queue
+from lego.apps.search.signal_handlers import QueuedSignalHandler
+from lego.utils.test_utils import BaseTestCase
+
+
+class ArticleIndex(SearchIndex):
+    queryset = Article.objects.all()
+    serializer_class = mock.Mock(return_value=mock.Mock(data={'title': 'title'}))
+
+
+class IndexQueueTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml', 'test_articles.yaml']
+
+    def setUp(self):
+        index_queue.pop_all()
+        patcher = mock.patch.dict(
+            'lego.apps.search.registry.index_registry', {'articles.article': ArticleIndex()}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend_patcher = mock.patch('lego.apps.search.backend.current_backend')
+        self.backend = backend_patcher.start()
+        self.addCleanup(backend_patcher.stop)
+
+    def test_updates_are_coalesced(self):
+        for _ in range(3):
+            index_queue.add_update('articles.article-1')
+        index_queue.add_update('articles.article-2')
+        self.assertEqual(
+            index_queue.pop_all(), ({'articles.article-1', 'articles.article-2'}, set())
+        )
+        self.assertEqual(index_queue.pop_all(), (set(), set()))
+
+    def test_latest_change_wins(self):
+        index_queue.add_update('articles.article-1')
+        index_queue.add_remove('articles.article-1')
+        index_queue.add_remove('articles.article-2')
+        index_queue.add_update('articles.article-2')
+        self.assertEqual(index_queue.pop_all(), ({'articles.article-2'}, {'articles.article-1'}))
+
+    def test_flush_sends_one_bulk_request(self):
+        index_queue.add_update('articles.article-1')
+        index_queue.add_update('articles.article-2')
+        index_queue.add_update('articles.article-1000')
+        index_queue.add_remove('articles.article-3')
+
+        self.assertEqual(index_queue.flush(), (2, 2))
+
+        self.backend.update_many.assert_called_once()
+        updated = sorted(pk for _, pk, _ in self.backend.update_many.call_args[0][0])
+        self.assertEqual(updated, ['1', '2'])
+        removed = sorted(self.backend.remove_many.call_args[0][0])
+        self.assertEqual(removed, [('articles.article', '1000'), ('articles.article', '3')])
+
+    def test_failed_flush_is_queued_again(self):
+        index_queue.add_update('articles.article-1')
+        index_queue.add_update('articles.article-2')
+        index_queue.add_remove('articles.article-3')
+        self.backend.update_many.side_effect = ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            index_queue.flush()
+
+        self.assertEqual(
+            index_queue.pop_all(),
+            ({'articles.article-1', 'articles.article-2'}, {'articles.article-3'})
+        )
+
+    def test_restore_keeps_newer_changes(self):
+        index_queue.add_remove('articles.article-1')
+        index_queue.restore({'articles.article-1', 'articles.article-2'}, {'articles.article-3'})
+        self.assertEqual(
+            index_queue.pop_all(),
+            ({'articles.article-2'}, {'articles.article-1', 'articles.article-3'})
+        )
+
+    def test_flush_empty_queue(self):
+        self.assertEqual(index_queue.flush(), (0, 0))
+        self.backend.update_many.assert_not_called()
+
+    def test_changes_are_queued_on_commit(self):
+        handler = QueuedSignalHandler()
+        article = Article.objects.get(pk=1)
+        handler.on_save(article)
+        try:
+            with transaction.atomic():
+                handler.on_delete(Article.objects.get(pk=2))
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(index_queue.pop_all(), (set(), set()))
+
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, func in callbacks:
+            func()
+        self.assertEqual(index_queue.pop_all(), ({'articles.article-1'}, set()))
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+
+from lego.apps.articles.models import Article
+from lego.apps.flatpages.models import Page
+from lego.apps.permissions.constants import VIEW
+from lego.apps.search.index import SearchIndex
+from lego.apps.search.permissions import (
+    DocumentPermissions, document_permissions_supported, filter_hits, get_document_permissions
+)
+from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseTestCase
+
+
+class FilterHitsTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml', 'test_articles.yaml']
+
+    def hits(self):
+        return [
+            {
+                'content_type': 'articles.article',
+                'id': 3
+            },
+            {
+                'content_type': 'articles.article',
+                'id': '1'
+            },
+            {
+                'content_type': 'articles.article',
+                'id': 1000
+            },
+            {
+                'content_type': 'unknown.model',
+                'id': 1
+            },
+        ]
+
+    def test_anonymous_user_only_sees_public_objects(self):
+        self.assertEqual(filter_hits(self.hits(), AnonymousUser()), [self.hits()[0]])
+
+    def test_order_is_kept(self):
+        user = User.objects.get(id=1)
+        self.assertEqual(filter_hits(self.hits(), user), self.hits()[:2])
+
+    def test_one_query_per_content_type(self):
+        user = User.objects.get(id=1)
+        user.all_group_ids
+        # One query for the articles and three for the permission relations.
+        with self.assertNumQueries(4):
+            filter_hits(self.hits(), user)
+
+    def test_skipped_content_types_are_kept(self):
+        hits = filter_hits(self.hits(), AnonymousUser(), skip_content_types=['articles.article'])
+        self.assertEqual(hits, self.hits()[:3])
+
+
+class ArticleIndex(SearchIndex):
+    queryset = Article.objects.all()
+
+
+class DocumentPermissionsTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml', 'test_articles.yaml']
+
+    def setUp(self):
+        patcher = mock.patch.dict(
+            'lego.apps.search.permissions.index_registry', {'articles.article': ArticleIndex()}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_supported_models(self):
+        self.assertTrue(document_permissions_supported(Article))
+        self.assertFalse(document_permissions_supported(Page))
+
+    def test_documents_give_same_result_as_has_perm(self):
+        AbakusGroup.objects.get(name='CommentTest').add_user(User.objects.get(id=2))
+        article = Article.objects.get(id=2)
+        article.can_edit_users.add(User.objects.get(id=3))
+
+        users = [AnonymousUser()] + list(User.objects.all())
+        for user in users:
+            permissions = DocumentPermissions(user)
+            self.assertEqual(permissions.content_types, ['articles.article'])
+            for article in Article.objects.all():
+                self.assertEqual(
+                    permissions.allows('articles.article', get_document_permissions(article)),
+                    user.has_perm(VIEW, article),
+                )
+
+    def test_inactive_users_are_denied(self):
+        user = User.objects.get(id=1)
+        user.is_active = False
+        permissions = DocumentPermissions(user)
+        document = get_document_permissions(Article.objects.get(id=3))
+        self.assertFalse(permissions.allows('articles.article', document))
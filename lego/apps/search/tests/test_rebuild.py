@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+
+from lego.apps.articles.models import Article
+from lego.apps.search.index import SearchIndex
+from lego.apps.search.rebuild import CHECKPOINT_KEY, content_type_key, rebuild
+from lego.utils.test_utils import BaseTestCase
+
+
+class ArticleIndex(SearchIndex):
+    queryset = Article.objects.all()
+    serializer_class = mock.Mock(return_value=mock.Mock(data={'title': 'title'}))
+
+
+class RebuildIndexTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml', 'test_articles.yaml']
+
+    def setUp(self):
+        self.index = ArticleIndex()
+        patcher = mock.patch.dict(
+            'lego.apps.search.registry.index_registry',
+            {'articles.article': self.index}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend_patcher = mock.patch('lego.apps.search.backend.current_backend')
+        self.backend = backend_patcher.start()
+        self.backend.create_index.return_value = 'lego-search-new'
+        self.addCleanup(backend_patcher.stop)
+
+    def indexed_pks(self):
+        return [
+            int(pk) for call in self.backend.update_many.call_args_list for _, pk, _ in call[0][0]
+        ]
+
+    def test_iterate_uses_keyset_batches(self):
+        pks = sorted(Article.objects.values_list('pk', flat=True))
+        batches = list(self.index.iterate(batch_size=2))
+        self.assertEqual([instance.pk for batch in batches for instance in batch], pks)
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+
+    def test_rebuild_writes_to_new_index_and_activates_it(self):
+        total = rebuild(batch_size=2)
+
+        self.assertEqual(total, Article.objects.count())
+        self.assertEqual(self.indexed_pks(), sorted(Article.objects.values_list('pk', flat=True)))
+        for call in self.backend.update_many.call_args_list:
+            self.assertEqual(call[1]['index'], 'lego-search-new')
+        self.backend.activate_index.assert_called_once_with('lego-search-new', delete_old=True)
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+        self.assertEqual(
+            self.backend.refresh_index.call_args_list,
+            [mock.call('lego-search-new')] * self.backend.update_many.call_count
+        )
+
+    def test_rebuild_resumes_from_checkpoint(self):
+        first_pk = Article.objects.order_by('pk').first().pk
+        cache.set(CHECKPOINT_KEY, {'index': 'lego-search-old'}, None)
+        cache.set(content_type_key('articles.article'), first_pk, None)
+
+        rebuild(resume=True)
+
+        self.backend.create_index.assert_not_called()
+        self.backend.refresh_index.assert_any_call('lego-search-old')
+        self.assertNotIn(first_pk, self.indexed_pks())
+        self.backend.activate_index.assert_called_once_with('lego-search-old', delete_old=True)
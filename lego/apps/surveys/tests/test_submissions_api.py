@@ -1,9 +1,9 @@
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
 
 from lego.apps.surveys.models import Submission
 from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseAPITestCase
 
 
 def _get_list_url(survey_pk):
@@ -38,7 +38,7 @@ def submission_data(user, survey=1, include_answers=False):
     return {'user': user.id, 'survey': survey, 'answers': _answers if include_answers else []}
 
 
-class SubmissionViewSetTestCase(APITestCase):
+class SubmissionViewSetTestCase(BaseAPITestCase):
     fixtures = [
         'test_users.yaml', 'test_abakus_groups.yaml', 'test_surveys.yaml', 'test_events.yaml',
         'test_companies.yaml'
@@ -1,9 +1,9 @@
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
 
 from lego.apps.surveys.models import Survey
 from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseAPITestCase
 
 
 def _get_list_url():
@@ -112,7 +112,7 @@ _test_surveys = [
 ]
 
 
-class SurveyViewSetTestCase(APITestCase):
+class SurveyViewSetTestCase(BaseAPITestCase):
     fixtures = [
         'test_users.yaml', 'test_abakus_groups.yaml', 'test_surveys.yaml', 'test_events.yaml',
         'test_companies.yaml'
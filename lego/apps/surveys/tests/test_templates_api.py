@@ -1,9 +1,9 @@
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
 
 from lego.apps.events.constants import COMPANY_PRESENTATION, PARTY
 from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseAPITestCase
 
 
 def _get_list_url():
@@ -22,7 +22,7 @@ def _get_edit_url(pk):
     return reverse('api:v1:survey-detail', kwargs={'pk': pk})
 
 
-class SurveyTemplateViewSetTestCase(APITestCase):
+class SurveyTemplateViewSetTestCase(BaseAPITestCase):
     fixtures = [
         'test_users.yaml', 'test_abakus_groups.yaml', 'test_survey_templates.yaml',
         'test_events.yaml', 'test_companies.yaml'
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+from mptt.signals import node_moved
+
+
+class UsersConfig(AppConfig):
+    name = 'lego.apps.users'
+
+    def ready(self):
+        from lego.apps.users.models import AbakusGroup, Membership
+        from lego.apps.users.signals import (
+            abakus_group_closure_callback, membership_group_closure_callback
+        )
+
+        for signal in [post_save, post_delete]:
+            signal.connect(membership_group_closure_callback, sender=Membership)
+            signal.connect(abakus_group_closure_callback, sender=AbakusGroup)
+        node_moved.connect(abakus_group_closure_callback, sender=AbakusGroup)
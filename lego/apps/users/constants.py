@@ -87,3 +87,5 @@ PUBLIC_GROUPS = (
     GROUP_COMMITTEE,
     GROUP_SUB,
 )
+
+GROUP_CLOSURE_TIMEOUT = 60 * 15
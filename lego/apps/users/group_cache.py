@@ -0,0 +1,60 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from lego.apps.users import constants
+
+VERSION_KEY = 'users:group_closure:version'
+
+
+def user_key(user_id):
+    return f'users:group_closure:{user_id}'
+
+
+def get_group_closure(user_id, resolve):
+    """
+    Returns the group closure of a user, the ids of the groups the user is a member of directly
+    or through a child group, and the keyword permissions of these groups.
+
+    The closure is looked up with one cache round trip. Entries are tagged with the current
+    version, changes to the group tree bump the version and invalidate every entry at once.
+
+    :param resolve: Callable returning a tuple of `(group_ids, permissions)` on cache misses.
+    """
+    key = user_key(user_id)
+    values = cache.get_many([VERSION_KEY, key])
+    version = values.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    closure = values.get(key)
+    if closure is None or closure['version'] != version:
+        group_ids, permissions = resolve()
+        closure = {
+            'version': version,
+            'group_ids': list(group_ids),
+            'permissions': list(permissions),
+        }
+        cache.set(key, closure, constants.GROUP_CLOSURE_TIMEOUT)
+    return closure
+
+
+def invalidate_user(user_id):
+    """
+    Removes the closure of a single user, used when the memberships of the user changes.
+    The entry is removed again when the transaction commits, a concurrent lookup may have cached
+    the closure from before the change.
+    """
+    key = user_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_all():
+    """
+    Invalidates the closure of every user, used when groups are changed or moved in the tree.
+    """
+    cache.set(VERSION_KEY, uuid4().hex, None)
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid4().hex, None))
@@ -5,6 +5,7 @@ from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin as DjangoPermissionMixin
 from django.contrib.postgres.fields import ArrayField
 from django.db import models, transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from django.utils.functional import cached_property
 from mptt.fields import TreeForeignKey
@@ -15,6 +16,7 @@ from lego.apps.external_sync.models import GSuiteAddress, PasswordHashUser
 from lego.apps.files.models import FileField
 from lego.apps.permissions.validators import KeywordPermissionValidator
 from lego.apps.users import constants
+from lego.apps.users.group_cache import get_group_closure
 from lego.apps.users.managers import (
     AbakusGroupManager, AbakusGroupManagerWithoutText, AbakusUserManager, MembershipManager,
     UserPenaltyManager
@@ -136,16 +138,20 @@ class AbakusGroup(MPTTModel, PersistentModel):
     def natural_key(self):
         return self.name,
 
-    def restricted_lookup(self):
+    @classmethod
+    def lookup_recipient_ids(cls, groups):
         """
-        Restricted Mail
+        Restricted mail and announcements. Returns a subquery with the ids of the users with an
+        active membership in one of the groups or their descendants.
         """
-        memberships = self.memberships
-        return [membership.user for membership in memberships], []
-
-    def announcement_lookup(self):
-        memberships = self.memberships
-        return [membership.user for membership in memberships]
+        ancestors = cls.objects.filter(
+            pk__in=groups, tree_id=OuterRef('tree_id'), lft__lte=OuterRef('lft'),
+            rght__gte=OuterRef('rght')
+        )
+        descendants = cls.objects.annotate(selected=Exists(ancestors)).filter(selected=True)\
+            .values('pk')
+        return Membership.objects.filter(abakus_group__in=descendants, is_active=True)\
+            .values('user_id')
 
 
 class PermissionsMixin(models.Model):
@@ -193,20 +199,44 @@ class PermissionsMixin(models.Model):
         )
 
     @cached_property
-    def all_groups(self):
-        groups = set()
+    def group_closure(self):
+        """
+        Ids and keyword permissions of the groups the user is a member of, directly or through a
+        child group. Shared between processes through the cache, see `group_cache`.
+        """
+        if self.pk is None:
+            return {'group_ids': [], 'permissions': []}
+        return get_group_closure(self.pk, self._resolve_group_closure)
 
-        memberships = self.memberships.filter(
-            deleted=False,
+    def _resolve_group_closure(self):
+        memberships = Membership.objects.filter(
+            user_id=self.pk,
             is_active=True,
-        ).select_related('abakus_group')
+            abakus_group__tree_id=OuterRef('tree_id'),
+            abakus_group__lft__gte=OuterRef('lft'),
+            abakus_group__rght__lte=OuterRef('rght'),
+        )
+        groups = AbakusGroup.objects.annotate(is_member=Exists(memberships))\
+            .filter(is_member=True).values_list('id', 'permissions')
 
-        for membership in memberships:
-            if membership.abakus_group not in groups:
-                groups.add(membership.abakus_group)
-                groups.update(membership.abakus_group.get_ancestors())
+        group_ids = set()
+        permissions = set()
+        for group_id, group_permissions in groups:
+            group_ids.add(group_id)
+            permissions.update(group_permissions or [])
+        return group_ids, permissions
 
-        return list(groups)
+    @cached_property
+    def all_group_ids(self):
+        return frozenset(self.group_closure['group_ids'])
+
+    @cached_property
+    def keyword_permissions(self):
+        return frozenset(self.group_closure['permissions'])
+
+    @cached_property
+    def all_groups(self):
+        return list(AbakusGroup.objects.filter(id__in=self.all_group_ids))
 
 
 class User(PasswordHashUser, GSuiteAddress, AbstractBaseUser, PersistentModel, PermissionsMixin):
@@ -313,14 +343,12 @@ class User(PasswordHashUser, GSuiteAddress, AbstractBaseUser, PersistentModel, P
             .aggregate(models.Sum('weight'))['weight__sum']
         return count or 0
 
-    def restricted_lookup(self):
+    @classmethod
+    def lookup_recipient_ids(cls, users):
         """
-        Restricted mail
+        Restricted mail and announcements. Returns a subquery with the ids of the users.
         """
-        return [self], []
-
-    def announcement_lookup(self):
-        return [self]
+        return users.values('pk')
 
     def unanswered_surveys(self):
         from lego.apps.surveys.models import Survey
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Concat
+
+from lego.apps.users.models import User
+
+CHUNK_SIZE = 2000
+
+
+def lookup_recipients(instance, relations, extra_ids=()):
+    """
+    Restricted mail and announcements. Returns a queryset with the users reachable through the
+    many-to-many relations of the instance. The related models implement `lookup_recipient_ids`,
+    all relations are combined into a single query.
+
+    :param extra_ids: Additional subqueries with user ids to include.
+    """
+    subqueries = list(extra_ids)
+    for relation_name in relations:
+        related = getattr(instance, relation_name).all()
+        lookup = getattr(related.model, 'lookup_recipient_ids', None)
+        if lookup:
+            subqueries.append(lookup(related))
+
+    if not subqueries:
+        return User.objects.none()
+
+    query = Q(pk__in=subqueries[0])
+    for subquery in subqueries[1:]:
+        query |= Q(pk__in=subquery)
+    return User.objects.filter(query)
+
+
+def email_address_expression():
+    """
+    The same address as `User.email_address`, computed by the database.
+    """
+    if not settings.GSUITE_DOMAIN:
+        return F('email')
+
+    has_internal_email = Q(is_active=True, internal_email_enabled=True) & \
+        Q(internal_email__isnull=False) & ~Q(crypt_password_hash='')
+    return Case(
+        When(
+            has_internal_email,
+            then=Concat('internal_email_id', Value(f'@{settings.GSUITE_DOMAIN}'))
+        ),
+        default=F('email'),
+        output_field=CharField(),
+    )
+
+
+def iterate_addresses(users, chunk_size=CHUNK_SIZE):
+    """
+    Stream `(id, email_address)` rows for the users, the rows are fetched in chunks.
+    """
+    return users.annotate(recipient_address=email_address_expression())\
+        .values_list('id', 'recipient_address').iterator(chunk_size=chunk_size)
@@ -0,0 +1,9 @@
+from lego.apps.users.group_cache import invalidate_all, invalidate_user
+
+
+def membership_group_closure_callback(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+def abakus_group_closure_callback(sender, instance, **kwargs):
+    invalidate_all()
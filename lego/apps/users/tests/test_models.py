@@ -122,6 +122,35 @@ class UserTestCase(BaseTestCase):
         self.assertTrue(abakom in abakus_groups)
         self.assertTrue(abakus in abakus_groups)
 
+    def test_group_closure_is_cached(self):
+        webkom = AbakusGroup.objects.get(name='Webkom')
+        webkom.add_user(self.user)
+        self.assertIn(webkom.id, User.objects.get(pk=self.user.pk).all_group_ids)
+
+        with self.assertNumQueries(0):
+            user = User(pk=self.user.pk)
+            self.assertIn(webkom.id, user.all_group_ids)
+            self.assertIn('/sudo/', user.keyword_permissions)
+
+    def test_group_closure_invalidated_on_membership_change(self):
+        webkom = AbakusGroup.objects.get(name='Webkom')
+        self.assertNotIn(webkom.id, User.objects.get(pk=self.user.pk).all_group_ids)
+
+        webkom.add_user(self.user)
+        self.assertIn(webkom.id, User.objects.get(pk=self.user.pk).all_group_ids)
+
+        webkom.remove_user(self.user)
+        self.assertNotIn(webkom.id, User.objects.get(pk=self.user.pk).all_group_ids)
+
+    def test_group_closure_invalidated_on_group_change(self):
+        abakus = AbakusGroup.objects_with_text.get(name='Abakus')
+        AbakusGroup.objects.get(name='Webkom').add_user(self.user)
+        self.assertNotIn('/test/', User.objects.get(pk=self.user.pk).keyword_permissions)
+
+        abakus.permissions = ['/test/']
+        abakus.save()
+        self.assertIn('/test/', User.objects.get(pk=self.user.pk).keyword_permissions)
+
     def test_number_of_users(self):
         abakus = AbakusGroup.objects.get(name='Abakus')
         abakom = AbakusGroup.objects.get(name='Abakom')
@@ -71,7 +71,14 @@ schedule = {
     },
     'check-that-pool-counters-match-registration-number': {
         'task': 'lego.apps.events.tasks.check_that_pool_counters_match_registration_number',
-        'schedule': crontab(hour='*', minute=0)
+        'schedule': crontab(hour='*', minute=0),
+        'kwargs': {
+            'repair': True
+        }
+    },
+    'flush-search-index-queue': {
+        'task': 'lego.apps.search.tasks.flush_index_queue',
+        'schedule': 5.0
     },
     'notify_user_about_new_survey': {
         'task': 'lego.apps.surveys.tasks.send_survey_mail',
@@ -23,6 +23,11 @@ PENALTY_IGNORE_SUMMER = ((6, 1), (8, 15))
 PENALTY_IGNORE_WINTER = ((12, 1), (1, 10))
 
 REGISTRATION_CONFIRMATION_TIMEOUT = 60 * 60 * 24
+
+# Assign pending event registrations to pools in batches, with one worker per event,
+# instead of one task per registration.
+REGISTRATION_BATCHING = False
+REGISTRATION_BATCH_SIZE = 200
 STUDENT_CONFIRMATION_TIMEOUT = 60 * 60 * 24
 
 PASSWORD_RESET_TIMEOUT = 60 * 60 * 24
@@ -46,11 +51,19 @@ LDAP_GROUPS = [
 
 LMTP_HOST = '0.0.0.0'
 LMTP_PORT = 8024
+LMTP_WORKERS = 4
+LMTP_MAX_MESSAGE_SIZE = 50 * 1024 * 1024
+# Messages larger than this are spooled to a temporary file in LMTP_SPOOL_DIR.
+LMTP_SPOOL_MAX_MEMORY = 1024 * 1024
+LMTP_SPOOL_DIR = None
+LMTP_STATS_INTERVAL = 60
 
 RESTRICTED_ADDRESS = 'restricted'
 RESTRICTED_DOMAIN = 'abakus.no'
 RESTRICTED_FROM = 'Abakus <no-reply@abakus.no>'
 RESTRICTED_ALLOW_ORIGINAL_SENDER = False
+RESTRICTED_BATCH_SIZE = 100
+RESTRICTED_BATCH_MAX_RETRIES = 5
 
 GSUITE_DOMAIN = 'abakus.no'
 
@@ -60,3 +73,10 @@ GSUITE_GROUPS = []
 GSUITE_EXTERNAL_USERS = [
     'admin@abakus.no',
 ]
+
+GSUITE_MAX_RETRIES = 5
+GSUITE_MAX_BACKOFF = 32
+
+# Threads used for the directory calls of each system, and the lock preventing overlapping runs.
+EXTERNAL_SYNC_WORKERS = 4
+EXTERNAL_SYNC_LOCK_TIMEOUT = 60 * 60 * 2
@@ -2,3 +2,6 @@ SEARCH_ID_FIELD = 'id'
 SEARCH_DJANGO_CT_FIELD = 'django_ct'
 SEARCH_DJANGO_ID_FIELD = 'django_id'
 SEARCH_TEMPLATE_NAME = 'lego-search'
+
+# The search backend, 'elasticsearch' or 'local'. The local backend is for tests and runserver.
+SEARCH_BACKEND = 'elasticsearch'
@@ -77,3 +77,5 @@ SLACK_TOKEN = ''
 LDAP_SERVER = '127.0.0.1:389'
 LDAP_USER = 'cn=admin,dc=abakus,dc=no'
 LDAP_PASSWORD = 'admin'
+
+EXTERNAL_SYNC_WORKERS = 1
@@ -5,3 +5,8 @@ class UtilsConfig(AppConfig):
 
     name = 'lego.utils'
     verbose_name = 'Utils'
+
+    def ready(self):
+        from lego.utils.content_types import build_model_map
+
+        build_model_map()
@@ -1,3 +1,4 @@
+from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 
@@ -10,6 +11,19 @@ Content strings is on the form "<app_label>.<model_name>-<instance_pk>".
 
 VALIDATION_EXCEPTIONS = (ValueError, TypeError, ObjectDoesNotExist, MultipleObjectsReturned)
 
+# Process wide map from "<app_label>.<model_name>" to the model class, built by the utils app
+# when the app registry is ready.
+_model_map = None
+
+
+def build_model_map():
+    global _model_map
+    _model_map = {
+        f'{model._meta.app_label}.{model._meta.model_name}': model
+        for model in apps.get_models()
+    }
+    return _model_map
+
 
 def split_string(instance_string):
     """
@@ -26,11 +40,14 @@ def split_string(instance_string):
 
 def string_to_model_cls(content_type_string):
     """
-    Convert a string like app_label.model_name to a model cls
+    Convert a string like app_label.model_name to a model cls. The model is looked up in the
+    model map, no queries are made.
     """
     app_label, model_name = content_type_string.split('.')
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-    return content_type.model_class()
+    model = (_model_map or build_model_map()).get(f'{app_label}.{model_name.lower()}')
+    if model is None:
+        raise ContentType.DoesNotExist(f'No model named {content_type_string}')
+    return model
 
 
 def string_to_instance(instance_string):
@@ -38,10 +55,28 @@ def string_to_instance(instance_string):
     Convert a string like app_label.model_name-instance_pk to a model instance
     """
     content_type_string, id_string = split_string(instance_string)
+    model = string_to_model_cls(content_type_string)
+    return model._base_manager.get(pk=id_string)
 
-    app_label, model_name = content_type_string.split('.')
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-    return content_type.get_object_for_this_type(pk=id_string)
+
+def strings_to_instances(instance_strings):
+    """
+    Convert many content strings to model instances, with one query for each model. The
+    instances are returned in the same order as the strings, with None for missing objects.
+    """
+    instance_strings = list(instance_strings)
+    ids_by_content_type = {}
+    for instance_string in instance_strings:
+        content_type_string, id_string = split_string(instance_string)
+        ids_by_content_type.setdefault(content_type_string, set()).add(id_string)
+
+    instances = {}
+    for content_type_string, ids in ids_by_content_type.items():
+        model = string_to_model_cls(content_type_string)
+        for instance in model._base_manager.filter(pk__in=ids):
+            instances[f'{content_type_string}-{instance.pk}'] = instance
+
+    return [instances.get(instance_string) for instance_string in instance_strings]
 
 
 def instance_to_content_type_string(instance):
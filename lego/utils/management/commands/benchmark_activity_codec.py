@@ -0,0 +1,58 @@
+import time
+
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.serializers import FeedActivitySerializer
+from lego.apps.feeds.verbs import EventCreateVerb
+from lego.utils.management_command import BaseCommand
+
+
+def serializer_serialize(activity):
+    return FeedActivitySerializer(activity).data
+
+
+def serializer_deserialize(data):
+    serializer = FeedActivitySerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return Activity(
+        actor=serializer.validated_data['actor'], verb=serializer.validated_data['verb']['id'],
+        object=serializer.validated_data['object'], target=serializer.validated_data.get('target'),
+        time=serializer.validated_data['time'],
+        extra_context=serializer.validated_data['extra_context']
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare the activity codec with the FeedActivitySerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--activities',
+            type=int,
+            default=10000,
+            help='Number of activities to encode and decode',
+        )
+
+    def run(self, *args, **options):
+        now = timezone.now()
+        activities = [
+            Activity(
+                actor='users.user-1', verb=EventCreateVerb, object=f'events.event-{i}',
+                target='users.user-2', time=now, extra_context={'title': f'Event {i}'}
+            ) for i in range(1, options['activities'] + 1)
+        ]
+        payloads = [activity.serialize() for activity in activities]
+
+        def measure(name, function, items):
+            start = time.perf_counter()
+            for item in items:
+                function(item)
+            duration = time.perf_counter() - start
+            print(f'{name}: {duration * 1000:.0f} ms, {len(items) / duration:.0f} per second')
+
+        print(f'Activities: {len(activities)}')
+        measure('Serializer, serialize', serializer_serialize, activities)
+        measure('Codec, serialize', Activity.serialize, activities)
+        measure('Serializer, deserialize', serializer_deserialize, payloads)
+        measure('Codec, deserialize', Activity.deserialize, payloads)
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed
+from lego.apps.feeds.utils import add_to_feed, remove_from_feed
+from lego.apps.feeds.verbs import EventCreateVerb
+from lego.utils.management_command import BaseCommand
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure feed fanout throughput for an activity with many recipients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=5000,
+            help='Number of recipients',
+        )
+        parser.add_argument(
+            '--notification',
+            action='store_true',
+            default=False,
+            help='Use the notification feed, the markers stored in redis are not rolled back',
+        )
+
+    def run(self, *args, **options):
+        feed = NotificationFeed if options['notification'] else PersonalFeed
+        recipients = list(range(1, options['recipients'] + 1))
+
+        now = timezone.now()
+        first = Activity(
+            actor='users.user-1', verb=EventCreateVerb, object='events.event-1', time=now
+        )
+        second = Activity(
+            actor='users.user-1', verb=EventCreateVerb, object='events.event-2',
+            time=now + timedelta(seconds=1)
+        )
+
+        def measure(name, function, *args):
+            start = time.perf_counter()
+            function(*args)
+            duration = time.perf_counter() - start
+            print(
+                f'{name}: {duration * 1000:.0f} ms, '
+                f'{len(recipients) / duration:.0f} recipients per second'
+            )
+
+        try:
+            with transaction.atomic():
+                print(f'Feed: {feed._meta.model_name}, recipients: {len(recipients)}')
+                measure('Add, new aggregated activities', add_to_feed, first, feed, recipients)
+                measure(
+                    'Add, existing aggregated activities', add_to_feed, second, feed, recipients
+                )
+                measure('Remove', remove_from_feed, second, feed, recipients)
+                raise Rollback()
+        except Rollback:
+            pass
@@ -0,0 +1,72 @@
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Send messages to the LMTP server from concurrent sessions and report the throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='LMTP server host')
+        parser.add_argument('--port', type=int, default=settings.LMTP_PORT, help='LMTP server port')
+        parser.add_argument('--messages', type=int, default=1000, help='Number of messages to send')
+        parser.add_argument(
+            '--concurrency', type=int, default=20, help='Number of concurrent sessions'
+        )
+        parser.add_argument('--size', type=int, default=10000, help='Message body size in bytes')
+        parser.add_argument(
+            '--sender', default='benchmark@abakus.no', help='Envelope sender of the messages'
+        )
+
+    def run(self, *args, **options):
+        recipient = f'{settings.RESTRICTED_ADDRESS}@{settings.RESTRICTED_DOMAIN}'
+        body = '\r\n'.join('x' * 76 for _ in range(max(options['size'] // 78, 1)))
+        sessions = options['concurrency']
+        per_session = [
+            options['messages'] // sessions + (1 if i < options['messages'] % sessions else 0)
+            for i in range(sessions)
+        ]
+
+        def send(count):
+            latencies, errors = [], 0
+            client = smtplib.LMTP(options['host'], options['port'])
+            try:
+                for _ in range(count):
+                    message = (
+                        f'From: {options["sender"]}\r\nTo: {recipient}\r\n'
+                        f'Subject: Benchmark\r\nMessage-ID: <{uuid.uuid4()}@benchmark>\r\n'
+                        f'\r\n{body}\r\n'
+                    )
+                    start = time.perf_counter()
+                    try:
+                        client.sendmail(options['sender'], [recipient], message)
+                    except smtplib.SMTPException:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                client.quit()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            results = list(executor.map(send, per_session))
+        duration = time.perf_counter() - start
+
+        latencies = sorted(latency for result in results for latency in result[0])
+        errors = sum(result[1] for result in results)
+
+        def percentile(value):
+            return round(latencies[int(value * (len(latencies) - 1))] * 1000, 2)
+
+        print(f'Messages: {len(latencies)}, errors: {errors}, sessions: {sessions}')
+        print(f'Duration: {duration:.2f}s, messages/s: {len(latencies) / duration:.2f}')
+        if latencies:
+            print(
+                f'Latency p50: {percentile(0.5)}ms, p95: {percentile(0.95)}ms, '
+                f'p99: {percentile(0.99)}ms'
+            )
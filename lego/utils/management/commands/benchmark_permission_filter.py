@@ -0,0 +1,97 @@
+import random
+
+from django.db import connection, transaction
+
+from lego.apps.articles.models import Article
+from lego.apps.permissions.constants import FILTER_QUERYSET_EXISTS, FILTER_QUERYSET_JOIN
+from lego.apps.permissions.permissions import PermissionHandler
+from lego.apps.users.models import AbakusGroup, User
+from lego.utils.management_command import BaseCommand
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare the EXPLAIN ANALYZE timings of the permission filter strategies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type=int,
+            default=50000,
+            help='Number of articles to seed',
+        )
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=50,
+            help='Number of groups to spread the permissions over',
+        )
+
+    def run(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.benchmark(options['objects'], options['groups'])
+                raise Rollback()
+        except Rollback:
+            print('Seeded data is rolled back')
+
+    def benchmark(self, number_of_objects, number_of_groups):
+        users = [
+            User.objects.create(
+                username=f'permissionbenchmark{i}', email=f'permissionbenchmark{i}@abakus.no'
+            ) for i in range(10)
+        ]
+        groups = [
+            AbakusGroup.objects.create(name=f'permissionbenchmark{i}')
+            for i in range(number_of_groups)
+        ]
+        for user in users:
+            for group in random.sample(groups, 3):
+                group.add_user(user)
+
+        articles = Article.objects.bulk_create(
+            Article(
+                title=f'Article {i}', description='-', text='-', created_by=random.choice(users),
+                require_auth=random.random() < 0.9
+            ) for i in range(number_of_objects)
+        )
+
+        relations = (
+            ('can_view_groups', groups),
+            ('can_edit_groups', groups),
+            ('can_edit_users', users),
+        )
+        for field_name, related in relations:
+            field = Article._meta.get_field(field_name)
+            through = field.remote_field.through
+            object_field = f'{field.m2m_field_name()}_id'
+            related_field = f'{field.m2m_reverse_field_name()}_id'
+            through.objects.bulk_create(
+                through(**{
+                    object_field: article.id,
+                    related_field: related_object.id
+                }) for article in articles
+                for related_object in random.sample(related, random.randint(0, 3))
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        user = User.objects.get(pk=users[0].pk)
+        print(f'Objects: {number_of_objects}, groups: {number_of_groups}')
+        for strategy in [FILTER_QUERYSET_JOIN, FILTER_QUERYSET_EXISTS]:
+            handler = PermissionHandler()
+            handler.filter_queryset_strategy = strategy
+            queryset = handler.filter_queryset(user, Article.objects.all())
+            count = queryset.count()
+
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN ANALYZE {sql}', params)
+                plan = [row[0] for row in cursor.fetchall()]
+
+            print(f'\nStrategy: {strategy}, matching objects: {count}')
+            print('\n'.join(plan[-2:]))
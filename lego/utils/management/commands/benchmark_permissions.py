@@ -0,0 +1,61 @@
+import random
+import timeit
+
+from lego.apps.permissions.keyword import KeywordPermissionMatcher
+from lego.utils.management_command import BaseCommand
+
+
+def linear_scan(permissions, perm):
+    for permission in permissions:
+        if perm.startswith(permission):
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Benchmark keyword permission matching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--permissions',
+            type=int,
+            default=100,
+            help='Number of keyword permissions the user has',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=10000,
+            help='Number of permission lookups',
+        )
+
+    def run(self, *args, **options):
+        apps = ['events', 'users', 'companies', 'articles', 'meetings', 'quotes', 'gallery']
+        actions = ['list', 'view', 'create', 'edit', 'delete']
+        models = [f'model{i}' for i in range(max(options['permissions'] // len(apps), 1))]
+
+        permissions = [
+            f'/sudo/admin/{random.choice(apps)}/{random.choice(models)}/{random.choice(actions)}/'
+            for i in range(options['permissions'])
+        ]
+        lookups = [
+            f'/sudo/admin/{random.choice(apps)}/{random.choice(models)}/{random.choice(actions)}/'
+            for i in range(options['lookups'])
+        ]
+
+        def scan():
+            for perm in lookups:
+                linear_scan(permissions, perm)
+
+        def match():
+            matcher = KeywordPermissionMatcher(permissions)
+            for perm in lookups:
+                matcher.match(perm)
+
+        scan_time = min(timeit.repeat(scan, number=1, repeat=5))
+        match_time = min(timeit.repeat(match, number=1, repeat=5))
+
+        print(f'Permissions: {len(permissions)}, lookups: {len(lookups)}')
+        print(f'Linear scan: {scan_time * 1000:.2f} ms')
+        print(f'Matcher (including compile): {match_time * 1000:.2f} ms')
+        print(f'Speedup: {scan_time / match_time:.1f}x')
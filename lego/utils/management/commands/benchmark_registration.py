@@ -5,7 +5,7 @@ from django.utils import timezone
 
 from lego.apps.events import constants
 from lego.apps.events.models import Event, Pool, Registration
-from lego.apps.events.tasks import async_register
+from lego.apps.events.tasks import async_register, async_register_batch
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.management_command import BaseCommand
 
@@ -33,6 +33,12 @@ class Command(BaseCommand):
             default=False,
             help='200 registration benchmark',
         )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            default=False,
+            help='Use the batch registration worker, combine with --multi',
+        )
 
     def run(self, *args, **options):
 
@@ -91,6 +97,26 @@ class Command(BaseCommand):
             pr.disable()
             pr.dump_stats(f'single_avg{event.id}.pstat')
 
+        def batch_benchmark(event, users):
+
+            for user in users:
+                reg = Registration.objects.get_or_create(event=event, user=user)[0]
+                reg.status = constants.PENDING_REGISTER
+                reg.registration_date = timezone.now()
+                reg.save(update_fields=['status', 'registration_date'])
+
+            start = timezone.now()
+            while event.registrations.filter(status=constants.PENDING_REGISTER).exists():
+                async_register_batch(event.id)
+            diff = timezone.now() - start
+
+            registrations = Registration.objects.filter(event=event)
+            print(f'Number of registrations: {registrations.count()}')
+            print(f'Number pool1 {pool1.registrations.count()} / 100')
+            print(f'Number pool2 {pool2.registrations.count()} / 10')
+            print(f'Time per registration {diff.total_seconds() * 1000 / registrations.count()}')
+            print(f'Total time: {diff.total_seconds() * 1000}')
+
         def benchmark(event, users):
 
             regs = []
@@ -119,5 +145,7 @@ class Command(BaseCommand):
             single_benchmark(event, users[0])
         elif options['singleavg']:
             single_benchmark_avg(event, users)
+        elif options['multi'] and options['batch']:
+            batch_benchmark(event, users)
         elif options['multi']:
             benchmark(event, users)
@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.test import override_settings
+
+from lego.apps.search.apps import BACKENDS
+from lego.utils.management_command import BaseCommand
+
+WORDS = [
+    'abakus', 'bedpres', 'kurs', 'fest', 'webkom', 'bedkom', 'arrkom', 'readme', 'labamba',
+    'ekskursjon', 'generalforsamling', 'hyttetur', 'julebord', 'sommerfest', 'fagdag'
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure indexing, search and autocomplete latency of the search backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            choices=list(BACKENDS.keys()),
+            action='append',
+            help='Backends to benchmark, all backends are used by default',
+        )
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=10000,
+            help='Number of documents to index',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of searches and autocompletes to run',
+        )
+
+    def run(self, *args, **options):
+        documents = [
+            (
+                'articles.article', str(pk), {
+                    'autocomplete': ' '.join(random.sample(WORDS, 2)),
+                    'filters': {},
+                    'fields': {
+                        'title': ' '.join(random.sample(WORDS, 3)),
+                        'description': ' '.join(random.sample(WORDS, 8)),
+                    },
+                }
+            ) for pk in range(1, options['documents'] + 1)
+        ]
+        queries = [random.choice(WORDS) for _ in range(options['queries'])]
+
+        # The benchmark uses a separate index, the live index isn't touched.
+        with override_settings(SEARCH_INDEX=f'{settings.SEARCH_INDEX}-benchmark'):
+            for name in options['backend'] or BACKENDS.keys():
+                backend = BACKENDS[name]()
+                backend.set_up()
+                self.benchmark(name, backend, documents, queries)
+
+    def benchmark(self, name, backend, documents, queries):
+        backend.clear()
+
+        start = time.perf_counter()
+        for i in range(0, len(documents), 500):
+            backend.update_many(
+                [(content_type, pk, dict(data)) for content_type, pk, data in documents[i:i + 500]]
+            )
+        duration = time.perf_counter() - start
+        print(f'\nBackend: {name}')
+        print(f'Indexing: {len(documents) / duration:.0f} documents per second')
+
+        if hasattr(backend, 'connection'):
+            backend.connection.indices.refresh(index=settings.SEARCH_INDEX)
+
+        for operation in ['search', 'autocomplete']:
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                list(getattr(backend, operation)(query if operation == 'search' else query[:3]))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f'{operation}: median {statistics.median(timings):.2f} ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms'
+            )
+
+        backend.clear()
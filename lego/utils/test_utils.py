@@ -1,9 +1,24 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from rest_framework.test import APITestCase, APITransactionTestCase
 
 
-class BaseTestCase(TestCase):
+class CacheClearMixin:
+    """
+    The cache isn't rolled back between tests, clear it to avoid leaking cached values like group
+    closures into the next test.
+    """
+
+    def _pre_setup(self):
+        from lego.apps.feeds.attr_cache import AttrCache
+
+        super()._pre_setup()
+        cache.clear()
+        AttrCache.local_cache.clear()
+
+
+class BaseTestCase(CacheClearMixin, TestCase):
     """
     Normally we don't want to hit Cassandra in tests, so we mock out add_activity in most tests
     to avoid this. If you want to test something using Cassandra, override FeedTestBase instead.
@@ -11,11 +26,11 @@ class BaseTestCase(TestCase):
     pass
 
 
-class BaseAPITestCase(APITestCase):
+class BaseAPITestCase(CacheClearMixin, APITestCase):
     pass
 
 
-class BaseAPITransactionTestCase(APITransactionTestCase):
+class BaseAPITransactionTestCase(CacheClearMixin, APITransactionTestCase):
     pass
 
 
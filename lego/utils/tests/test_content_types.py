@@ -1,6 +1,6 @@
 from unittest import mock
 
-from lego.apps.users.models import User
+from lego.apps.users.models import AbakusGroup, User
 from lego.utils import content_types
 from lego.utils.test_utils import BaseTestCase
 
@@ -26,3 +26,31 @@ class ContentTypesTestCase(BaseTestCase):
         self.assertRaises(
             content_types.VALIDATION_EXCEPTIONS, content_types.string_to_model_cls, 'unknown.model'
         )
+
+    def test_string_to_model_cls_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEquals(content_types.string_to_model_cls('users.abakusgroup'), AbakusGroup)
+
+
+class StringsToInstancesTestCase(BaseTestCase):
+
+    fixtures = ['test_abakus_groups.yaml', 'test_users.yaml']
+
+    def test_string_to_instance(self):
+        self.assertEqual(content_types.string_to_instance('users.user-1'), User.objects.get(pk=1))
+        self.assertRaises(
+            content_types.VALIDATION_EXCEPTIONS, content_types.string_to_instance, 'users.user-0'
+        )
+
+    def test_strings_to_instances_keeps_order(self):
+        strings = ['users.user-2', 'users.abakusgroup-1', 'users.user-1', 'users.user-100000']
+        with self.assertNumQueries(2):
+            instances = content_types.strings_to_instances(strings)
+
+        expected = [
+            User.objects.get(pk=2),
+            AbakusGroup.objects.get(pk=1),
+            User.objects.get(pk=1),
+            None,
+        ]
+        self.assertEqual(instances, expected)